@@ -1,15 +1,27 @@
 import logging
+import math
+import random
+import secrets
+import struct
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import date
 
 import msgspec
 import redis
 
 from app.common.constants import (
+    CACHE_LOCK_POLL_INTERVAL,
+    CACHE_LOCK_TTL,
+    CACHE_REFRESH_WORKERS,
+    CACHE_STALE_FACTOR,
+    CACHE_XFETCH_BETA,
     DEFAULT_TTL,
     LONG_TTL,
     LONG_TTL_THRESHOLD_DAYS,
-    REDIS_KEY_VEHICLES_CACHE,
-    VEHICLES_CACHE_TTL,
 )
 from app.common.redis.connection import get_client
 
@@ -22,40 +34,185 @@ def _ttl(start_date: date, end_date: date) -> int:
 
 
 def _key(endpoint: str, line_number: str, start_date: date, end_date: date) -> str:
-    return f"stats:{endpoint}:{line_number}:{start_date}:{end_date}"
+    # v2: entries carry _HEADER - the prefix keeps them apart from the plain JSON bodies cached before
+    return f"stats:v2:{endpoint}:{line_number}:{start_date}:{end_date}"
 
 
-def get_cached(endpoint: str, line_number: str, start_date: date, end_date: date) -> bytes | None:
+def _lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+# Deletes the lock only if it still holds our token - it may have expired and been taken by another worker since
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+Compute = Callable[[], dict[str, msgspec.Struct]]
+
+# Stats entries are stored as a header followed by the JSON body. The header holds the soft expiry (epoch seconds),
+# after which the entry is stale but still served while one worker refreshes it, and how long the value took to
+# compute, which scales the probabilistic early refresh.
+_HEADER = struct.Struct(">dd")
+
+
+@dataclass(frozen=True)
+class _Entry:
+    body: bytes
+    expires_at: float
+    compute_seconds: float
+
+
+_refresher = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="stats-cache-refresh")
+
+# Misses being computed in this worker, so concurrent requests for the same key wait for one result
+_inflight: dict[str, Future[bytes]] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_or_compute(
+    endpoint: str, line_number: str, start_date: date, end_date: date, compute: Compute, refresh: Compute
+) -> bytes:
+    """
+    Cached stats body for the endpoint. Both callables build the results for several endpoints of the same line and
+    period, which are all cached: `compute` runs in the request on a miss, `refresh` runs on a background thread and
+    must not use request-scoped resources.
+
+    A miss is computed once per key across all workers: concurrent requests in this worker share one computation and
+    other workers wait on a Redis lock for its result. A stale entry, or one picked for early refresh (XFetch), is
+    served as is while the worker that takes the lock refreshes it in the background.
+    """
+    key = _key(endpoint, line_number, start_date, end_date)
+    entry = _read(key)
+    if entry is not None:
+        if _should_refresh(entry):
+            token = _acquire(key)
+            if token is not None:
+                _refresher.submit(_refresh, endpoint, line_number, start_date, end_date, refresh, token)
+        return entry.body
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if future is None:
+            future = _inflight[key] = Future()
+    if not leader:
+        return future.result()
+
     try:
-        client = get_client()
-        return client.get(_key(endpoint, line_number, start_date, end_date))  # type: ignore
-    except redis.RedisError:
-        logger.warning("Redis read failed for stats cache", exc_info=True)
-        return None
+        body = _fill(endpoint, line_number, start_date, end_date, compute)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(body)
+        return body
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
 
 
-def set_cached(endpoint: str, line_number: str, start_date: date, end_date: date, data: msgspec.Struct) -> bytes:
-    raw = msgspec.json.encode(data)
+def _should_refresh(entry: _Entry) -> bool:
+    """
+    XFetch: refresh before the soft expiry with a probability that rises as it approaches and with the compute time,
+    so one request, not all of them at once, recomputes a popular key.
+    """
+    early = entry.compute_seconds * CACHE_XFETCH_BETA * -math.log(1.0 - random.random())
+    return time.time() + early >= entry.expires_at
+
+
+def _fill(endpoint: str, line_number: str, start_date: date, end_date: date, compute: Compute) -> bytes:
+    key = _key(endpoint, line_number, start_date, end_date)
+    token = _acquire(key)
+    if token is None:
+        # Another worker is computing this key - wait for its result instead of running the same query
+        body = _wait_for(key)
+        if body is not None:
+            return body
+        # The holder gave up: take over its lock if it is free, otherwise compute without one
+        token = _acquire(key)
+    try:
+        return _store(line_number, start_date, end_date, compute)[endpoint]
+    finally:
+        if token is not None:
+            _release(key, token)
+
+
+def _refresh(endpoint: str, line_number: str, start_date: date, end_date: date, refresh: Compute, token: str) -> None:
+    try:
+        _store(line_number, start_date, end_date, refresh)
+    except Exception:
+        logger.warning("Background refresh of stats cache failed", exc_info=True)
+    finally:
+        _release(_key(endpoint, line_number, start_date, end_date), token)
+
+
+def _store(line_number: str, start_date: date, end_date: date, compute: Compute) -> dict[str, bytes]:
+    """Compute, then cache every returned result in one pipeline. Returns the encoded bodies by endpoint."""
+    started = time.monotonic()
+    bodies = {endpoint: msgspec.json.encode(data) for endpoint, data in compute().items()}
+    compute_seconds = time.monotonic() - started
+
+    ttl = _ttl(start_date, end_date)
+    header = _HEADER.pack(time.time() + ttl, compute_seconds)
     try:
-        client = get_client()
-        client.setex(_key(endpoint, line_number, start_date, end_date), _ttl(start_date, end_date), raw)
+        pipe = get_client().pipeline(transaction=False)
+        for endpoint, body in bodies.items():
+            pipe.setex(_key(endpoint, line_number, start_date, end_date), ttl * CACHE_STALE_FACTOR, header + body)
+        pipe.execute()
     except redis.RedisError:
         logger.warning("Redis write failed for stats cache", exc_info=True)
-    return raw
+    return bodies
 
 
-def get_vehicles_cache() -> bytes | None:
+def _read(key: str) -> _Entry | None:
     try:
-        client = get_client()
-        return client.get(REDIS_KEY_VEHICLES_CACHE)  # type: ignore
+        value: bytes | None = get_client().get(key)  # type: ignore[assignment]
     except redis.RedisError:
-        logger.warning("Redis read failed for vehicles cache", exc_info=True)
+        logger.warning("Redis read failed for stats cache", exc_info=True)
+        return None
+    if value is None or len(value) < _HEADER.size:
         return None
+    expires_at, compute_seconds = _HEADER.unpack_from(value)
+    return _Entry(value[_HEADER.size :], expires_at, compute_seconds)
 
 
-def set_vehicles_cache(data: bytes) -> None:
+def _acquire(key: str) -> str | None:
+    """
+    Take the recompute lock. Returns the token to release it with, None if another worker holds it. Without Redis
+    every worker computes on its own.
+    """
+    token = secrets.token_hex(16)
     try:
-        client = get_client()
-        client.setex(REDIS_KEY_VEHICLES_CACHE, VEHICLES_CACHE_TTL, data)
+        if get_client().set(_lock_key(key), token, nx=True, ex=CACHE_LOCK_TTL):
+            return token
+        return None
     except redis.RedisError:
-        logger.warning("Redis write failed for vehicles cache", exc_info=True)
+        logger.warning("Redis lock failed for stats cache", exc_info=True)
+        return token
+
+
+def _release(key: str, token: str) -> None:
+    try:
+        get_client().eval(_RELEASE_SCRIPT, 1, _lock_key(key), token)
+    except redis.RedisError:
+        logger.warning("Redis unlock failed for stats cache", exc_info=True)
+
+
+def _wait_for(key: str) -> bytes | None:
+    """Poll for the lock holder's result. None if the lock is gone (or timed out) without one being written."""
+    deadline = time.monotonic() + CACHE_LOCK_TTL
+    while time.monotonic() < deadline:
+        time.sleep(CACHE_LOCK_POLL_INTERVAL)
+        entry = _read(key)
+        if entry is not None:
+            return entry.body
+        try:
+            if not get_client().exists(_lock_key(key)):
+                return None
+        except redis.RedisError:
+            return None
+    return None
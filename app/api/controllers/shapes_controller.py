@@ -1,9 +1,10 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
 from app.api import schemas_docs as docs
 from app.api.db import DbSession
+from app.api.response import MSGPACK, VARY_ACCEPT, accepts_msgpack
 from app.api.schemas import ShapeIdPath
 from app.api.services.shapes_service import ShapesService
 
@@ -19,14 +20,24 @@ def _get_service(db: DbSession) -> ShapesService:
 Shapes = Annotated[ShapesService, Depends(_get_service)]
 
 
-@router.get("/{shape_id}", response_model=docs.ShapeResponse, summary="Get route geometry")
-def get_shape(shape_id: ShapeIdPath, service: Shapes) -> Response:
+@router.get(
+    "/{shape_id}",
+    response_model=docs.ShapeResponse,
+    responses={200: {"content": {MSGPACK: {"schema": docs.ShapeColumnsResponse.model_json_schema()}}}},
+    summary="Get route geometry",
+)
+def get_shape(request: Request, shape_id: ShapeIdPath, service: Shapes) -> Response:
     """
     Returns the ordered list of GPS points that define a trip's route geometry.
 
     Use `shape_id` from the `/vehicles/positions` endpoint to fetch the corresponding shape.
+
+    ### Compact format
+    With `Accept: application/msgpack`, the points are sent as msgpack in columnar form: `latitude` and `longitude`
+    are packed little-endian float32 arrays and `sequence` a uint32 array, point `i` being row `i` of each.
     """
-    data = service.get_shape(shape_id)
+    packed = accepts_msgpack(request)
+    data = service.get_shape(shape_id, packed)
     if data is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Shape '{shape_id}' not found")
-    return Response(content=data, media_type=JSON)
+    return Response(content=data, media_type=MSGPACK if packed else JSON, headers=VARY_ACCEPT)
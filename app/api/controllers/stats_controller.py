@@ -132,3 +132,31 @@ def get_trend(
     """
     validate_date_range(start_date, end_date)
     return Response(content=service.trend(line_number, start_date, end_date), media_type=JSON)
+
+
+@router.get(
+    "/{line_number}/stats/overview",
+    response_model=docs.LineOverviewResponse,
+    summary="All line statistics in one response",
+)
+def get_overview(
+    line_number: LineNumberPath,
+    service: Stats,
+    start_date: StartDateQuery,
+    end_date: EndDateQuery,
+) -> Response:
+    """
+    Returns max-delay, route-delay, punctuality and trend for a line in one response, computed in a single pass
+    over the period. Each part is identical to the response of its own endpoint.
+
+    ### Timezone
+    All times are provided in Europe/Warsaw local time.
+
+    ### Note
+    The calculation is based on stop sequences from 2 to n-1 (where n is the last stop).
+
+    The first and last stops are intentionally excluded as they often contain garbage data
+    (e.g., GPS drift during layovers, driver login delays).
+    """
+    validate_date_range(start_date, end_date)
+    return Response(content=service.overview(line_number, start_date, end_date), media_type=JSON)
@@ -1,29 +1,99 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 
 from app.api import schemas_docs as docs
-from app.api.db import DbSession
+from app.api.live_filter import LiveFilter
+from app.api.live_stream import get_live_broadcaster
+from app.api.response import MSGPACK, VARY_ACCEPT, accepts_msgpack
+from app.api.schemas import BBoxQuery, LineNumbersQuery, SinceVersionQuery
 from app.api.services.vehicles_service import VehiclesService
 
 router = APIRouter(prefix="/vehicles", tags=["live"])
 
 JSON = "application/json"
+EVENT_STREAM = "text/event-stream"
 
 
-def _get_service(db: DbSession) -> VehiclesService:
-    return VehiclesService(db)
+def _get_service() -> VehiclesService:
+    return VehiclesService()
 
 
 Vehicles = Annotated[VehiclesService, Depends(_get_service)]
 
 
-@router.get("/positions", response_model=docs.LiveVehicleResponse, summary="Live vehicle positions")
-def get_positions(service: Vehicles) -> Response:
+@router.get(
+    "/positions",
+    response_model=docs.LiveVehicleResponse | docs.LiveVehicleDeltaResponse,
+    responses={200: {"content": {MSGPACK: {"schema": docs.LiveVehicleColumnsResponse.model_json_schema()}}}},
+    summary="Live vehicle positions",
+)
+def get_positions(
+    request: Request,
+    service: Vehicles,
+    since: SinceVersionQuery = None,
+    line: LineNumbersQuery = None,
+    bbox: BBoxQuery = None,
+) -> Response:
     """
     Returns current GPS coordinates for all active vehicles (MPK + Mobilis).
 
+    ### Delta updates
+    Every response carries the snapshot `version`. Pass it back as `since` to get only the changes since that
+    snapshot, keyed by `license_plate`: `added` (new vehicles, or ones that switched trips, with all fields),
+    `moved` (position fields only) and `removed` (license plates). Apply them to the vehicles you already have.
+    A delta response always contains the `since` field; if the version is too old, the full snapshot is returned
+    instead.
+
+    ### Filtering
+    With `line` and/or `bbox`, only matching vehicles are returned, always as a full snapshot (`since` is ignored).
+
+    ### Compact format
+    With `Accept: application/msgpack`, the full snapshot is sent as msgpack in columnar form: vehicle `i` is row `i`
+    of every column. `latitude`, `longitude` and `bearing` (NaN if unknown) are packed little-endian float32 arrays,
+    `timestamp` a uint32 array of Unix seconds, and `line`, `headsign` and `shape` uint16 arrays of indexes into the
+    `lines`, `headsigns` and `shapes` dictionaries. Delta responses are always JSON.
+
+    ### Timezone (UTC)
+    The timestamp field is provided in UTC (ISO 8601) format (e.g., 2026-02-15T17:07:00+00:00).
+    """
+    live_filter = LiveFilter.from_query(line, bbox)
+    if since is not None and live_filter.is_empty:
+        delta = service.get_live_delta(since)
+        if delta is not None:
+            return Response(content=delta, media_type=JSON, headers=VARY_ACCEPT)
+    packed = accepts_msgpack(request)
+    return Response(
+        content=service.get_live_vehicles(packed, live_filter),
+        media_type=MSGPACK if packed else JSON,
+        headers=VARY_ACCEPT,
+    )
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {EVENT_STREAM: {}}}},
+    summary="Live vehicle positions stream",
+)
+async def stream_positions(line: LineNumbersQuery = None, bbox: BBoxQuery = None) -> StreamingResponse:
+    """
+    Pushes live vehicle positions as Server-Sent Events, instead of polling `/vehicles/positions`.
+
+    The first event is a `snapshot` (same body as `/vehicles/positions`), followed by a `delta` event (same body as
+    `/vehicles/positions?since=`) whenever the positions change. A new `snapshot` event may be sent at any time, e.g.
+    if the client fell behind - it replaces everything the client holds.
+
+    ### Filtering
+    With `line` and/or `bbox`, only matching vehicles are sent. A vehicle that leaves the filter is `removed`, one
+    that enters it is `added`, and `count` is the number of matching vehicles.
+
     ### Timezone (UTC)
     The timestamp field is provided in UTC (ISO 8601) format (e.g., 2026-02-15T17:07:00+00:00).
     """
-    return Response(content=service.get_live_vehicles(), media_type=JSON)
+    return StreamingResponse(
+        get_live_broadcaster().stream(LiveFilter.from_query(line, bbox)),
+        media_type=EVENT_STREAM,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,59 @@
+import math
+from dataclasses import dataclass
+
+from fastapi import HTTPException, status
+
+from app.common.redis.schemas import LiveVehicle
+
+BBox = tuple[float, float, float, float]  # (min_lon, min_lat, max_lon, max_lat)
+
+
+def parse_bbox(bbox: str) -> BBox:
+    """Parse "min_lon,min_lat,max_lon,max_lat", the order used by GeoJSON and most map libraries."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="bbox must be min_lon,min_lat,max_lon,max_lat",
+        ) from None
+    if not all(math.isfinite(part) for part in (min_lon, min_lat, max_lon, max_lat)):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="bbox coordinates must be finite numbers",
+        )
+    if not (-180 <= min_lon and max_lon <= 180 and -90 <= min_lat and max_lat <= 90):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="bbox must be within longitude -180..180 and latitude -90..90",
+        )
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="bbox minimum must be <= maximum",
+        )
+    return min_lon, min_lat, max_lon, max_lat
+
+
+@dataclass(frozen=True)
+class LiveFilter:
+    """Which live vehicles a client wants: on any of `lines`, inside `bbox`. None means no restriction."""
+
+    lines: frozenset[str] | None = None
+    bbox: BBox | None = None
+
+    @classmethod
+    def from_query(cls, lines: list[str] | None, bbox: str | None) -> "LiveFilter":
+        return cls(frozenset(lines) if lines else None, parse_bbox(bbox) if bbox else None)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.lines is None and self.bbox is None
+
+    def matches(self, vehicle: LiveVehicle) -> bool:
+        if self.lines is not None and vehicle.line_number not in self.lines:
+            return False
+        if self.bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            return min_lon <= vehicle.longitude <= max_lon and min_lat <= vehicle.latitude <= max_lat
+        return True
@@ -0,0 +1,112 @@
+import math
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import lru_cache
+
+import msgspec
+
+from app.api.live_filter import BBox, LiveFilter
+from app.common.constants import LIVE_FILTER_CACHE_SIZE, LIVE_GRID_CELL
+from app.common.redis.schemas import LiveVehicle, LiveVehicleResponse
+from app.common.redis.serializer import encode_live_columns
+
+_Cell = tuple[int, int]  # (lon, lat) in LIVE_GRID_CELL units
+_CacheKey = tuple[int, LiveFilter, bool]
+
+
+def _cell(longitude: float, latitude: float) -> _Cell:
+    return math.floor(longitude / LIVE_GRID_CELL), math.floor(latitude / LIVE_GRID_CELL)
+
+
+class LiveIndex:
+    """
+    One version of the live positions snapshot, with its vehicles bucketed by grid cell and by line, so a filtered
+    response is put together from a few precomputed slices instead of a scan over every vehicle.
+    """
+
+    def __init__(self, snapshot: LiveVehicleResponse):
+        self.version = snapshot.version
+        self._vehicles = snapshot.vehicles
+        self._cells: dict[_Cell, list[int]] = {}
+        self._lines: dict[str, list[int]] = {}
+        for i, vehicle in enumerate(snapshot.vehicles):
+            self._cells.setdefault(_cell(vehicle.longitude, vehicle.latitude), []).append(i)
+            self._lines.setdefault(vehicle.line_number, []).append(i)
+
+    def cells(self, bbox: BBox) -> frozenset[_Cell]:
+        """The non-empty cells the box touches."""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        x0, y0 = _cell(min_lon, min_lat)
+        x1, y1 = _cell(max_lon, max_lat)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+            return frozenset(c for c in self._cells if x0 <= c[0] <= x1 and y0 <= c[1] <= y1)
+        return frozenset((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) in self._cells)
+
+    def select(self, live_filter: LiveFilter) -> list[LiveVehicle]:
+        """Vehicles matching the filter, in snapshot order - the same ones LiveFilter.matches accepts."""
+        if live_filter.bbox is None:
+            if live_filter.lines is None:
+                return self._vehicles
+            indexes = [i for line in live_filter.lines for i in self._lines.get(line, ())]
+        else:
+            # Only the vehicles of the cells the box touches are checked against the exact box and lines
+            candidates = (i for cell in self.cells(live_filter.bbox) for i in self._cells[cell])
+            indexes = [i for i in candidates if live_filter.matches(self._vehicles[i])]
+        return [self._vehicles[i] for i in sorted(indexes)]
+
+
+class LiveIndexCache:
+    """
+    The index of the latest snapshot in this API worker, built once per version, and the encoded filtered responses
+    for it keyed by (version, filter, format), so clients sending the same filter share one encoding.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._index: LiveIndex | None = None
+        self._responses: OrderedDict[_CacheKey, bytes] = OrderedDict()
+
+    def get(self, version: int, live_filter: LiveFilter, packed: bool, load: Callable[[], bytes | None]) -> bytes:
+        """
+        Filtered snapshot, JSON or msgpack LiveVehicleColumns. `load` fetches the encoded snapshot when the index is
+        not at the stored `version`.
+        """
+        index = self._get_index(version, load)
+        key = (index.version, live_filter, packed)
+        with self._lock:
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                return self._responses[key]
+
+        vehicles = index.select(live_filter)
+        if packed:
+            data = encode_live_columns(index.version, vehicles)
+        else:
+            response = LiveVehicleResponse(version=index.version, count=len(vehicles), vehicles=vehicles)
+            data = msgspec.json.encode(response)
+
+        with self._lock:
+            if self._index is index:
+                self._responses[key] = data
+                if len(self._responses) > LIVE_FILTER_CACHE_SIZE:
+                    self._responses.popitem(last=False)
+        return data
+
+    def _get_index(self, version: int, load: Callable[[], bytes | None]) -> LiveIndex:
+        with self._lock:
+            if self._index is None or self._index.version != version:
+                data = load()
+                snapshot = (
+                    msgspec.json.decode(data, type=LiveVehicleResponse)
+                    if data is not None
+                    else LiveVehicleResponse(version=0, count=0, vehicles=[])
+                )
+                self._index = LiveIndex(snapshot)
+                self._responses.clear()
+            return self._index
+
+
+@lru_cache(maxsize=1)
+def get_live_index_cache() -> LiveIndexCache:
+    return LiveIndexCache()
@@ -0,0 +1,198 @@
+import asyncio
+import contextlib
+import logging
+from collections.abc import AsyncIterator
+from functools import lru_cache
+
+import msgspec
+import redis.asyncio
+
+from app.api.live_filter import LiveFilter
+from app.common.constants import (
+    LIVE_STREAM_HEARTBEAT,
+    LIVE_STREAM_QUEUE_SIZE,
+    LIVE_STREAM_RETRY_DELAY,
+    LIVE_VEHICLES_CHANNEL,
+)
+from app.common.redis.connection import get_async_client, get_client
+from app.common.redis.repositories.live_vehicles import LiveVehiclesRepository
+from app.common.redis.schemas import LiveVehicle, LiveVehicleDelta, LiveVehicleResponse
+
+logger = logging.getLogger(__name__)
+
+_LiveVehicles = dict[str, LiveVehicle]  # license_plate -> vehicle
+
+_HEARTBEAT = b": keep-alive\n\n"
+
+
+def _event(name: str, data: bytes) -> bytes:
+    return b"event: " + name.encode() + b"\ndata: " + data + b"\n\n"
+
+
+def filter_delta(
+    delta: LiveVehicleDelta, before: _LiveVehicles, after: _LiveVehicles, live_filter: LiveFilter
+) -> LiveVehicleDelta | None:
+    """
+    The delta as seen by a client that only holds the vehicles matching the filter: a vehicle that moves into it is
+    added in full, one that moves out of it is removed. None if nothing the client holds changed.
+    """
+    added = [v for v in delta.added if live_filter.matches(v)]
+    moved = []
+    removed = [p for p in delta.removed if p in before and live_filter.matches(before[p])]
+    for vehicle in delta.added:
+        prev = before.get(vehicle.license_plate)
+        if prev is not None and live_filter.matches(prev) and not live_filter.matches(vehicle):
+            removed.append(vehicle.license_plate)
+    for move in delta.moved:
+        plate = move.license_plate
+        was = plate in before and live_filter.matches(before[plate])
+        now = live_filter.matches(after[plate])
+        if was and now:
+            moved.append(move)
+        elif now:
+            added.append(after[plate])
+        elif was:
+            removed.append(plate)
+
+    if not added and not moved and not removed:
+        return None
+    count = sum(1 for v in after.values() if live_filter.matches(v))
+    return LiveVehicleDelta(
+        version=delta.version, since=delta.since, count=count, added=added, moved=moved, removed=removed
+    )
+
+
+class _Subscriber:
+    def __init__(self, live_filter: LiveFilter):
+        self.filter = live_filter
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=LIVE_STREAM_QUEUE_SIZE)
+
+    def send(self, event: bytes) -> bool:
+        """Queue an event. Returns False if the client fell too far behind, after dropping its backlog."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return False
+        return True
+
+
+class LiveBroadcaster:
+    """
+    Fans the poller's live snapshot deltas out to the Server-Sent Events clients of this API worker.
+
+    The worker subscribes once to LIVE_VEHICLES_CHANNEL and keeps the current snapshot in memory, so a new client
+    starts from a full `snapshot` event and then receives one `delta` event per poll, whatever the number of clients.
+    Unfiltered clients get the published bytes as is; filtered ones get a delta re-encoded once per distinct filter.
+    On a version gap (a missed message or a reset counter) or a lost connection the snapshot is reloaded and sent to
+    every client again.
+    """
+
+    def __init__(self, client: redis.asyncio.Redis):
+        self._redis = client
+        self._vehicles: _LiveVehicles = {}
+        self._version = 0
+        self._subscribers: set[_Subscriber] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="live-broadcaster")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def stream(self, live_filter: LiveFilter) -> AsyncIterator[bytes]:
+        """SSE body for one client: the current snapshot, then deltas, with keep-alive comments in between."""
+        subscriber = _Subscriber(live_filter)
+        self._subscribers.add(subscriber)
+        try:
+            yield self._snapshot_event(live_filter)
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), LIVE_STREAM_HEARTBEAT)
+                except TimeoutError:
+                    yield _HEARTBEAT
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(LIVE_VEHICLES_CHANNEL)
+                    # Subscribed first, so no delta after the loaded snapshot is missed
+                    await self._resync()
+                    async for message in pubsub.listen():
+                        await self._on_message(message["data"])
+            except redis.RedisError:
+                logger.warning("Live vehicles subscription lost, will resubscribe", exc_info=True)
+            except Exception:
+                logger.exception("Live vehicles broadcaster failed, will restart")
+            await asyncio.sleep(LIVE_STREAM_RETRY_DELAY)
+
+    async def _on_message(self, data: bytes) -> None:
+        delta = msgspec.json.decode(data, type=LiveVehicleDelta)
+        if delta.version == self._version:
+            return
+        if delta.since != self._version:
+            # Missed a message, or the version went back (the counter was reset) - reload rather than freeze
+            await self._resync()
+            return
+
+        before = self._vehicles
+        after = dict(before)
+        for plate in delta.removed:
+            after.pop(plate, None)
+        for vehicle in delta.added:
+            after[vehicle.license_plate] = vehicle
+        for move in delta.moved:
+            prev = after.get(move.license_plate)
+            if prev is not None:
+                after[move.license_plate] = msgspec.structs.replace(
+                    prev,
+                    latitude=move.latitude,
+                    longitude=move.longitude,
+                    bearing=move.bearing,
+                    timestamp=move.timestamp,
+                )
+        self._vehicles, self._version = after, delta.version
+
+        events: dict[LiveFilter, bytes | None] = {LiveFilter(): _event("delta", data)}
+        for subscriber in list(self._subscribers):
+            if subscriber.filter not in events:
+                filtered = filter_delta(delta, before, after, subscriber.filter)
+                events[subscriber.filter] = None if filtered is None else _event("delta", msgspec.json.encode(filtered))
+            event = events[subscriber.filter]
+            if event is not None and not subscriber.send(event):
+                # Too slow to keep up - it starts over from the current snapshot instead
+                subscriber.send(self._snapshot_event(subscriber.filter))
+
+    async def _resync(self) -> None:
+        data = await asyncio.to_thread(LiveVehiclesRepository(get_client()).get)
+        snapshot = (
+            msgspec.json.decode(data, type=LiveVehicleResponse)
+            if data is not None
+            else LiveVehicleResponse(version=0, count=0, vehicles=[])
+        )
+        self._vehicles = {vehicle.license_plate: vehicle for vehicle in snapshot.vehicles}
+        self._version = snapshot.version
+        events: dict[LiveFilter, bytes] = {}
+        for subscriber in list(self._subscribers):
+            if subscriber.filter not in events:
+                events[subscriber.filter] = self._snapshot_event(subscriber.filter)
+            if not subscriber.send(events[subscriber.filter]):
+                subscriber.send(events[subscriber.filter])
+
+    def _snapshot_event(self, live_filter: LiveFilter) -> bytes:
+        vehicles = [v for v in self._vehicles.values() if live_filter.matches(v)]
+        response = LiveVehicleResponse(version=self._version, count=len(vehicles), vehicles=vehicles)
+        return _event("snapshot", msgspec.json.encode(response))
+
+
+@lru_cache(maxsize=1)
+def get_live_broadcaster() -> LiveBroadcaster:
+    return LiveBroadcaster(get_async_client())
@@ -9,6 +9,7 @@ from app.api.controllers.stats_controller import router as stats_router
 from app.api.controllers.trips_controller import router as trips_router
 from app.api.controllers.vehicles_controller import router as vehicles_router
 from app.api.exceptions import setup_exception_handlers
+from app.api.live_stream import get_live_broadcaster
 from app.api.middleware import setup_middleware
 from app.api.response import MsgspecJSONResponse
 from app.common.db.connection import get_engine
@@ -17,7 +18,9 @@ from app.common.db.connection import get_engine
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     get_engine()
+    get_live_broadcaster().start()
     yield
+    await get_live_broadcaster().stop()
     get_engine().dispose()
 
 
@@ -1,211 +1,232 @@
-from datetime import date
+from datetime import date, timedelta
 from typing import Any
 
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.common.constants import MIN_DELAY_SECONDS
+from app.common.db.repositories.line_daily_stats import LineDailyStatsRepository
+from app.common.db.repositories.rollup_watermark import RollupWatermarkRepository
+from app.common.db.repositories.trip_segments import (
+    SEGMENT_COLUMNS,
+    SUMMARY_COLUMNS,
+    TAIL_SEGMENTS_SQL,
+    TAIL_SUMMARIES_SQL,
+    TripSegmentsRepository,
+)
 
+# Every column the overview query returns, with its SQL type. Each part of the query fills its own columns and leaves
+# the rest NULL - the explicit casts let the UNION ALL branches line up.
+_OVERVIEW_COLUMNS = {
+    "trip_id": "text",
+    "service_date": "date",
+    "line_number": "text",
+    "vehicle_number": "text",
+    "from_stop": "text",
+    "to_stop": "text",
+    "from_sequence": "integer",
+    "to_sequence": "integer",
+    "from_planned_time": "timestamp",
+    "from_event_time": "timestamp",
+    "to_planned_time": "timestamp",
+    "to_event_time": "timestamp",
+    "first_stop": "text",
+    "last_stop": "text",
+    "first_planned_time": "timestamp",
+    "first_event_time": "timestamp",
+    "last_planned_time": "timestamp",
+    "last_event_time": "timestamp",
+    "start_delay_seconds": "integer",
+    "end_delay_seconds": "integer",
+    "delay_generated_seconds": "integer",
+    "headsign": "text",
+    "trips_count": "bigint",
+    "total": "bigint",
+    "on_time": "bigint",
+    "slightly_delayed": "bigint",
+    "delayed": "bigint",
+    "avg_delay_seconds": "numeric",
+}
 
-class StatsRepository:
-    def __init__(self, session: Session):
-        self._session = session
+_SEGMENT_FIELDS = [c.strip() for c in SEGMENT_COLUMNS.split(",")]
+_SUMMARY_FIELDS = [c.strip() for c in SUMMARY_COLUMNS.split(",")]
+_LOCAL_TIMES = [c for c in _OVERVIEW_COLUMNS if c.endswith(("_planned_time", "_event_time"))]
 
-    def max_delay_between_stops(self, line_number: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
-        """Generated delay = delay at stop N+1 - delay at stop N."""
-        result = self._session.execute(
-            text("""
-                WITH filtered AS (
-                    SELECT e.trip_id, e.service_date, e.stop_sequence, e.stop_name, e.headsign,
-                        e.delay_seconds, e.line_number, e.license_plate, e.planned_time, e.event_time,
-                        e.detection_method
-                    FROM stop_events e
-                    WHERE e.line_number = :line_number AND e.service_date BETWEEN :start_date AND :end_date
-                    AND e.stop_sequence > 1
-                    AND e.stop_sequence < e.max_stop_sequence
-                ),
-                consecutive AS (
-                    SELECT trip_id, service_date, stop_sequence, stop_name, headsign, line_number,
-                        license_plate, delay_seconds, planned_time, event_time, detection_method,
-                        delay_seconds - LAG(delay_seconds) OVER w AS generated_delay,
-                        LAG(delay_seconds) OVER w AS prev_delay,
-                        LAG(stop_name) OVER w AS prev_stop_name,
-                        LAG(stop_sequence) OVER w AS prev_stop_sequence,
-                        LAG(planned_time) OVER w AS prev_planned_time,
-                        LAG(event_time) OVER w AS prev_event_time,
-                        LAG(license_plate) OVER w AS prev_license_plate,
-                        LAG(detection_method) OVER w AS prev_detection_method
-                    FROM filtered
-                    WINDOW w AS (PARTITION BY trip_id, service_date ORDER BY stop_sequence)
-                )
-                SELECT trip_id, service_date, line_number, license_plate AS vehicle_number,
-                    prev_stop_name AS from_stop, stop_name AS to_stop,
-                    prev_stop_sequence AS from_sequence, stop_sequence AS to_sequence,
-                    prev_planned_time AT TIME ZONE 'Europe/Warsaw' AS from_planned_time,
-                    prev_event_time AT TIME ZONE 'Europe/Warsaw' AS from_event_time,
-                    planned_time AT TIME ZONE 'Europe/Warsaw' AS to_planned_time,
-                    event_time AT TIME ZONE 'Europe/Warsaw' AS to_event_time,
-                    generated_delay AS delay_generated_seconds, headsign
-                FROM consecutive
-                WHERE generated_delay IS NOT NULL AND prev_delay >= :min_delay
-                AND license_plate = prev_license_plate
-                AND stop_sequence = prev_stop_sequence + 1
-                AND detection_method != 2 AND prev_detection_method != 2
-                ORDER BY generated_delay DESC
-                LIMIT 10
-            """),
-            {
-                "line_number": line_number,
-                "start_date": start_date,
-                "end_date": end_date,
-                "min_delay": MIN_DELAY_SECONDS,
-            },
-        )
-        return [dict(r) for r in result.mappings().all()]
 
-    def trips_count(self, line_number: str, start_date: date, end_date: date) -> int:
-        """Count distinct trips for a line in the given period."""
-        result = self._session.execute(
-            text("""
-                SELECT COUNT(DISTINCT (trip_id, service_date)) FROM stop_events
-                WHERE line_number = :line_number AND service_date BETWEEN :start_date AND :end_date
-            """),
-            {
-                "line_number": line_number,
-                "start_date": start_date,
-                "end_date": end_date,
-            },
-        )
-        return result.scalar() or 0
+def _select(part: str, columns: list[str]) -> str:
+    """SELECT list of one overview part: its name, then every overview column (NULL unless listed)."""
+    values = []
+    for name, sql_type in _OVERVIEW_COLUMNS.items():
+        value = name if name in columns else "NULL"
+        if name in _LOCAL_TIMES and name in columns:
+            value = f"{name} AT TIME ZONE 'Europe/Warsaw'"
+        values.append(f"({value})::{sql_type} AS {name}")
+    return f"'{part}' AS part, " + ", ".join(values)
 
-    def max_route_delay(self, line_number: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
-        """Route delay = delay at second-to-last stop - delay at second stop. Uses only STOPPED_AT events."""
-        result = self._session.execute(
-            text("""
-                WITH filtered AS (
-                    SELECT e.trip_id, e.service_date, e.stop_sequence, e.stop_name, e.headsign,
-                        e.delay_seconds, e.line_number, e.license_plate, e.planned_time, e.event_time,
-                        e.max_stop_sequence
-                    FROM stop_events e
-                    WHERE e.line_number = :line_number AND e.service_date BETWEEN :start_date AND :end_date
-                    AND e.stop_sequence > 1
-                    AND e.stop_sequence < e.max_stop_sequence
-                    AND e.detection_method = 1
-                ),
-                trip_vehicle_check AS (
-                    SELECT trip_id, service_date, COUNT(DISTINCT license_plate) AS vehicle_count
-                    FROM filtered
-                    GROUP BY trip_id, service_date
-                ),
-                boundary_check AS (
-                    SELECT f.trip_id, f.service_date, f.max_stop_sequence,
-                        bool_or(f.stop_sequence = 2) AS has_second,
-                        bool_or(f.stop_sequence = f.max_stop_sequence - 1) AS has_penultimate
-                    FROM filtered f
-                    GROUP BY f.trip_id, f.service_date, f.max_stop_sequence
-                ),
-                valid_trips AS (
-                    SELECT bc.trip_id, bc.service_date
-                    FROM boundary_check bc
-                    JOIN trip_vehicle_check tvc USING (trip_id, service_date)
-                    WHERE bc.has_second AND bc.has_penultimate AND tvc.vehicle_count = 1
-                ),
-                trip_bounds AS (
-                    SELECT f.trip_id, f.service_date, f.headsign, f.line_number, f.license_plate,
-                        FIRST_VALUE(f.stop_name) OVER w AS first_stop,
-                        LAST_VALUE(f.stop_name) OVER w_full AS last_stop,
-                        (FIRST_VALUE(f.planned_time) OVER w) AT TIME ZONE 'Europe/Warsaw' AS first_planned_time,
-                        (FIRST_VALUE(f.event_time) OVER w) AT TIME ZONE 'Europe/Warsaw' AS first_event_time,
-                        (LAST_VALUE(f.planned_time) OVER w_full) AT TIME ZONE 'Europe/Warsaw' AS last_planned_time,
-                        (LAST_VALUE(f.event_time) OVER w_full) AT TIME ZONE 'Europe/Warsaw' AS last_event_time,
-                        FIRST_VALUE(f.delay_seconds) OVER w AS start_delay,
-                        LAST_VALUE(f.delay_seconds) OVER w_full AS end_delay
-                    FROM filtered f
-                    JOIN valid_trips vt USING (trip_id, service_date)
-                    WINDOW w AS (
-                        PARTITION BY f.trip_id, f.service_date
-                        ORDER BY f.stop_sequence
-                    ),
-                    w_full AS (
-                        PARTITION BY f.trip_id, f.service_date
-                        ORDER BY f.stop_sequence
-                        ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
-                    )
-                )
-                SELECT * FROM (
-                    SELECT DISTINCT ON (trip_id, service_date) trip_id, service_date, line_number,
-                        license_plate AS vehicle_number, first_stop, last_stop,
-                        first_planned_time, first_event_time, last_planned_time, last_event_time,
-                        start_delay AS start_delay_seconds, end_delay AS end_delay_seconds,
-                        (end_delay - start_delay) AS delay_generated_seconds, headsign
-                    FROM trip_bounds
-                    WHERE start_delay >= :min_delay
-                    ORDER BY trip_id, service_date, delay_generated_seconds DESC
-                ) ranked
+
+# Everything the stats endpoints report for one line and period, in one statement. The line's raw events after the
+# rollup watermarks are read once into line_tail and every part is computed from it plus the rollup tables; each
+# output row carries the name of the part it belongs to.
+_OVERVIEW_SQL = text(f"""
+    WITH line_tail AS MATERIALIZED (
+        SELECT e.* FROM stop_events e
+        WHERE e.line_number = :line_number AND e.service_date BETWEEN :tail_start AND :end_date
+    ),
+    daily AS (
+        SELECT s.* FROM line_daily_stats s
+        WHERE s.line_number = :line_number AND s.service_date BETWEEN :start_date AND :stats_rolled_end
+    ),
+    intermediate AS (
+        SELECT e.* FROM line_tail e
+        WHERE e.service_date >= :stats_raw_start
+        AND e.stop_sequence > 1
+        AND e.stop_sequence < e.max_stop_sequence
+        AND e.delay_seconds >= :min_delay
+    ),
+    totals AS (
+        -- A trip belongs to a single service date, so per-day distinct counts add up
+        SELECT (
+            SELECT COALESCE(SUM(trips_count), 0) FROM daily
+        ) + (
+            SELECT COUNT(DISTINCT (trip_id, service_date)) FROM line_tail WHERE service_date >= :stats_raw_start
+        ) AS trips_count,
+        (SELECT COALESCE(SUM(punctuality_total), 0) FROM daily) + raw.total AS total,
+        (SELECT COALESCE(SUM(on_time_count), 0) FROM daily) + raw.on_time AS on_time,
+        (SELECT COALESCE(SUM(slightly_delayed_count), 0) FROM daily) + raw.slightly_delayed AS slightly_delayed,
+        (SELECT COALESCE(SUM(delayed_count), 0) FROM daily) + raw.delayed AS delayed
+        FROM (
+            SELECT COUNT(*) AS total,
+                COUNT(*) FILTER (WHERE delay_seconds <= 120) AS on_time,
+                COUNT(*) FILTER (WHERE delay_seconds > 120 AND delay_seconds <= 360) AS slightly_delayed,
+                COUNT(*) FILTER (WHERE delay_seconds > 360) AS delayed
+            FROM intermediate
+            WHERE detection_method = 1
+        ) raw
+    ),
+    trend AS (
+        SELECT service_date, ROUND(delay_sum::numeric / delay_count, 1) AS avg_delay_seconds,
+            delay_trips_count AS trips_count
+        FROM daily
+        WHERE delay_count > 0
+        UNION ALL
+        SELECT service_date, ROUND(AVG(delay_seconds)::numeric, 1) AS avg_delay_seconds,
+            COUNT(DISTINCT trip_id) AS trips_count
+        FROM intermediate
+        GROUP BY service_date
+    ),
+    max_delay AS (
+        SELECT * FROM (
+            (
+                SELECT {SEGMENT_COLUMNS} FROM trip_segments
+                WHERE line_number = :line_number AND service_date BETWEEN :start_date AND :segments_rolled_end
                 ORDER BY delay_generated_seconds DESC
                 LIMIT 10
-            """),
-            {
-                "line_number": line_number,
-                "start_date": start_date,
-                "end_date": end_date,
-                "min_delay": MIN_DELAY_SECONDS,
-            },
-        )
-        return [dict(r) for r in result.mappings().all()]
+            )
+            UNION ALL
+            (
+                SELECT {SEGMENT_COLUMNS} FROM ({TAIL_SEGMENTS_SQL}) raw
+                ORDER BY delay_generated_seconds DESC
+                LIMIT 10
+            )
+        ) top
+        ORDER BY delay_generated_seconds DESC
+        LIMIT 10
+    ),
+    route_delay AS (
+        SELECT * FROM (
+            (
+                SELECT {SUMMARY_COLUMNS} FROM trip_summaries
+                WHERE line_number = :line_number AND service_date BETWEEN :start_date AND :segments_rolled_end
+                ORDER BY delay_generated_seconds DESC
+                LIMIT 10
+            )
+            UNION ALL
+            (
+                SELECT {SUMMARY_COLUMNS} FROM ({TAIL_SUMMARIES_SQL}) raw
+                ORDER BY delay_generated_seconds DESC
+                LIMIT 10
+            )
+        ) top
+        ORDER BY delay_generated_seconds DESC
+        LIMIT 10
+    )
+    SELECT {_select("totals", ["trips_count", "total", "on_time", "slightly_delayed", "delayed"])} FROM totals
+    UNION ALL
+    SELECT {_select("trend", ["service_date", "avg_delay_seconds", "trips_count"])} FROM trend
+    UNION ALL
+    SELECT {_select("max_delay", _SEGMENT_FIELDS)} FROM max_delay
+    UNION ALL
+    SELECT {_select("route_delay", _SUMMARY_FIELDS)} FROM route_delay
+""")
+
+
+class StatsRepository:
+    def __init__(self, session: Session):
+        self._session = session
 
-    def punctuality(self, line_number: str, start_date: date, end_date: date) -> dict[str, Any]:
+    def _split(self, rollup: str, start_date: date, end_date: date) -> tuple[date, date]:
+        """
+        Split the range at the named rollup's watermark. Returns (rolled_end, raw_start): dates up to rolled_end are
+        read from the rollup, dates from raw_start on from stop_events. Either part may be empty.
         """
-        For each stop in [2, n-1] range, classify individually:
-        - on_time: delay <= 120s
-        - slightly_delayed: 120s < delay <= 360s
-        - delayed: delay > 360s
+        watermark = RollupWatermarkRepository(self._session).get(rollup)
+        if watermark is None:
+            return start_date - timedelta(days=1), start_date
+        rolled_end = min(end_date, watermark)
+        return rolled_end, max(start_date, rolled_end + timedelta(days=1))
 
-        Excludes estimated stops (detection_method != 1)
+    def overview(self, line_number: str, start_date: date, end_date: date) -> dict[str, Any]:
         """
+        All stats of a line for the period, computed together. Closed days come from the rollup tables, the days
+        after their watermarks from the raw events, which are scanned once. Returns a dict with:
+        - trips_count: distinct trips
+        - punctuality: total / on_time / slightly_delayed / delayed counts of observed events at stops [2, n-1]
+          (on_time: delay <= 120s, slightly_delayed: 120s < delay <= 360s, delayed: delay > 360s)
+        - trend: average delay and trip count per day, oldest first
+        - max_delay: top 10 generated delays between consecutive stops (delay at stop N+1 - delay at stop N)
+        - route_delay: top 10 trips by delay generated from the second to the second-to-last stop (STOPPED_AT only)
+        Times are in Europe/Warsaw local time.
+        """
+        stats_rolled_end, stats_raw_start = self._split(LineDailyStatsRepository.NAME, start_date, end_date)
+        segments_rolled_end, segments_raw_start = self._split(TripSegmentsRepository.NAME, start_date, end_date)
         result = self._session.execute(
-            text("""
-                SELECT COUNT(*) AS total,
-                    COUNT(*) FILTER (WHERE e.delay_seconds <= 120) AS on_time,
-                    COUNT(*) FILTER (WHERE e.delay_seconds > 120 AND e.delay_seconds <= 360) AS slightly_delayed,
-                    COUNT(*) FILTER (WHERE e.delay_seconds > 360) AS delayed
-                FROM stop_events e
-                WHERE e.line_number = :line_number AND e.service_date BETWEEN :start_date AND :end_date
-                AND e.stop_sequence > 1
-                AND e.stop_sequence < e.max_stop_sequence
-                AND e.delay_seconds >= :min_delay
-                AND e.detection_method = 1
-            """),
+            _OVERVIEW_SQL,
             {
                 "line_number": line_number,
                 "start_date": start_date,
                 "end_date": end_date,
+                "tail_start": min(stats_raw_start, segments_raw_start),
+                "stats_rolled_end": stats_rolled_end,
+                "stats_raw_start": stats_raw_start,
+                "segments_rolled_end": segments_rolled_end,
+                "from_date": segments_raw_start,
+                "to_date": end_date,
                 "min_delay": MIN_DELAY_SECONDS,
             },
         )
-        row = result.mappings().first()
-        return dict(row) if row else {"total": 0, "on_time": 0, "slightly_delayed": 0, "delayed": 0}
 
-    def trend(self, line_number: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
-        """Average delay per day for a line."""
-        result = self._session.execute(
-            text("""
-                SELECT e.service_date AS "date",
-                    ROUND(AVG(e.delay_seconds)::numeric, 1) AS avg_delay_seconds,
-                    COUNT(DISTINCT (e.trip_id, e.service_date)) AS trips_count
-                FROM stop_events e
-                WHERE e.line_number = :line_number AND e.service_date BETWEEN :start_date AND :end_date
-                AND e.stop_sequence > 1
-                AND e.stop_sequence < e.max_stop_sequence
-                AND e.delay_seconds >= :min_delay
-                GROUP BY e.service_date
-                ORDER BY e.service_date
-            """),
-            {
-                "line_number": line_number,
-                "start_date": start_date,
-                "end_date": end_date,
-                "min_delay": MIN_DELAY_SECONDS,
-            },
-        )
-        return [dict(r) for r in result.mappings().all()]
+        # The totals part is an aggregate, so it always returns exactly one row
+        overview: dict[str, Any] = {"trend": [], "max_delay": [], "route_delay": []}
+        for row in result.mappings().all():
+            part = row["part"]
+            if part == "totals":
+                overview["trips_count"] = row["trips_count"]
+                overview["punctuality"] = {k: row[k] for k in ("total", "on_time", "slightly_delayed", "delayed")}
+            elif part == "trend":
+                overview["trend"].append(
+                    {
+                        "date": row["service_date"],
+                        "avg_delay_seconds": row["avg_delay_seconds"],
+                        "trips_count": row["trips_count"],
+                    }
+                )
+            elif part == "max_delay":
+                overview["max_delay"].append({k: row[k] for k in _SEGMENT_FIELDS})
+            else:
+                overview["route_delay"].append({k: row[k] for k in _SUMMARY_FIELDS})
+
+        # UNION ALL does not keep the order of its branches
+        overview["trend"].sort(key=lambda day: day["date"])
+        for top in (overview["max_delay"], overview["route_delay"]):
+            top.sort(key=lambda r: r["delay_generated_seconds"], reverse=True)
+        return overview
@@ -1,9 +1,35 @@
 from typing import Any
 
 import msgspec
+from fastapi import Request
 from fastapi.responses import JSONResponse
 
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = {MSGPACK, "application/x-msgpack"}
+
+# Responses whose body depends on the Accept header, so shared caches keep one copy per format
+VARY_ACCEPT = {"Vary": "Accept"}
+
 
 class MsgspecJSONResponse(JSONResponse):
     def render(self, content: Any) -> bytes:
         return msgspec.json.encode(content)
+
+
+def accepts_msgpack(request: Request) -> bool:
+    """Whether the client explicitly asked for msgpack. JSON stays the default, also for `*/*`."""
+    for media_range in request.headers.get("accept", "").split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        if media_type.lower() in _MSGPACK_TYPES:
+            return all(_quality(param) != 0 for param in params)
+    return False
+
+
+def _quality(param: str) -> float | None:
+    name, _, value = param.partition("=")
+    if name.strip().lower() != "q":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
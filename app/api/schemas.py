@@ -39,6 +39,31 @@ ShapeIdPath = Annotated[
     ),
 ]
 
+SinceVersionQuery = Annotated[
+    int | None,
+    Query(
+        description="Snapshot version the client already has (the `version` of a previous response). "
+        "If it is recent enough, only the changes since then are returned.",
+        ge=0,
+    ),
+]
+
+LineNumbersQuery = Annotated[
+    list[str] | None,
+    Query(
+        alias="line",
+        description="Only vehicles on these lines; repeat the parameter for several, e.g. line=4&line=52",
+    ),
+]
+
+BBoxQuery = Annotated[
+    str | None,
+    Query(
+        description="Only vehicles inside this box, as min_lon,min_lat,max_lon,max_lat, e.g. 19.90,50.04,19.98,50.08",
+        pattern=r"^[^,]+,[^,]+,[^,]+,[^,]+$",
+    ),
+]
+
 TripIdPath = Annotated[
     str,
     Path(
@@ -133,21 +158,15 @@ class TrendResponse(msgspec.Struct):
     days: list[TrendDay]
 
 
-class LiveVehicle(msgspec.Struct):
-    trip_id: str
-    license_plate: str
+class LineOverviewResponse(msgspec.Struct):
     line_number: str
-    headsign: str
-    shape_id: str | None
-    latitude: float
-    longitude: float
-    bearing: float | None
-    timestamp: str
-
-
-class LiveVehicleResponse(msgspec.Struct):
-    count: int
-    vehicles: list[LiveVehicle]
+    start_date: str
+    end_date: str
+    trips_analyzed: int
+    max_delay: MaxDelayBetweenStopsResponse
+    route_delay: RouteDelayResponse
+    punctuality: PunctualityResponse
+    trend: TrendResponse
 
 
 class ShapePoint(msgspec.Struct):
@@ -161,6 +180,16 @@ class ShapeResponse(msgspec.Struct):
     points: list[ShapePoint]
 
 
+class ShapeColumns(msgspec.Struct):
+    """ShapeResponse in columnar form, served as application/msgpack: packed little-endian arrays, point i is row i"""
+
+    shape_id: str
+    count: int
+    latitude: bytes  # float32
+    longitude: bytes  # float32
+    sequence: bytes  # uint32
+
+
 class TripStop(msgspec.Struct):
     stop_id: str
     stop_name: str
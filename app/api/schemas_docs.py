@@ -210,13 +210,26 @@ class TrendResponse(BaseModel):
     )
 
 
+class LineOverviewResponse(BaseModel):
+    line_number: str
+    start_date: str
+    end_date: str
+    trips_analyzed: int
+    max_delay: MaxDelayBetweenStopsResponse
+    route_delay: RouteDelayResponse
+    punctuality: PunctualityResponse
+    trend: TrendResponse
+
+
 class LiveVehicleResponse(BaseModel):
+    version: int
     count: int
     vehicles: list[LiveVehicle]
 
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
+                "version": 18342,
                 "count": 5,
                 "vehicles": [
                     {
@@ -280,6 +293,75 @@ class LiveVehicleResponse(BaseModel):
     )
 
 
+class LiveVehicleMove(BaseModel):
+    license_plate: str
+    latitude: float
+    longitude: float
+    bearing: float | None
+    timestamp: str
+
+
+class LiveVehicleDeltaResponse(BaseModel):
+    version: int
+    since: int
+    count: int
+    added: list[LiveVehicle]
+    moved: list[LiveVehicleMove]
+    removed: list[str]
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "version": 18342,
+                "since": 18340,
+                "count": 412,
+                "added": [
+                    {
+                        "trip_id": "block_675_trip_13_service_2",
+                        "license_plate": "DN007",
+                        "line_number": "179",
+                        "headsign": "Dworzec Główny Zachód",
+                        "shape_id": "shape_1234",
+                        "latitude": 50.0322380065918,
+                        "longitude": 19.94826316833496,
+                        "bearing": 90,
+                        "timestamp": "2026-02-15T17:07:00+00:00",
+                    }
+                ],
+                "moved": [
+                    {
+                        "license_plate": "DN011",
+                        "latitude": 50.04066848754883,
+                        "longitude": 19.874757766723633,
+                        "bearing": 90,
+                        "timestamp": "2026-02-15T17:07:02+00:00",
+                    }
+                ],
+                "removed": ["DN013"],
+            }
+        }
+    )
+
+
+class LiveVehicleColumnsResponse(BaseModel):
+    """msgpack body of `/vehicles/positions` with `Accept: application/msgpack`"""
+
+    version: int
+    count: int
+    trip_id: list[str]
+    license_plate: list[str]
+    lines: list[str]
+    headsigns: list[str]
+    shapes: list[str | None]
+    line: bytes  # uint16
+    headsign: bytes  # uint16
+    shape: bytes  # uint16
+    latitude: bytes  # float32
+    longitude: bytes  # float32
+    bearing: bytes  # float32, NaN if unknown
+    timestamp: bytes  # uint32, seconds since the epoch
+
+
 class ShapePoint(BaseModel):
     latitude: float
     longitude: float
@@ -304,6 +386,16 @@ class ShapeResponse(BaseModel):
     )
 
 
+class ShapeColumnsResponse(BaseModel):
+    """msgpack body of `/shapes/{shape_id}` with `Accept: application/msgpack`"""
+
+    shape_id: str
+    count: int
+    latitude: bytes  # float32
+    longitude: bytes  # float32
+    sequence: bytes  # uint32
+
+
 class TripStop(BaseModel):
     stop_id: str
     stop_name: str
@@ -1,7 +1,8 @@
 import msgspec
+import numpy as np
 from sqlalchemy.orm import Session
 
-from app.api.schemas import ShapePoint, ShapeResponse
+from app.api.schemas import ShapeColumns, ShapePoint, ShapeResponse
 from app.common.db.repositories.gtfs_static import GtfsStaticRepository
 
 
@@ -9,11 +10,22 @@ class ShapesService:
     def __init__(self, db: Session):
         self._static_repo = GtfsStaticRepository(db)
 
-    def get_shape(self, shape_id: str) -> bytes | None:
+    def get_shape(self, shape_id: str, packed: bool = False) -> bytes | None:
+        """The shape as JSON, or as msgpack encoded ShapeColumns if `packed`. None if it does not exist."""
         points = self._static_repo.get_shape_points(shape_id)
         if not points:
             return None
 
+        if packed:
+            columns = ShapeColumns(
+                shape_id=shape_id,
+                count=len(points),
+                latitude=np.array([p.shape_pt_lat for p in points], dtype="<f4").tobytes(),
+                longitude=np.array([p.shape_pt_lon for p in points], dtype="<f4").tobytes(),
+                sequence=np.array([p.shape_pt_sequence for p in points], dtype="<u4").tobytes(),
+            )
+            return msgspec.msgpack.encode(columns)
+
         response = ShapeResponse(
             shape_id=shape_id,
             points=[
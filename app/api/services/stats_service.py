@@ -1,12 +1,14 @@
 from datetime import date
 from typing import Any
 
+import msgspec
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.api import cache
 from app.api.repositories.stats_repository import StatsRepository
 from app.api.schemas import (
+    LineOverviewResponse,
     MaxDelayBetweenStops,
     MaxDelayBetweenStopsResponse,
     PunctualityResponse,
@@ -15,6 +17,7 @@ from app.api.schemas import (
     TrendDay,
     TrendResponse,
 )
+from app.common.db.connection import get_session
 
 
 def _to_str(row: dict[str, Any]) -> dict[str, Any]:
@@ -34,82 +37,83 @@ class StatsService:
         self._repo = StatsRepository(db)
 
     def max_delay_between_stops(self, line_number: str, start_date: date, end_date: date) -> bytes:
-        cached = cache.get_cached("max-delay", line_number, start_date, end_date)
-        if cached is not None:
-            return cached
-
-        trips = self._repo.trips_count(line_number, start_date, end_date)
-        _check_line_exists(trips, line_number, start_date, end_date)
-
-        rows = self._repo.max_delay_between_stops(line_number, start_date, end_date)
-
-        result = MaxDelayBetweenStopsResponse(
-            line_number=line_number,
-            start_date=str(start_date),
-            end_date=str(end_date),
-            max_delay=[MaxDelayBetweenStops(**_to_str(row)) for row in rows],
-            trips_analyzed=trips,
-        )
-        return cache.set_cached("max-delay", line_number, start_date, end_date, result)
+        return self._get("max-delay", line_number, start_date, end_date)
 
     def route_delay(self, line_number: str, start_date: date, end_date: date) -> bytes:
-        cached = cache.get_cached("route-delay", line_number, start_date, end_date)
-        if cached is not None:
-            return cached
-
-        trips = self._repo.trips_count(line_number, start_date, end_date)
-        _check_line_exists(trips, line_number, start_date, end_date)
-
-        rows = self._repo.max_route_delay(line_number, start_date, end_date)
-
-        result = RouteDelayResponse(
-            line_number=line_number,
-            start_date=str(start_date),
-            end_date=str(end_date),
-            max_route_delay=[RouteDelay(**_to_str(row)) for row in rows],
-            trips_analyzed=trips,
-        )
-        return cache.set_cached("route-delay", line_number, start_date, end_date, result)
+        return self._get("route-delay", line_number, start_date, end_date)
 
     def punctuality(self, line_number: str, start_date: date, end_date: date) -> bytes:
-        cached = cache.get_cached("punctuality", line_number, start_date, end_date)
-        if cached is not None:
-            return cached
-
-        trips = self._repo.trips_count(line_number, start_date, end_date)
-        _check_line_exists(trips, line_number, start_date, end_date)
-
-        row = self._repo.punctuality(line_number, start_date, end_date)
-        total = row["total"]
-
-        result = PunctualityResponse(
-            line_number=line_number,
-            start_date=str(start_date),
-            end_date=str(end_date),
-            total_stops=total,
-            on_time_count=row["on_time"],
-            on_time_percent=round(row["on_time"] / total * 100, 1) if total else 0.0,
-            slightly_delayed_count=row["slightly_delayed"],
-            slightly_delayed_percent=round(row["slightly_delayed"] / total * 100, 1) if total else 0.0,
-            delayed_count=row["delayed"],
-            delayed_percent=round(row["delayed"] / total * 100, 1) if total else 0.0,
-        )
-        return cache.set_cached("punctuality", line_number, start_date, end_date, result)
+        return self._get("punctuality", line_number, start_date, end_date)
 
     def trend(self, line_number: str, start_date: date, end_date: date) -> bytes:
-        cached = cache.get_cached("trend", line_number, start_date, end_date)
-        if cached is not None:
-            return cached
-
-        trips = self._repo.trips_count(line_number, start_date, end_date)
-        _check_line_exists(trips, line_number, start_date, end_date)
+        return self._get("trend", line_number, start_date, end_date)
+
+    def overview(self, line_number: str, start_date: date, end_date: date) -> bytes:
+        return self._get("overview", line_number, start_date, end_date)
+
+    def _get(self, endpoint: str, line_number: str, start_date: date, end_date: date) -> bytes:
+        return cache.get_or_compute(
+            endpoint,
+            line_number,
+            start_date,
+            end_date,
+            compute=lambda: _build(self._repo, line_number, start_date, end_date),
+            refresh=lambda: _build_detached(line_number, start_date, end_date),
+        )
 
-        rows = self._repo.trend(line_number, start_date, end_date)
 
-        result = TrendResponse(
-            line_number=line_number,
-            start_date=str(start_date),
-            end_date=str(end_date),
-            days=[TrendDay(**_to_str(r)) for r in rows],
-        )
-        return cache.set_cached("trend", line_number, start_date, end_date, result)
+def _build(repo: StatsRepository, line_number: str, start_date: date, end_date: date) -> dict[str, msgspec.Struct]:
+    """
+    Every stats response for the line and period, built from one overview query and keyed by endpoint, so a miss on
+    one endpoint warms the cache for the others.
+    """
+    overview = repo.overview(line_number, start_date, end_date)
+    trips = overview["trips_count"]
+    _check_line_exists(trips, line_number, start_date, end_date)
+
+    period = {"line_number": line_number, "start_date": str(start_date), "end_date": str(end_date)}
+    punctuality = overview["punctuality"]
+    total = punctuality["total"]
+
+    max_delay = MaxDelayBetweenStopsResponse(
+        **period,
+        max_delay=[MaxDelayBetweenStops(**_to_str(row)) for row in overview["max_delay"]],
+        trips_analyzed=trips,
+    )
+    route_delay = RouteDelayResponse(
+        **period,
+        max_route_delay=[RouteDelay(**_to_str(row)) for row in overview["route_delay"]],
+        trips_analyzed=trips,
+    )
+    punctuality_result = PunctualityResponse(
+        **period,
+        total_stops=total,
+        on_time_count=punctuality["on_time"],
+        on_time_percent=round(punctuality["on_time"] / total * 100, 1) if total else 0.0,
+        slightly_delayed_count=punctuality["slightly_delayed"],
+        slightly_delayed_percent=round(punctuality["slightly_delayed"] / total * 100, 1) if total else 0.0,
+        delayed_count=punctuality["delayed"],
+        delayed_percent=round(punctuality["delayed"] / total * 100, 1) if total else 0.0,
+    )
+    trend = TrendResponse(**period, days=[TrendDay(**_to_str(r)) for r in overview["trend"]])
+
+    return {
+        "max-delay": max_delay,
+        "route-delay": route_delay,
+        "punctuality": punctuality_result,
+        "trend": trend,
+        "overview": LineOverviewResponse(
+            **period,
+            trips_analyzed=trips,
+            max_delay=max_delay,
+            route_delay=route_delay,
+            punctuality=punctuality_result,
+            trend=trend,
+        ),
+    }
+
+
+def _build_detached(line_number: str, start_date: date, end_date: date) -> dict[str, msgspec.Struct]:
+    """_build on its own session, for background refreshes that outlive the request."""
+    with get_session() as session:
+        return _build(StatsRepository(session), line_number, start_date, end_date)
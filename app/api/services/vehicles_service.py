@@ -1,50 +1,34 @@
 import msgspec
-from sqlalchemy.orm import Session
 
-from app.api.cache import get_vehicles_cache, set_vehicles_cache
-from app.api.repositories.vehicles_repository import VehiclesRepository
-from app.api.schemas import LiveVehicle, LiveVehicleResponse
-from app.common.db.repositories.gtfs_static import GtfsStaticRepository
+from app.api.live_filter import LiveFilter
+from app.api.live_index import get_live_index_cache
+from app.common.redis.connection import get_client
+from app.common.redis.repositories.live_vehicles import LiveVehiclesRepository
+from app.common.redis.schemas import LiveVehicleResponse
+from app.common.redis.serializer import encode_live_columns
 
+_EMPTY = msgspec.json.encode(LiveVehicleResponse(version=0, count=0, vehicles=[]))
+_EMPTY_PACKED = encode_live_columns(0, [])
 
-class VehiclesService:
-    def __init__(self, db: Session):
-        self._static_repo = GtfsStaticRepository(db)
-        self._vehicles_repo = VehiclesRepository()
-
-    def get_live_vehicles(self) -> bytes:
-        cached = get_vehicles_cache()
-        if cached is not None:
-            return cached
-
-        positions = self._vehicles_repo.fetch_all_positions()
-        trip_info = self._static_repo.get_all_trip_info()
-
-        vehicles: list[LiveVehicle] = []
-        for vp in positions:
-            if not vp.has_position or not vp.license_plate:
-                continue
 
-            info = trip_info.get(vp.trip_id)
-            if not info:
-                continue
-
-            line_number, headsign, shape_id = info
-
-            vehicles.append(
-                LiveVehicle(
-                    trip_id=vp.trip_id,
-                    license_plate=vp.license_plate,
-                    line_number=line_number,
-                    headsign=headsign,
-                    shape_id=shape_id,
-                    latitude=vp.latitude,  # type: ignore[arg-type]
-                    longitude=vp.longitude,  # type: ignore[arg-type]
-                    bearing=vp.bearing,
-                    timestamp=vp.timestamp.isoformat(),
-                )
-            )
-
-        raw = msgspec.json.encode(LiveVehicleResponse(count=len(vehicles), vehicles=vehicles))
-        set_vehicles_cache(raw)
-        return raw
+class VehiclesService:
+    def __init__(self) -> None:
+        self._live_repo = LiveVehiclesRepository(get_client())
+
+    def get_live_vehicles(self, packed: bool = False, live_filter: LiveFilter = LiveFilter()) -> bytes:
+        """
+        The snapshot published by rt_poller, as is - JSON, or the columnar msgpack encoding if `packed`. Empty if the
+        poller has not written one recently. A filtered one comes from this worker's index of the snapshot.
+        """
+        if not live_filter.is_empty:
+            version = self._live_repo.get_version()
+            if version == 0:
+                return _EMPTY_PACKED if packed else _EMPTY
+            return get_live_index_cache().get(version, live_filter, packed, self._live_repo.get)
+        if packed:
+            return self._live_repo.get_packed() or _EMPTY_PACKED
+        return self._live_repo.get() or _EMPTY
+
+    def get_live_delta(self, since: int) -> bytes | None:
+        """The precomputed JSON delta from version `since`, None if it is no longer kept."""
+        return self._live_repo.get_delta(since)
@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
 
+from app.common.models.enums import Transport
+
 
 def _read_secret_file(env_var: str, default: str = "") -> str:
     file_path = os.getenv(env_var)
@@ -39,10 +41,18 @@ class RedisConfig:
         return f"redis://:{self.password}@{self.host}:{self.port}/{self.db}"
 
 
+@dataclass(frozen=True)
+class TransportConfig:
+    kind: Transport
+    partitions: int  # vehicle positions are split by (agency, license_plate) into this many streams
+
+
 @dataclass(frozen=True)
 class AppConfig:
     database: DatabaseConfig
     redis: RedisConfig
+    transport: TransportConfig
+    writer_workers: int  # stop writer processes, each owning a share of the transport partitions
     timezone: str
     data_dir: Path
 
@@ -58,6 +68,14 @@ def get_config() -> AppConfig:
     if not redis_password:
         raise ValueError("REDIS_PASSWORD must be set")
 
+    partitions = int(os.getenv("VP_PARTITIONS", "1"))
+    if partitions < 1:
+        raise ValueError("VP_PARTITIONS must be >= 1")
+
+    writer_workers = int(os.getenv("STOP_WRITER_WORKERS", "1"))
+    if not 1 <= writer_workers <= partitions:
+        raise ValueError("STOP_WRITER_WORKERS must be between 1 and VP_PARTITIONS")
+
     return AppConfig(
         database=DatabaseConfig(
             host=os.getenv("DB_HOST", "localhost"),
@@ -73,6 +91,11 @@ def get_config() -> AppConfig:
             username=os.getenv("REDIS_USERNAME", "mpk_redis"),
             password=redis_password,
         ),
+        transport=TransportConfig(
+            kind=Transport(os.getenv("VP_TRANSPORT", Transport.PUBSUB.value)),
+            partitions=partitions,
+        ),
+        writer_workers=writer_workers,
         timezone=os.getenv("TZ", "Europe/Warsaw"),
         data_dir=Path(os.getenv("DATA_DIR", "/app/data")),
     )
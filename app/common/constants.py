@@ -1,23 +1,46 @@
 from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+# Local time zone of the feeds - service dates and schedules are in Kraków time
+TZ: ZoneInfo = ZoneInfo("Europe/Warsaw")
 
 # Redis TTLs
 REDIS_SAVED_SEQS_TTL: int = 24 * 60 * 60  # 24h - how long we remember which stop_sequences were already saved
 REDIS_TRIP_UPDATES_TTL: int = 3 * 60 * 60  # 3h - cached TripUpdate predictions
 REDIS_VEHICLE_STATE_TTL: int = 3 * 60 * 60  # 3h - last known vehicle state
+REDIS_LIVE_VEHICLES_TTL: int = 60  # live positions snapshot - dropped if the poller stops refreshing it
 
 # Redis keys
 REDIS_KEY_GTFS_READY: str = "gtfs:ready"
-REDIS_KEY_VEHICLES_CACHE: str = "cache:vehicles:positions"
+REDIS_KEY_LIVE_VEHICLES: str = "live:vehicles"  # poller-built positions snapshot and its deltas, in one hash
+REDIS_KEY_LIVE_VEHICLES_VERSION: str = "live:vehicles:version"  # snapshot version counter, never expires
+REDIS_SCAN_COUNT: int = 500  # keys per SCAN/MGET batch when rehydrating in-process state
+
+# Live vehicle positions
+LIVE_VEHICLES_DELTA_HISTORY: int = 12  # past snapshot versions a delta is kept for (~1 min at a 5s poll interval)
+LIVE_FEED_STALE_AFTER: float = 30.0  # seconds without a successful poll before a feed's vehicles leave the snapshot
+LIVE_STREAM_QUEUE_SIZE: int = 8  # events buffered per stream client - a client that falls further behind is resynced
+LIVE_STREAM_HEARTBEAT: float = 15.0  # seconds of silence before a keep-alive comment is sent to stream clients
+LIVE_STREAM_RETRY_DELAY: float = 2.0  # seconds before an API worker resubscribes after losing Redis
+LIVE_GRID_CELL: float = 0.01  # degrees - grid cell size of the live positions bbox index (~1.1 x 0.7 km in Kraków)
+LIVE_FILTER_CACHE_SIZE: int = 256  # filtered live positions responses kept per API worker for the current version
 
 # Redis Pub/Sub channels
 VEHICLE_POSITIONS_CHANNEL: str = "vehicle_positions"
+GTFS_STATIC_UPDATED_CHANNEL: str = "gtfs_static_updated"  # importer -> consumers of static indexes
+LIVE_VEHICLES_CHANNEL: str = "live_vehicles"  # poller -> API workers, each live snapshot delta
 
-# In-memory cache limits (detector + publisher)
-CACHE_MAX_TRIPS: int = 5000
-CACHE_MAX_STOPS: int = 5000
-CACHE_MAX_STOP_TIMES: int = 2000
-CACHE_MAX_SEQUENCES: int = 5000
-CACHE_MAX_STOP_ID_TO_SEQ: int = 5000
+# Redis Streams (alternative vehicle positions transport)
+VEHICLE_POSITIONS_STREAM: str = "vp_stream"  # one stream per partition: vp_stream:{partition}
+STREAM_MAXLEN: int = 10_000  # entries kept per partition (~1 entry per feed per poll, i.e. a few hours of replay)
+STREAM_GROUP: str = "stop_writer"
+STREAM_CONSUMER: str = "stop_writer"  # partitions are owned by exactly one writer, so the name can be fixed
+STREAM_READ_COUNT: int = 16  # entries fetched per XREADGROUP call
+
+# GTFS static snapshot (detector, publisher)
+SNAPSHOT_FETCH_SIZE: int = 50_000  # stop_times rows streamed per round trip while building a snapshot
+SNAPSHOT_CHECK_INTERVAL: timedelta = timedelta(seconds=60)  # fallback gtfs_meta poll if a notification is missed
+SNAPSHOT_RELOAD_DEBOUNCE: float = 2.0  # seconds to wait for further notifications before rebuilding
 
 # GTFS readiness
 GTFS_READINESS_TIMEOUT: int = 180  # seconds to wait for GTFS static data before giving up
@@ -29,15 +52,34 @@ DB_MAX_OVERFLOW: int = 10
 
 # RT Poller
 POLL_INTERVAL_SECONDS: int = 5
+FEED_FETCH_TIMEOUT: float = 4.0  # per-feed deadline, kept below the poll interval so one slow feed can't stall a cycle
+HTTP_POOL_SIZE: int = 6  # keep-alive connections - one per realtime .pb URL
+TRIP_UPDATES_RESYNC_SECONDS: int = 10 * 60  # rewrite every cached trip update, not just the changed ones
 
 # Stop Writer (batch persistence)
 WRITER_BATCH_SIZE: int = 100
 WRITER_FLUSH_INTERVAL: timedelta = timedelta(seconds=10)
+WRITER_QUEUE_SIZE: int = 2  # sealed batches waiting for the flush worker before the reader blocks
+WRITER_MAX_ATTEMPTS: int = 5  # attempts per batch before it is given up on
+WRITER_RETRY_BACKOFF: float = 0.5  # seconds before the first retry, doubled on every further attempt
+WRITER_RETRY_BACKOFF_MAX: float = 30.0
+JOURNAL_SEGMENT_MAX_BYTES: int = 8 * 1024 * 1024  # spill journal segment size before rotation
+JOURNAL_MAX_BYTES: int = 512 * 1024 * 1024  # oldest segments are dropped beyond this
+JOURNAL_REPLAY_INTERVAL: float = 30.0  # seconds between attempts to drain the spill journal
+SUPERVISOR_CHECK_INTERVAL: float = 5.0  # seconds between worker liveness checks in multi-process mode
+SUPERVISOR_SHUTDOWN_TIMEOUT: float = 30.0  # seconds a worker gets to flush after SIGTERM
 SUBSCRIBER_TIMEOUT: float = 1.0
+COPY_MIN_BATCH_SIZE: int = 50  # batches at least this large go through binary COPY instead of a multi-row INSERT
+STATE_FLUSH_INTERVAL: timedelta = timedelta(seconds=5)  # write-behind of in-process detector state to Redis
 
 # Importer
 IMPORT_CYCLE_SLEEP: int = 3600  # 1 hour between GTFS static imports
 
+# Daily rollups (run by the importer after each import cycle)
+ROLLUP_CLOSE_DELAY: timedelta = timedelta(hours=30)  # a service date is final this long after its midnight
+ROLLUP_LOOKBACK_DAYS: int = 3  # closed days re-aggregated on every run, to pick up late writes (e.g. a replayed spill)
+ROLLUP_CHUNK_DAYS: int = 31  # days aggregated per transaction when backfilling
+
 # Protobuf parsing
 PB_MIN_PAYLOAD_BYTES: int = 10  # minimum bytes to consider a .pb feed valid
 
@@ -51,7 +93,11 @@ MIN_DELAY_SECONDS: int = -90  # stops with delay below this are treated as garba
 DEFAULT_TTL: int = 90
 LONG_TTL: int = 600
 LONG_TTL_THRESHOLD_DAYS: int = 7
-VEHICLES_CACHE_TTL: int = 2  # seconds - live vehicle positions cache
+CACHE_STALE_FACTOR: int = 2  # stats entries are kept, and served stale while refreshed, up to this multiple of the TTL
+CACHE_LOCK_TTL: int = 30  # seconds - recompute lock per stats key, also the longest another worker waits on it
+CACHE_LOCK_POLL_INTERVAL: float = 0.05  # seconds between checks while waiting for another worker's result
+CACHE_XFETCH_BETA: float = 1.0  # >1 refreshes earlier ahead of expiry, <1 later
+CACHE_REFRESH_WORKERS: int = 2  # background refresh threads per API worker
 
 # API dates filter
 MAX_DATE_RANGE_DAYS: int = 365
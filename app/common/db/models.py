@@ -138,3 +138,86 @@ class StopEventModel(Base):
     static_hash: Mapped[str] = mapped_column(Text, nullable=False)
     max_stop_sequence: Mapped[int | None] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=text("now()"))
+
+
+class LineDailyStats(Base):
+    """Per-line, per-service-date aggregates of stop_events, rolled up once a service date is closed."""
+
+    __tablename__ = "line_daily_stats"
+
+    line_number: Mapped[str] = mapped_column(Text, primary_key=True)
+    service_date: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    trips_count: Mapped[int] = mapped_column(Integer, nullable=False)  # distinct trips with any event
+    # Punctuality: observed (STOPPED_AT) events at intermediate stops
+    punctuality_total: Mapped[int] = mapped_column(Integer, nullable=False)
+    on_time_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    slightly_delayed_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    delayed_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Trend: all events at intermediate stops
+    delay_sum: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    delay_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    delay_trips_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+
+
+class RollupWatermark(Base):
+    """Last service date a rollup table is complete for - later dates are read from the raw events."""
+
+    __tablename__ = "rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(Text, primary_key=True)
+    rolled_up_through: Mapped[date] = mapped_column(Date, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+
+
+class TripSegment(Base):
+    """Generated delay between two consecutive intermediate stops of a trip, for closed service dates."""
+
+    __tablename__ = "trip_segments"
+
+    trip_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    service_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    to_sequence: Mapped[int] = mapped_column(Integer, primary_key=True)
+    from_sequence: Mapped[int] = mapped_column(Integer, nullable=False)
+    line_number: Mapped[str] = mapped_column(Text, nullable=False)
+    vehicle_number: Mapped[str | None] = mapped_column(Text, nullable=True)
+    from_stop: Mapped[str] = mapped_column(Text, nullable=False)
+    to_stop: Mapped[str] = mapped_column(Text, nullable=False)
+    from_planned_time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    from_event_time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    to_planned_time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    to_event_time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    delay_generated_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    headsign: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("idx_trip_segments_line_delay", "line_number", text("delay_generated_seconds DESC")),
+        Index("idx_trip_segments_date", "service_date"),
+    )
+
+
+class TripSummary(Base):
+    """Route delay of a trip (second stop to second-to-last stop), for closed service dates."""
+
+    __tablename__ = "trip_summaries"
+
+    trip_id: Mapped[str] = mapped_column(Text, primary_key=True)
+    service_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    line_number: Mapped[str] = mapped_column(Text, nullable=False)
+    vehicle_number: Mapped[str | None] = mapped_column(Text, nullable=True)
+    first_stop: Mapped[str] = mapped_column(Text, nullable=False)
+    last_stop: Mapped[str] = mapped_column(Text, nullable=False)
+    first_planned_time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    first_event_time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    last_planned_time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    last_event_time: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    start_delay_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    end_delay_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    delay_generated_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    headsign: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("idx_trip_summaries_line_delay", "line_number", text("delay_generated_seconds DESC")),
+        Index("idx_trip_summaries_date", "service_date"),
+    )
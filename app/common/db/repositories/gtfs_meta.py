@@ -1,5 +1,6 @@
 from datetime import UTC, datetime
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.common.db.models import GtfsMeta
@@ -14,6 +15,9 @@ class GtfsMetaRepository:
         meta = self._session.get(GtfsMeta, agency.value)
         return meta.current_hash if meta else None
 
+    def get_all_hashes(self) -> dict[Agency, str]:
+        return {Agency(meta.agency): meta.current_hash for meta in self._session.scalars(select(GtfsMeta))}
+
     def set_current_hash(self, agency: Agency, hash_value: str) -> None:
         meta = self._session.get(GtfsMeta, agency.value)
 
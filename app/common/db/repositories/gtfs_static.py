@@ -1,7 +1,10 @@
+from collections.abc import Iterator
+
 from sqlalchemy import Row, func, select
 from sqlalchemy.orm import Session, joinedload
 
-from app.common.db.models import CurrentShape, CurrentStop, CurrentStopTime, CurrentTrip
+from app.common.constants import SNAPSHOT_FETCH_SIZE
+from app.common.db.models import CurrentRoute, CurrentShape, CurrentStop, CurrentStopTime, CurrentTrip
 
 
 class GtfsStaticRepository:
@@ -28,11 +31,6 @@ class GtfsStaticRepository:
         stop_times = self.get_stop_times_for_trip(trip_id)
         return {st.stop_id: st.stop_sequence for st in stop_times}
 
-    def get_all_trip_info(self) -> dict[str, tuple[str, str, str | None]]:
-        stmt = select(CurrentTrip).options(joinedload(CurrentTrip.route))
-        trips = self._session.scalars(stmt).unique().all()
-        return {t.trip_id: (t.route.route_short_name, t.headsign or "", t.shape_id) for t in trips}
-
     def get_shape_points(self, shape_id: str) -> list[CurrentShape]:
         stmt = select(CurrentShape).where(CurrentShape.shape_id == shape_id).order_by(CurrentShape.shape_pt_sequence)
         return list(self._session.scalars(stmt).all())
@@ -45,3 +43,33 @@ class GtfsStaticRepository:
             .order_by(CurrentStopTime.stop_sequence)
         )
         return list(self._session.execute(stmt).all())
+
+    def get_all_trip_rows(self) -> list[Row[tuple[str, str, int | None, str | None, str | None]]]:
+        """(trip_id, route_short_name, direction_id, headsign, shape_id) for every trip, in one query."""
+        stmt = select(
+            CurrentTrip.trip_id,
+            CurrentRoute.route_short_name,
+            CurrentTrip.direction_id,
+            CurrentTrip.headsign,
+            CurrentTrip.shape_id,
+        ).join(CurrentRoute, CurrentTrip.route_id == CurrentRoute.route_id)
+        return list(self._session.execute(stmt).all())
+
+    def get_all_stop_rows(self) -> list[Row[tuple[str, str, str | None]]]:
+        """(stop_id, stop_name, stop_desc) for every stop, in one query."""
+        stmt = select(CurrentStop.stop_id, CurrentStop.stop_name, CurrentStop.stop_desc)
+        return list(self._session.execute(stmt).all())
+
+    def iter_all_stop_time_rows(self) -> Iterator[Row[tuple[str, int, str, int]]]:
+        """(trip_id, stop_sequence, stop_id, arrival_seconds) for every stop time, grouped by trip and ordered."""
+        stmt = (
+            select(
+                CurrentStopTime.trip_id,
+                CurrentStopTime.stop_sequence,
+                CurrentStopTime.stop_id,
+                CurrentStopTime.arrival_seconds,
+            )
+            .order_by(CurrentStopTime.trip_id, CurrentStopTime.stop_sequence)
+            .execution_options(yield_per=SNAPSHOT_FETCH_SIZE)
+        )
+        return iter(self._session.execute(stmt))
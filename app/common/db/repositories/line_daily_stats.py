@@ -0,0 +1,60 @@
+from datetime import date
+from typing import ClassVar
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.common.constants import MIN_DELAY_SECONDS
+
+# The filters mirror the raw-event stats queries in the API's StatsRepository - keep them in sync
+_ROLLUP = text("""
+    WITH flagged AS (
+        SELECT e.line_number, e.service_date, e.trip_id, e.delay_seconds,
+            (e.stop_sequence > 1 AND e.stop_sequence < e.max_stop_sequence
+                AND e.delay_seconds >= :min_delay) AS intermediate,
+            e.detection_method = 1 AS observed
+        FROM stop_events e
+        WHERE e.service_date BETWEEN :start_date AND :end_date
+    )
+    INSERT INTO line_daily_stats (
+        line_number, service_date, trips_count,
+        punctuality_total, on_time_count, slightly_delayed_count, delayed_count,
+        delay_sum, delay_count, delay_trips_count, updated_at
+    )
+    SELECT line_number, service_date,
+        COUNT(DISTINCT trip_id),
+        COUNT(*) FILTER (WHERE intermediate AND observed),
+        COUNT(*) FILTER (WHERE intermediate AND observed AND delay_seconds <= 120),
+        COUNT(*) FILTER (WHERE intermediate AND observed AND delay_seconds > 120 AND delay_seconds <= 360),
+        COUNT(*) FILTER (WHERE intermediate AND observed AND delay_seconds > 360),
+        COALESCE(SUM(delay_seconds) FILTER (WHERE intermediate), 0),
+        COUNT(*) FILTER (WHERE intermediate),
+        COUNT(DISTINCT trip_id) FILTER (WHERE intermediate),
+        now()
+    FROM flagged
+    GROUP BY line_number, service_date
+    ON CONFLICT (line_number, service_date) DO UPDATE SET
+        trips_count = EXCLUDED.trips_count,
+        punctuality_total = EXCLUDED.punctuality_total,
+        on_time_count = EXCLUDED.on_time_count,
+        slightly_delayed_count = EXCLUDED.slightly_delayed_count,
+        delayed_count = EXCLUDED.delayed_count,
+        delay_sum = EXCLUDED.delay_sum,
+        delay_count = EXCLUDED.delay_count,
+        delay_trips_count = EXCLUDED.delay_trips_count,
+        updated_at = EXCLUDED.updated_at
+""")
+
+
+class LineDailyStatsRepository:
+    NAME: ClassVar[str] = "line_daily_stats"
+
+    def __init__(self, session: Session):
+        self._session = session
+
+    def rollup(self, start_date: date, end_date: date) -> int:
+        """(Re)aggregate every line for the service dates in range. Idempotent. Returns the number of rows upserted."""
+        result = self._session.execute(
+            _ROLLUP, {"start_date": start_date, "end_date": end_date, "min_delay": MIN_DELAY_SECONDS}
+        )
+        return result.rowcount  # type: ignore[attr-defined, no-any-return]
@@ -0,0 +1,25 @@
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.common.db.models import RollupWatermark
+
+
+class RollupWatermarkRepository:
+    def __init__(self, session: Session):
+        self._session = session
+
+    def get(self, name: str) -> date | None:
+        """Last service date the named rollup is complete for."""
+        watermark = self._session.get(RollupWatermark, name)
+        return watermark.rolled_up_through if watermark else None
+
+    def set(self, name: str, rolled_up_through: date) -> None:
+        stmt = insert(RollupWatermark).values(name=name, rolled_up_through=rolled_up_through)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"rolled_up_through": stmt.excluded.rolled_up_through, "updated_at": text("now()")},
+        )
+        self._session.execute(stmt)
@@ -1,46 +1,122 @@
+from contextlib import closing
+from datetime import date
+from typing import Any
+
+from psycopg import sql
+from sqlalchemy import func, select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
+from app.common.constants import COPY_MIN_BATCH_SIZE
 from app.common.db.models import StopEventModel
 from app.common.models.events import StopEvent
 
+_STAGING_TABLE = "stop_events_staging"
+
+# Column order shared by the multi-row INSERT dicts and the binary COPY tuples, with the Postgres type of each
+_COLUMNS: list[tuple[str, str]] = [
+    ("agency", "text"),
+    ("trip_id", "text"),
+    ("service_date", "date"),
+    ("stop_sequence", "int4"),
+    ("stop_id", "text"),
+    ("line_number", "text"),
+    ("stop_name", "text"),
+    ("stop_desc", "text"),
+    ("direction_id", "int2"),
+    ("headsign", "text"),
+    ("planned_time", "timestamptz"),
+    ("event_time", "timestamptz"),
+    ("delay_seconds", "int4"),
+    ("vehicle_id", "text"),
+    ("license_plate", "text"),
+    ("detection_method", "int2"),
+    ("is_estimated", "bool"),
+    ("static_hash", "text"),
+    ("max_stop_sequence", "int4"),
+]
+_COLUMN_NAMES = [name for name, _ in _COLUMNS]
+_COLUMN_TYPES = [pg_type for _, pg_type in _COLUMNS]
+_COLUMN_LIST = sql.SQL(", ").join(map(sql.Identifier, _COLUMN_NAMES))
+
+_CREATE_STAGING = sql.SQL(
+    "CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS AS SELECT {columns} FROM stop_events WITH NO DATA"
+).format(staging=sql.Identifier(_STAGING_TABLE), columns=_COLUMN_LIST)
+
+_COPY_STAGING = sql.SQL("COPY {staging} ({columns}) FROM STDIN (FORMAT BINARY)").format(
+    staging=sql.Identifier(_STAGING_TABLE), columns=_COLUMN_LIST
+)
+
+_MERGE_STAGING = sql.SQL(
+    "INSERT INTO stop_events ({columns}) SELECT {columns} FROM {staging} "
+    "ON CONFLICT (trip_id, service_date, stop_sequence) DO NOTHING"
+).format(staging=sql.Identifier(_STAGING_TABLE), columns=_COLUMN_LIST)
+
+
+def _to_row(event: StopEvent) -> tuple[Any, ...]:
+    return (
+        event.agency.value,
+        event.trip_id,
+        event.service_date,
+        event.stop_sequence,
+        event.stop_id,
+        event.line_number,
+        event.stop_name,
+        event.stop_desc,
+        event.direction_id,
+        event.headsign,
+        event.planned_time,
+        event.event_time,
+        event.delay_seconds,
+        event.vehicle_id,
+        event.license_plate,
+        event.detection_method.value,
+        event.is_estimated,
+        event.static_hash,
+        event.max_stop_sequence,
+    )
+
 
 class StopEventRepository:
     def __init__(self, session: Session) -> None:
         self._session = session
 
     def insert_batch(self, events: list[StopEvent]) -> int:
-        rows = []
-        for event in events:
-            rows.append(
-                {
-                    "agency": event.agency.value,
-                    "trip_id": event.trip_id,
-                    "service_date": event.service_date,
-                    "stop_sequence": event.stop_sequence,
-                    "stop_id": event.stop_id,
-                    "line_number": event.line_number,
-                    "stop_name": event.stop_name,
-                    "stop_desc": event.stop_desc,
-                    "direction_id": event.direction_id,
-                    "headsign": event.headsign,
-                    "planned_time": event.planned_time,
-                    "event_time": event.event_time,
-                    "delay_seconds": event.delay_seconds,
-                    "vehicle_id": event.vehicle_id,
-                    "license_plate": event.license_plate,
-                    "detection_method": event.detection_method.value,
-                    "is_estimated": event.is_estimated,
-                    "static_hash": event.static_hash,
-                    "max_stop_sequence": event.max_stop_sequence,
-                }
-            )
-
-        if not rows:
+        if not events:
             return 0
+        if len(events) >= COPY_MIN_BATCH_SIZE:
+            return self._copy_batch(events)
+
+        rows = [dict(zip(_COLUMN_NAMES, _to_row(event), strict=True)) for event in events]
 
         stmt = insert(StopEventModel).values(rows)
         stmt = stmt.on_conflict_do_nothing(index_elements=["trip_id", "service_date", "stop_sequence"])
 
         self._session.execute(stmt)
         return len(rows)
+
+    def first_service_date(self) -> date | None:
+        return self._session.execute(select(func.min(StopEventModel.service_date))).scalar()
+
+    def _copy_batch(self, events: list[StopEvent]) -> int:
+        """
+        Stream events through binary COPY into a session-local staging table, then merge them into the partitioned
+        stop_events with a single INSERT ... SELECT ON CONFLICT DO NOTHING. Skips SQL compilation and per-parameter
+        binding entirely, which dominates the multi-row INSERT on large catch-up batches. The staging table empties
+        itself on commit (or rollback), so it never needs cleaning up.
+        """
+        raw_conn = self._session.connection().connection.dbapi_connection
+        if raw_conn is None:
+            raise RuntimeError("No database connection available")
+
+        # closing() because the DBAPI cursor type SQLAlchemy exposes is not declared as a context manager
+        with closing(raw_conn.cursor()) as cursor:
+            cursor.execute(_CREATE_STAGING)
+
+            with cursor.copy(_COPY_STAGING) as copy:
+                copy.set_types(_COLUMN_TYPES)
+                for event in events:
+                    copy.write_row(_to_row(event))
+
+            cursor.execute(_MERGE_STAGING)
+        return len(events)
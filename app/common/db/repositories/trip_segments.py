@@ -0,0 +1,164 @@
+from datetime import date
+from typing import ClassVar
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.common.constants import MIN_DELAY_SECONDS
+
+SEGMENT_COLUMNS = (
+    "trip_id, service_date, line_number, vehicle_number, from_stop, to_stop, from_sequence, to_sequence, "
+    "from_planned_time, from_event_time, to_planned_time, to_event_time, delay_generated_seconds, headsign"
+)
+SUMMARY_COLUMNS = (
+    "trip_id, service_date, line_number, vehicle_number, first_stop, last_stop, "
+    "first_planned_time, first_event_time, last_planned_time, last_event_time, "
+    "start_delay_seconds, end_delay_seconds, delay_generated_seconds, headsign"
+)
+
+
+def _segments_sql(events: str = "stop_events") -> str:
+    """
+    Generated delay between consecutive intermediate stops (delay at stop N+1 - delay at stop N), for service dates
+    in [:from_date, :to_date]. Only segments served by one vehicle and not involving TIMEOUT events are kept.
+    `events` names the relation to read - stop_events, or a CTE with the same columns.
+    """
+    return f"""
+        WITH filtered AS (
+            SELECT e.trip_id, e.service_date, e.stop_sequence, e.stop_name, e.headsign,
+                e.delay_seconds, e.line_number, e.license_plate, e.planned_time, e.event_time,
+                e.detection_method
+            FROM {events} e
+            WHERE e.service_date BETWEEN :from_date AND :to_date
+            AND e.stop_sequence > 1
+            AND e.stop_sequence < e.max_stop_sequence
+        ),
+        consecutive AS (
+            SELECT trip_id, service_date, stop_sequence, stop_name, headsign, line_number,
+                license_plate, delay_seconds, planned_time, event_time, detection_method,
+                delay_seconds - LAG(delay_seconds) OVER w AS generated_delay,
+                LAG(delay_seconds) OVER w AS prev_delay,
+                LAG(stop_name) OVER w AS prev_stop_name,
+                LAG(stop_sequence) OVER w AS prev_stop_sequence,
+                LAG(planned_time) OVER w AS prev_planned_time,
+                LAG(event_time) OVER w AS prev_event_time,
+                LAG(license_plate) OVER w AS prev_license_plate,
+                LAG(detection_method) OVER w AS prev_detection_method
+            FROM filtered
+            WINDOW w AS (PARTITION BY trip_id, service_date ORDER BY stop_sequence)
+        )
+        SELECT trip_id, service_date, line_number, license_plate AS vehicle_number,
+            prev_stop_name AS from_stop, stop_name AS to_stop,
+            prev_stop_sequence AS from_sequence, stop_sequence AS to_sequence,
+            prev_planned_time AS from_planned_time, prev_event_time AS from_event_time,
+            planned_time AS to_planned_time, event_time AS to_event_time,
+            generated_delay AS delay_generated_seconds, headsign
+        FROM consecutive
+        WHERE generated_delay IS NOT NULL AND prev_delay >= :min_delay
+        AND license_plate = prev_license_plate
+        AND stop_sequence = prev_stop_sequence + 1
+        AND detection_method != 2 AND prev_detection_method != 2
+    """
+
+
+def _summaries_sql(events: str = "stop_events") -> str:
+    """
+    Route delay per trip (delay at second-to-last stop - delay at second stop), for service dates in
+    [:from_date, :to_date]. Uses only STOPPED_AT events of trips served by one vehicle and observed at both ends.
+    `events` is the relation to read, as in _segments_sql.
+    """
+    return f"""
+        WITH filtered AS (
+            SELECT e.trip_id, e.service_date, e.stop_sequence, e.stop_name, e.headsign,
+                e.delay_seconds, e.line_number, e.license_plate, e.planned_time, e.event_time,
+                e.max_stop_sequence
+            FROM {events} e
+            WHERE e.service_date BETWEEN :from_date AND :to_date
+            AND e.stop_sequence > 1
+            AND e.stop_sequence < e.max_stop_sequence
+            AND e.detection_method = 1
+        ),
+        trip_vehicle_check AS (
+            SELECT trip_id, service_date, COUNT(DISTINCT license_plate) AS vehicle_count
+            FROM filtered
+            GROUP BY trip_id, service_date
+        ),
+        boundary_check AS (
+            SELECT f.trip_id, f.service_date, f.max_stop_sequence,
+                bool_or(f.stop_sequence = 2) AS has_second,
+                bool_or(f.stop_sequence = f.max_stop_sequence - 1) AS has_penultimate
+            FROM filtered f
+            GROUP BY f.trip_id, f.service_date, f.max_stop_sequence
+        ),
+        valid_trips AS (
+            SELECT bc.trip_id, bc.service_date
+            FROM boundary_check bc
+            JOIN trip_vehicle_check tvc USING (trip_id, service_date)
+            WHERE bc.has_second AND bc.has_penultimate AND tvc.vehicle_count = 1
+        ),
+        trip_bounds AS (
+            SELECT f.trip_id, f.service_date, f.headsign, f.line_number, f.license_plate,
+                FIRST_VALUE(f.stop_name) OVER w AS first_stop,
+                LAST_VALUE(f.stop_name) OVER w_full AS last_stop,
+                FIRST_VALUE(f.planned_time) OVER w AS first_planned_time,
+                FIRST_VALUE(f.event_time) OVER w AS first_event_time,
+                LAST_VALUE(f.planned_time) OVER w_full AS last_planned_time,
+                LAST_VALUE(f.event_time) OVER w_full AS last_event_time,
+                FIRST_VALUE(f.delay_seconds) OVER w AS start_delay,
+                LAST_VALUE(f.delay_seconds) OVER w_full AS end_delay
+            FROM filtered f
+            JOIN valid_trips vt USING (trip_id, service_date)
+            WINDOW w AS (
+                PARTITION BY f.trip_id, f.service_date
+                ORDER BY f.stop_sequence
+            ),
+            w_full AS (
+                PARTITION BY f.trip_id, f.service_date
+                ORDER BY f.stop_sequence
+                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+            )
+        )
+        SELECT DISTINCT ON (trip_id, service_date) trip_id, service_date, line_number,
+            license_plate AS vehicle_number, first_stop, last_stop,
+            first_planned_time, first_event_time, last_planned_time, last_event_time,
+            start_delay AS start_delay_seconds, end_delay AS end_delay_seconds,
+            (end_delay - start_delay) AS delay_generated_seconds, headsign
+        FROM trip_bounds
+        WHERE start_delay >= :min_delay
+        ORDER BY trip_id, service_date, delay_generated_seconds DESC
+    """
+
+
+# Variants over a `line_tail` CTE holding one line's raw events, used by the API for the service dates that are not
+# rolled up yet
+TAIL_SEGMENTS_SQL = _segments_sql("line_tail")
+TAIL_SUMMARIES_SQL = _summaries_sql("line_tail")
+
+_ROLLUP_SEGMENTS = text(f"""
+    INSERT INTO trip_segments ({SEGMENT_COLUMNS})
+    SELECT {SEGMENT_COLUMNS} FROM ({_segments_sql()}) s
+""")
+_ROLLUP_SUMMARIES = text(f"""
+    INSERT INTO trip_summaries ({SUMMARY_COLUMNS})
+    SELECT {SUMMARY_COLUMNS} FROM ({_summaries_sql()}) s
+""")
+
+
+class TripSegmentsRepository:
+    """Per-trip derived delays (trip_segments and trip_summaries), filled once a service date is closed."""
+
+    NAME: ClassVar[str] = "trip_segments"
+
+    def __init__(self, session: Session):
+        self._session = session
+
+    def rollup(self, start_date: date, end_date: date) -> int:
+        """(Re)build both tables for the service dates in range. Idempotent. Returns the number of rows inserted."""
+        params = {"from_date": start_date, "to_date": end_date, "min_delay": MIN_DELAY_SECONDS}
+        for table in ("trip_segments", "trip_summaries"):
+            self._session.execute(
+                text(f"DELETE FROM {table} WHERE service_date BETWEEN :from_date AND :to_date"), params
+            )
+        segments = self._session.execute(_ROLLUP_SEGMENTS, params)
+        summaries = self._session.execute(_ROLLUP_SUMMARIES, params)
+        return segments.rowcount + summaries.rowcount  # type: ignore[attr-defined, no-any-return]
@@ -1,30 +1,115 @@
 import logging
+import math
+import sys
 from datetime import UTC, datetime
 
+import numpy as np
 from google.transit import gtfs_realtime_pb2
 
 from app.common.constants import PB_MIN_PAYLOAD_BYTES
 from app.common.feeds import FeedConfig
 from app.common.models.enums import VehicleStatus
-from app.common.models.gtfs_realtime import StopTimeUpdate, TripUpdate, VehiclePosition
+from app.common.models.gtfs_realtime import StopTimeUpdate, TripUpdate, VehiclePosition, VehiclePositionBatch
 
 logger = logging.getLogger(__name__)
 
+_FEED_HEADER_TAG = 0x0A  # FeedMessage.header: field 1, wire type 2 (length-delimited)
+_VALID_STATUSES = frozenset(status.value for status in VehicleStatus)
+
+
+def read_header_timestamp(pb_data: bytes) -> int | None:
+    """
+    Read FeedHeader.timestamp without parsing the feed entities.
+
+    Protobuf serializers write fields in field-number order, so the header is the first record of the payload.
+    Returns None when the payload does not start with a header or the header has no timestamp.
+    """
+    if len(pb_data) < 2 or pb_data[0] != _FEED_HEADER_TAG:
+        return None
+
+    length = 0
+    shift = 0
+    pos = 1
+    while True:
+        if pos >= len(pb_data) or shift > 28:
+            return None
+        byte = pb_data[pos]
+        pos += 1
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+
+    header = gtfs_realtime_pb2.FeedHeader()
+    try:
+        header.ParseFromString(pb_data[pos : pos + length])
+    except Exception:
+        return None
+
+    return int(header.timestamp) or None
+
 
 def parse_vehicle_positions(pb_data: bytes, feed: FeedConfig) -> list[VehiclePosition]:
     """
     Parse vehicle positions from VehiclePositions.pb feed.
     """
+    return parse_vehicle_positions_batch(pb_data, feed).to_positions()
+
+
+def _empty_batch(feed: FeedConfig) -> VehiclePositionBatch:
+    no_strings = np.empty(0, dtype=object)
+    no_floats = np.empty(0, dtype=np.float64)
+    return VehiclePositionBatch(
+        agency=feed.agency,
+        trip_id=no_strings,
+        vehicle_id=no_strings,
+        license_plate=no_strings,
+        stop_id=no_strings,
+        latitude=no_floats,
+        longitude=no_floats,
+        bearing=no_floats,
+        stop_sequence=np.empty(0, dtype=np.int32),
+        status=np.empty(0, dtype=np.int8),
+        timestamp=np.empty(0, dtype=np.int64),
+    )
+
+
+def parse_vehicle_positions_batch(pb_data: bytes, feed: FeedConfig) -> VehiclePositionBatch:
+    """
+    Parse vehicle positions from VehiclePositions.pb feed into a columnar batch.
+
+    Fields are collected into plain per-column lists and converted to arrays once, so no per-vehicle objects or
+    datetimes are created. Ids are prefixed and interned through a per-call table - a feed repeats the same stop ids
+    many times.
+    """
     if not pb_data or len(pb_data) < PB_MIN_PAYLOAD_BYTES:
-        return []
+        return _empty_batch(feed)
 
     msg = gtfs_realtime_pb2.FeedMessage()
     try:
         msg.ParseFromString(pb_data)
     except Exception:
-        return []
-
-    results: list[VehiclePosition] = []
+        return _empty_batch(feed)
+
+    interned: dict[str, str] = {}
+
+    def intern_id(raw_id: str) -> str:
+        prefixed = interned.get(raw_id)
+        if prefixed is None:
+            prefixed = interned[raw_id] = sys.intern(feed.prefix_id(raw_id))
+        return prefixed
+
+    trip_ids: list[str] = []
+    vehicle_ids: list[str] = []
+    plates: list[str] = []
+    stop_ids: list[str | None] = []
+    lats: list[float] = []
+    lons: list[float] = []
+    bearings: list[float] = []
+    seqs: list[int] = []
+    statuses: list[int] = []
+    timestamps: list[int] = []
+    nan = math.nan
 
     for entity in msg.entity:
         if not entity.HasField("vehicle"):
@@ -32,53 +117,44 @@ def parse_vehicle_positions(pb_data: bytes, feed: FeedConfig) -> list[VehiclePos
 
         v = entity.vehicle
 
-        if not v.HasField("trip") or not v.trip.trip_id:
+        if not v.HasField("trip") or not v.trip.trip_id or not v.timestamp:
             continue
 
-        vehicle_id = None
-        license_plate = None
-
-        if v.HasField("vehicle"):
-            vehicle_id = v.vehicle.id or None
-            license_plate = v.vehicle.license_plate or None
-
-        if not license_plate:
+        if not v.HasField("vehicle") or not v.vehicle.license_plate:
             continue
 
-        latitude = None
-        longitude = None
-        bearing = None
         if v.HasField("position"):
-            latitude = v.position.latitude if v.position.HasField("latitude") else None
-            longitude = v.position.longitude if v.position.HasField("longitude") else None
-            bearing = v.position.bearing if v.position.HasField("bearing") else None
-
-        stop_id = v.stop_id or None
-        stop_sequence = int(v.current_stop_sequence) if v.HasField("current_stop_sequence") else None
-        status = VehicleStatus.from_int(int(v.current_status)) if v.HasField("current_status") else None
-
-        ts = v.timestamp if v.timestamp else None
-        if not ts:
-            continue
-        timestamp = datetime.fromtimestamp(ts, tz=UTC)
-
-        results.append(
-            VehiclePosition(
-                agency=feed.agency,
-                trip_id=feed.prefix_id(v.trip.trip_id),
-                vehicle_id=vehicle_id or "",
-                license_plate=license_plate,
-                latitude=latitude,
-                longitude=longitude,
-                bearing=bearing,
-                stop_id=feed.prefix_id(stop_id) if stop_id else None,
-                stop_sequence=stop_sequence,
-                status=status,
-                timestamp=timestamp,
-            )
-        )
-
-    return results
+            p = v.position
+            lats.append(p.latitude if p.HasField("latitude") else nan)
+            lons.append(p.longitude if p.HasField("longitude") else nan)
+            bearings.append(p.bearing if p.HasField("bearing") else nan)
+        else:
+            lats.append(nan)
+            lons.append(nan)
+            bearings.append(nan)
+
+        trip_ids.append(intern_id(v.trip.trip_id))
+        vehicle_ids.append(v.vehicle.id)
+        plates.append(v.vehicle.license_plate)
+        stop_ids.append(intern_id(v.stop_id) if v.stop_id else None)
+        seqs.append(v.current_stop_sequence if v.HasField("current_stop_sequence") else -1)
+        status = v.current_status if v.HasField("current_status") else -1
+        statuses.append(status if status in _VALID_STATUSES else -1)
+        timestamps.append(v.timestamp)
+
+    return VehiclePositionBatch(
+        agency=feed.agency,
+        trip_id=np.array(trip_ids, dtype=object),
+        vehicle_id=np.array(vehicle_ids, dtype=object),
+        license_plate=np.array(plates, dtype=object),
+        stop_id=np.array(stop_ids, dtype=object),
+        latitude=np.array(lats, dtype=np.float64),
+        longitude=np.array(lons, dtype=np.float64),
+        bearing=np.array(bearings, dtype=np.float64),
+        stop_sequence=np.array(seqs, dtype=np.int32),
+        status=np.array(statuses, dtype=np.int8),
+        timestamp=np.array(timestamps, dtype=np.int64),
+    )
 
 
 def parse_trip_updates(pb_data: bytes, feed: FeedConfig) -> list[TripUpdate]:
@@ -0,0 +1,218 @@
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+from threading import Event, Thread
+
+import redis
+from redis.client import PubSub
+from sqlalchemy.orm import Session
+
+from app.common.constants import GTFS_STATIC_UPDATED_CHANNEL, SNAPSHOT_CHECK_INTERVAL, SNAPSHOT_RELOAD_DEBOUNCE
+from app.common.db.connection import get_session
+from app.common.db.repositories.gtfs_meta import GtfsMetaRepository
+from app.common.db.repositories.gtfs_static import GtfsStaticRepository
+from app.common.models.enums import Agency
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class TripInfo:
+    trip_id: str
+    line_number: str
+    direction_id: int | None
+    headsign: str | None
+    shape_id: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class StopInfo:
+    stop_id: str
+    stop_name: str
+    stop_desc: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class StopTimeInfo:
+    stop_sequence: int
+    stop_id: str
+    arrival_seconds: int
+
+
+class StaticSnapshot:
+    """
+    Immutable, fully loaded view of the current GTFS static data.
+
+    Trips and stops are kept as small frozen records. Stop times - by far the largest table - are stored column-wise
+    in flat int arrays grouped by trip: a trip's rows live in [offsets[i], offsets[i + 1]) ordered by stop_sequence,
+    and stop_ids are interned into an index. Lookups never touch the database.
+    """
+
+    def __init__(
+        self,
+        hashes: dict[Agency, str],
+        trips: dict[str, TripInfo],
+        stops: dict[str, StopInfo],
+        trip_index: dict[str, int],
+        offsets: "array[int]",
+        sequences: "array[int]",
+        arrivals: "array[int]",
+        stop_refs: "array[int]",
+        stop_ids: list[str],
+    ):
+        self.hashes = hashes
+        self._trips = trips
+        self._stops = stops
+        self._trip_index = trip_index
+        self._offsets = offsets
+        self._sequences = sequences
+        self._arrivals = arrivals
+        self._stop_refs = stop_refs
+        self._stop_ids = stop_ids
+
+    @classmethod
+    def build(cls, session: Session) -> "StaticSnapshot":
+        """Load the snapshot with one bulk query per table. Run it inside a single consistent transaction."""
+        static_repo = GtfsStaticRepository(session)
+
+        hashes = GtfsMetaRepository(session).get_all_hashes()
+        trips = {row[0]: TripInfo(*row) for row in static_repo.get_all_trip_rows()}
+        stops = {row[0]: StopInfo(*row) for row in static_repo.get_all_stop_rows()}
+
+        trip_index: dict[str, int] = {}
+        offsets, sequences, arrivals, stop_refs = array("i"), array("i"), array("i"), array("i")
+        stop_ids: list[str] = []
+        stop_id_index: dict[str, int] = {}
+
+        for trip_id, stop_sequence, stop_id, arrival_seconds in static_repo.iter_all_stop_time_rows():
+            if trip_id not in trip_index:
+                trip_index[trip_id] = len(offsets)
+                offsets.append(len(sequences))
+            ref = stop_id_index.get(stop_id)
+            if ref is None:
+                ref = stop_id_index[stop_id] = len(stop_ids)
+                stop_ids.append(stop_id)
+            sequences.append(stop_sequence)
+            arrivals.append(arrival_seconds)
+            stop_refs.append(ref)
+        offsets.append(len(sequences))
+
+        return cls(hashes, trips, stops, trip_index, offsets, sequences, arrivals, stop_refs, stop_ids)
+
+    def get_hash(self, agency: Agency) -> str | None:
+        return self.hashes.get(agency)
+
+    def get_trip(self, trip_id: str) -> TripInfo | None:
+        return self._trips.get(trip_id)
+
+    def get_stop(self, stop_id: str) -> StopInfo | None:
+        return self._stops.get(stop_id)
+
+    def _range(self, trip_id: str) -> tuple[int, int] | None:
+        i = self._trip_index.get(trip_id)
+        if i is None:
+            return None
+        return self._offsets[i], self._offsets[i + 1]
+
+    def get_stop_time(self, trip_id: str, stop_sequence: int) -> StopTimeInfo | None:
+        bounds = self._range(trip_id)
+        if bounds is None:
+            return None
+        lo, hi = bounds
+        j = bisect_left(self._sequences, stop_sequence, lo, hi)
+        if j == hi or self._sequences[j] != stop_sequence:
+            return None
+        return StopTimeInfo(stop_sequence, self._stop_ids[self._stop_refs[j]], self._arrivals[j])
+
+    def get_max_stop_sequence(self, trip_id: str) -> int | None:
+        bounds = self._range(trip_id)
+        return self._sequences[bounds[1] - 1] if bounds else None
+
+    def stop_id_to_sequence(self, trip_id: str) -> dict[str, int]:
+        bounds = self._range(trip_id)
+        if bounds is None:
+            return {}
+        lo, hi = bounds
+        return {self._stop_ids[self._stop_refs[j]]: self._sequences[j] for j in range(lo, hi)}
+
+    def __len__(self) -> int:
+        return len(self._sequences)
+
+
+class StaticHolder[T]:
+    """
+    Holds the current build of a static index (e.g. a StaticSnapshot) and the gtfs_meta hashes it was built from.
+
+    Readers grab `current` once per unit of work. A background watcher rebuilds the index when the importer announces
+    a new feed on GTFS_STATIC_UPDATED_CHANNEL (or gtfs_meta changes without a notification) and swaps it in with a
+    single reference assignment, so readers never wait for a rebuild and never see a half-loaded state.
+    """
+
+    def __init__(self, build: Callable[[Session], T], check_interval: timedelta = SNAPSHOT_CHECK_INTERVAL):
+        self._build = build
+        self._check_interval = check_interval
+        self._stop = Event()
+        self._thread: Thread | None = None
+        self.hashes, self.current = self._load()
+
+    def _load(self) -> tuple[dict[Agency, str], T]:
+        start = time.monotonic()
+        with get_session() as session:
+            # Hashes and index come from one consistent view, even if an import commits mid-build
+            session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            hashes = GtfsMetaRepository(session).get_all_hashes()
+            value = self._build(session)
+        logger.info(f"Loaded GTFS static index in {time.monotonic() - start:.1f}s")
+        return hashes, value
+
+    def refresh(self) -> bool:
+        """Rebuild the index if gtfs_meta changed since it was loaded. Returns True if it was swapped."""
+        with get_session() as session:
+            hashes = GtfsMetaRepository(session).get_all_hashes()
+        if hashes == self.hashes:
+            return False
+
+        hashes, value = self._load()
+        self.hashes, self.current = hashes, value
+        return True
+
+    def start_watcher(self, redis_client: redis.Redis) -> None:
+        self._thread = Thread(target=self._watch, args=(redis_client,), name="static-watcher", daemon=True)
+        self._thread.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._check_interval.total_seconds())
+
+    def _watch(self, redis_client: redis.Redis) -> None:
+        pubsub: PubSub | None = None
+        while not self._stop.is_set():
+            try:
+                if pubsub is None:
+                    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)  # type: ignore[no-untyped-call]
+                    pubsub.subscribe(GTFS_STATIC_UPDATED_CHANNEL)
+
+                message = pubsub.get_message(timeout=self._check_interval.total_seconds())
+                if message is not None:
+                    logger.info(f"GTFS static update announced: {message['data']!r}")
+                    # The importer announces each agency separately - wait for the rest before rebuilding once
+                    self._stop.wait(SNAPSHOT_RELOAD_DEBOUNCE)
+                    while pubsub.get_message(timeout=0) is not None:
+                        pass
+
+                self.refresh()
+            except redis.ConnectionError:
+                logger.warning("Redis connection lost in static watcher, will resubscribe")
+                pubsub = None
+                self._stop.wait(SNAPSHOT_RELOAD_DEBOUNCE)
+            except Exception as e:
+                logger.exception(f"Static index refresh failed: {e}")
+                self._stop.wait(SNAPSHOT_RELOAD_DEBOUNCE)
+
+        if pubsub is not None:
+            pubsub.close()
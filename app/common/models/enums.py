@@ -8,6 +8,13 @@ class Agency(StrEnum):
     MPK_TRAM = "mpk_tram"
 
 
+class Transport(StrEnum):
+    """How vehicle positions travel from the poller to the stop writer"""
+
+    PUBSUB = "pubsub"
+    STREAM = "stream"
+
+
 class VehicleStatus(IntEnum):
     INCOMING_AT = 0
     STOPPED_AT = 1
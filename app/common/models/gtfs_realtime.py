@@ -1,5 +1,9 @@
+import math
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import UTC, datetime
+
+import numpy as np
+import numpy.typing as npt
 
 from app.common.models.enums import Agency, VehicleStatus
 
@@ -44,3 +48,79 @@ class TripUpdate:
     vehicle_id: str | None
     timestamp: datetime
     stop_time_updates: list[StopTimeUpdate]
+
+
+@dataclass(frozen=True)
+class VehiclePositionBatch:
+    """
+    Columnar snapshot of one VehiclePositions.pb feed: one row per vehicle, one array per field.
+
+    Missing values are NaN for floats and -1 for stop_sequence/status. Id columns are object arrays of interned
+    strings, so they can be masked together with the numeric columns.
+    """
+
+    agency: Agency
+    trip_id: npt.NDArray[np.object_]
+    vehicle_id: npt.NDArray[np.object_]
+    license_plate: npt.NDArray[np.object_]
+    stop_id: npt.NDArray[np.object_]  # None where missing
+    latitude: npt.NDArray[np.float64]
+    longitude: npt.NDArray[np.float64]
+    bearing: npt.NDArray[np.float64]
+    stop_sequence: npt.NDArray[np.int32]
+    status: npt.NDArray[np.int8]
+    timestamp: npt.NDArray[np.int64]  # epoch seconds (UTC)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def has_position(self) -> npt.NDArray[np.bool_]:
+        return ~(np.isnan(self.latitude) | np.isnan(self.longitude))
+
+    def select(self, rows: npt.NDArray[np.bool_] | npt.NDArray[np.intp]) -> "VehiclePositionBatch":
+        """Subset of rows by boolean mask or index array."""
+        return VehiclePositionBatch(
+            agency=self.agency,
+            trip_id=self.trip_id[rows],
+            vehicle_id=self.vehicle_id[rows],
+            license_plate=self.license_plate[rows],
+            stop_id=self.stop_id[rows],
+            latitude=self.latitude[rows],
+            longitude=self.longitude[rows],
+            bearing=self.bearing[rows],
+            stop_sequence=self.stop_sequence[rows],
+            status=self.status[rows],
+            timestamp=self.timestamp[rows],
+        )
+
+    def to_positions(self) -> list[VehiclePosition]:
+        """Materialize per-vehicle objects for consumers that work vehicle by vehicle (the detector)."""
+        return [
+            VehiclePosition(
+                agency=self.agency,
+                trip_id=trip_id,
+                vehicle_id=vehicle_id,
+                license_plate=license_plate,
+                latitude=None if math.isnan(lat) else lat,
+                longitude=None if math.isnan(lon) else lon,
+                bearing=None if math.isnan(bearing) else bearing,
+                stop_id=stop_id,
+                stop_sequence=None if seq < 0 else seq,
+                status=None if status < 0 else VehicleStatus(status),
+                timestamp=datetime.fromtimestamp(ts, tz=UTC),
+            )
+            for trip_id, vehicle_id, license_plate, stop_id, lat, lon, bearing, seq, status, ts in zip(
+                self.trip_id.tolist(),
+                self.vehicle_id.tolist(),
+                self.license_plate.tolist(),
+                self.stop_id.tolist(),
+                self.latitude.tolist(),
+                self.longitude.tolist(),
+                self.bearing.tolist(),
+                self.stop_sequence.tolist(),
+                self.status.tolist(),
+                self.timestamp.tolist(),
+                strict=True,
+            )
+        ]
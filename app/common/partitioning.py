@@ -0,0 +1,40 @@
+import hashlib
+
+from app.common.constants import VEHICLE_POSITIONS_CHANNEL, VEHICLE_POSITIONS_STREAM
+
+
+def _jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping & Veach) - only 1/n of keys move when a bucket is added."""
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def partition_for(agency: str, license_plate: str, partitions: int) -> int:
+    """
+    Partition owning a vehicle. All positions of one vehicle always land in the same partition, so a single
+    consumer sees them in order.
+    """
+    if partitions <= 1:
+        return 0
+    digest = hashlib.blake2b(f"{agency}:{license_plate}".encode(), digest_size=8).digest()
+    return _jump_hash(int.from_bytes(digest, "big"), partitions)
+
+
+def stream_key(partition: int) -> str:
+    return f"{VEHICLE_POSITIONS_STREAM}:{partition}"
+
+
+def channel_key(partition: int, partitions: int) -> str:
+    """Pub/sub channel of a partition. A single partition keeps the plain channel name."""
+    if partitions <= 1:
+        return VEHICLE_POSITIONS_CHANNEL
+    return f"{VEHICLE_POSITIONS_CHANNEL}:{partition}"
+
+
+def owned_partitions(worker: int, workers: int, partitions: int) -> list[int]:
+    """Partitions consumed by one stop writer worker process - partitions are dealt round-robin across workers."""
+    return [p for p in range(partitions) if p % workers == worker]
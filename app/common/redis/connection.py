@@ -1,6 +1,7 @@
 from functools import lru_cache
 
 import redis
+import redis.asyncio
 
 from app.common.config import get_config
 
@@ -22,6 +23,24 @@ def get_client() -> redis.Redis:
     )
 
 
+@lru_cache
+def get_async_client() -> redis.asyncio.Redis:
+    """Client for asyncio code (the API's live stream). Create and use it on a single event loop."""
+    config = get_config()
+
+    return redis.asyncio.Redis(
+        host=config.redis.host,
+        port=config.redis.port,
+        db=config.redis.db,
+        username=config.redis.username,
+        password=config.redis.password,
+        decode_responses=False,
+        socket_connect_timeout=5,
+        socket_keepalive=True,
+        health_check_interval=30,
+    )
+
+
 def ensure_available() -> None:
     client = get_client()
     if not client.ping():
@@ -0,0 +1,75 @@
+import redis
+
+from app.common.constants import (
+    LIVE_VEHICLES_CHANNEL,
+    REDIS_KEY_LIVE_VEHICLES,
+    REDIS_KEY_LIVE_VEHICLES_VERSION,
+    REDIS_LIVE_VEHICLES_TTL,
+)
+
+_VERSION_FIELD = "version"
+_JSON_FIELD = "json"
+_MSGPACK_FIELD = "msgpack"
+
+
+def _delta_field(since: int) -> str:
+    return f"since:{since}"
+
+
+class LiveVehiclesRepository:
+    """
+    The live positions snapshot: the encoded LiveVehicleResponse, its version, its LiveVehicleColumns encoding and the
+    encoded deltas to it from recent versions, kept together in one hash. Written by the poller once per cycle, read
+    by the API.
+    """
+
+    def __init__(self, client: redis.Redis):
+        self._redis = client
+
+    def get(self) -> bytes | None:
+        data: bytes | None = self._redis.hget(REDIS_KEY_LIVE_VEHICLES, _JSON_FIELD)  # type: ignore[assignment]
+        return data
+
+    def get_packed(self) -> bytes | None:
+        """The snapshot as msgpack encoded LiveVehicleColumns."""
+        data: bytes | None = self._redis.hget(REDIS_KEY_LIVE_VEHICLES, _MSGPACK_FIELD)  # type: ignore[assignment]
+        return data
+
+    def get_delta(self, since: int) -> bytes | None:
+        """Encoded LiveVehicleDelta from `since` to the current version, None if `since` is too old or unknown."""
+        data: bytes | None = self._redis.hget(REDIS_KEY_LIVE_VEHICLES, _delta_field(since))  # type: ignore[assignment]
+        return data
+
+    def get_version(self) -> int:
+        """Version of the stored snapshot, 0 if there is none."""
+        version: bytes | None = self._redis.hget(REDIS_KEY_LIVE_VEHICLES, _VERSION_FIELD)  # type: ignore[assignment]
+        return int(version) if version is not None else 0
+
+    def next_version(self) -> int:
+        """
+        Reserve the next snapshot version. The counter is kept apart from the snapshot and never expires, so versions
+        keep increasing even if the poller is down for longer than the snapshot lives.
+        """
+        version: int = self._redis.incr(REDIS_KEY_LIVE_VEHICLES_VERSION)
+        return version
+
+    def keep_alive(self) -> None:
+        """Extend the snapshot's expiry without rewriting it, while the poller is running but nothing changed."""
+        self._redis.expire(REDIS_KEY_LIVE_VEHICLES, REDIS_LIVE_VEHICLES_TTL)
+
+    def write(self, version: int, data: bytes, deltas: dict[int, bytes], packed: bytes) -> None:
+        """
+        Replace the snapshot and its deltas (by the version they start from), and publish the delta from the previous
+        version on LIVE_VEHICLES_CHANNEL if there is one. Everything goes in one MULTI, so a reader never sees a
+        snapshot with deltas of another one, and a subscriber that reads the snapshot after a message gets at least
+        that version.
+        """
+        mapping: dict[str, int | bytes] = {_VERSION_FIELD: version, _JSON_FIELD: data, _MSGPACK_FIELD: packed}
+        mapping.update({_delta_field(since): delta for since, delta in deltas.items()})
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.delete(REDIS_KEY_LIVE_VEHICLES)
+        pipe.hset(REDIS_KEY_LIVE_VEHICLES, mapping=mapping)  # type: ignore[arg-type]
+        pipe.expire(REDIS_KEY_LIVE_VEHICLES, REDIS_LIVE_VEHICLES_TTL)
+        if version - 1 in deltas:
+            pipe.publish(LIVE_VEHICLES_CHANNEL, deltas[version - 1])
+        pipe.execute()
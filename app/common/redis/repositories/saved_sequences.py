@@ -4,6 +4,8 @@ import redis
 
 from app.common.constants import REDIS_SAVED_SEQS_TTL
 
+SavedKey = tuple[str, str, date]  # (agency, trip_id, service_date)
+
 
 class SavedSequencesRepository:
     def __init__(self, client: redis.Redis):
@@ -20,3 +22,17 @@ class SavedSequencesRepository:
         key = self._key(agency, trip_id, service_date)
         self._redis.sadd(key, str(stop_sequence))
         self._redis.expire(key, REDIS_SAVED_SEQS_TTL)
+
+    def get_saved(self, agency: str, trip_id: str, service_date: date) -> set[int]:
+        """All stop sequences already saved for a trip on a service date (single SMEMBERS)."""
+        members: set[bytes] = self._redis.smembers(self._key(agency, trip_id, service_date))  # type: ignore[assignment]
+        return {int(m) for m in members}
+
+    def mark_saved_many(self, saved: dict[SavedKey, set[int]]) -> None:
+        """Mark many stop sequences as saved in a single pipelined round trip."""
+        pipe = self._redis.pipeline(transaction=False)
+        for (agency, trip_id, service_date), seqs in saved.items():
+            key = self._key(agency, trip_id, service_date)
+            pipe.sadd(key, *(str(seq) for seq in seqs))
+            pipe.expire(key, REDIS_SAVED_SEQS_TTL)
+        pipe.execute()
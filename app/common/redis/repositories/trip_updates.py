@@ -1,50 +1,129 @@
+import struct
+from collections.abc import Iterable
 from datetime import UTC, datetime
 
 import redis
 
 from app.common.constants import REDIS_TRIP_UPDATES_TTL
 from app.common.models.gtfs_realtime import TripUpdate
-from app.common.redis import serializer
 from app.common.redis.schemas import CachedStopTime, TripUpdateCache
 
+# One hash per trip: a field per stop_sequence holding packed (first_seen, last_seen) epoch seconds, plus two
+# metadata fields whose names can never collide with a sequence number. Written by _MERGE_SCRIPT.
+_ARRIVALS = struct.Struct(">II")
+_MIN_SEQ_FIELD = "min"
+_CREATED_FIELD = "created"
+
+
+def _unpack(stop_sequence: int, data: bytes) -> CachedStopTime:
+    first_seen, last_seen = _ARRIVALS.unpack(data)
+    return CachedStopTime(
+        stop_sequence=stop_sequence,
+        first_seen_arrival=datetime.fromtimestamp(first_seen, tz=UTC),
+        last_seen_arrival=datetime.fromtimestamp(last_seen, tz=UTC),
+    )
+
+
+# Merge one trip update into its hash. first_seen is kept until the vehicle moves past the earliest predicted stop
+# (the incoming minimum sequence grows); last_seen always takes the newest prediction.
+#   KEYS[1] = hash key
+#   ARGV    = ttl, now, incoming minimum sequence ("" if none), then stop_sequence/arrival pairs (epoch seconds)
+_MERGE_SCRIPT = """
+local key = KEYS[1]
+local incoming_min = ARGV[3]
+local prev_min = redis.call('HGET', key, 'min')
+local moved = incoming_min ~= '' and prev_min and tonumber(incoming_min) > tonumber(prev_min)
+
+for i = 4, #ARGV, 2 do
+    local seq, arrival = ARGV[i], tonumber(ARGV[i + 1])
+    local first_seen = arrival
+    if not moved then
+        local old = redis.call('HGET', key, seq)
+        if old then
+            first_seen = struct.unpack('>I4', old)
+        end
+    end
+    redis.call('HSET', key, seq, struct.pack('>I4I4', first_seen, arrival))
+end
+
+if incoming_min ~= '' then
+    redis.call('HSET', key, 'min', incoming_min)
+end
+redis.call('HSETNX', key, 'created', ARGV[2])
+redis.call('EXPIRE', key, ARGV[1])
+return 1
+"""
+
 
 class TripUpdatesRepository:
     def __init__(self, client: redis.Redis):
         self._redis = client
+        # Sent once with SCRIPT LOAD, then invoked by SHA (EVALSHA) - pipelines load it on demand after NOSCRIPT
+        self._merge_script = client.register_script(_MERGE_SCRIPT)
 
     @staticmethod
     def _key(agency: str, trip_id: str) -> str:
-        return f"tu:{agency}:{trip_id}"
+        return f"tuh:{agency}:{trip_id}"
 
     def get(self, agency: str, trip_id: str) -> TripUpdateCache | None:
-        data: bytes | None = self._redis.get(self._key(agency, trip_id))  # type: ignore[assignment]
-        if data is None:
-            return None
-        try:
-            return serializer.decode_trip_update(data)
-        except Exception:
+        """The whole cached trip (HGETALL)."""
+        values: dict[bytes, bytes] = self._redis.hgetall(self._key(agency, trip_id))  # type: ignore[assignment]
+        created = values.get(_CREATED_FIELD.encode())
+        # "created" is written by every merge - without it the trip is not cached
+        if created is None:
             return None
 
-    def update(self, trip_update: TripUpdate, stop_id_to_seq: dict[str, int]) -> None:
-        agency = trip_update.agency.value
-        trip_id = trip_update.trip_id
-        key = self._key(agency, trip_id)
-        now = datetime.now(UTC)
+        min_seq = values.get(_MIN_SEQ_FIELD.encode())
+        return TripUpdateCache(
+            agency=agency,
+            trip_id=trip_id,
+            stops={int(name): _unpack(int(name), data) for name, data in values.items() if name.isdigit()},
+            created_at=datetime.fromtimestamp(int(created), tz=UTC),
+            last_min_seq=int(min_seq) if min_seq is not None else None,
+        )
 
-        existing = self.get(agency, trip_id)
-        existing_stops = existing.stops if existing else {}
+    def get_stops(self, agency: str, trip_id: str, stop_sequences: Iterable[int]) -> dict[int, CachedStopTime]:
+        """Cached arrivals for just the given stop sequences, read with a single HMGET. Missing ones are omitted."""
+        seqs = list(stop_sequences)
+        if not seqs:
+            return {}
+        values: list[bytes | None] = self._redis.hmget(self._key(agency, trip_id), seqs)  # type: ignore[assignment]
+        return {seq: _unpack(seq, data) for seq, data in zip(seqs, values, strict=True) if data is not None}
 
-        incoming_seqs = []
-        for stu in trip_update.stop_time_updates:
-            seq = stu.stop_sequence or stop_id_to_seq.get(stu.stop_id)
-            if seq is not None:
-                incoming_seqs.append(seq)
+    def get_arrival(self, agency: str, trip_id: str, stop_sequence: int) -> datetime | None:
+        """Get last seen arrival time for a stop."""
+        cached = self.get_stops(agency, trip_id, [stop_sequence]).get(stop_sequence)
+        if cached is None:
+            return None
 
-        incoming_min_seq = min(incoming_seqs) if incoming_seqs else None
-        prev_min_seq = existing.last_min_seq if existing else None
-        vehicle_moved = incoming_min_seq is not None and prev_min_seq is not None and incoming_min_seq > prev_min_seq
+        return cached.last_seen_arrival
+
+    def update(self, trip_update: TripUpdate, stop_id_to_seq: dict[str, int]) -> None:
+        self.merge_many([(trip_update, stop_id_to_seq)], [])
+
+    def merge_many(self, updates: list[tuple[TripUpdate, dict[str, int]]], touched: list[tuple[str, str]]) -> None:
+        """
+        Merge trip updates (each with its static stop_id -> sequence mapping) into their hashes and refresh the TTL of
+        unchanged (agency, trip_id) entries, all in one pipelined round trip. Each merge runs atomically inside Redis,
+        so nothing is read back and concurrent pollers cannot interleave.
+        """
+        pipe = self._redis.pipeline(transaction=False)
+        for trip_update, stop_id_to_seq in updates:
+            self._merge_script(
+                keys=[self._key(trip_update.agency.value, trip_update.trip_id)],
+                args=self._merge_args(trip_update, stop_id_to_seq),
+                client=pipe,
+            )
+        for agency, trip_id in touched:
+            pipe.expire(self._key(agency, trip_id), REDIS_TRIP_UPDATES_TTL)
+        pipe.execute()
 
-        new_stops: dict[int, CachedStopTime] = dict(existing_stops)
+    @staticmethod
+    def _merge_args(trip_update: TripUpdate, stop_id_to_seq: dict[str, int]) -> list[int | str]:
+        """ARGV for the merge script: TTL, now, the incoming minimum sequence ("" if none), then seq/arrival pairs."""
+        seqs = TripUpdatesRepository.resolve_sequences(trip_update, stop_id_to_seq)
+        incoming_min_seq = min(seqs) if seqs else None
+        args: list[int | str] = [REDIS_TRIP_UPDATES_TTL, int(datetime.now(UTC).timestamp()), incoming_min_seq or ""]
 
         for stu in trip_update.stop_time_updates:
             stop_seq = stu.stop_sequence or stop_id_to_seq.get(stu.stop_id)
@@ -55,42 +134,18 @@ class TripUpdatesRepository:
             if arrival is None:
                 continue
 
-            if stop_seq in new_stops and not vehicle_moved:
-                old = new_stops[stop_seq]
-                new_stops[stop_seq] = CachedStopTime(
-                    stop_id=stu.stop_id,
-                    stop_sequence=stop_seq,
-                    first_seen_arrival=old.first_seen_arrival,
-                    last_seen_arrival=arrival,
-                )
-            else:
-                new_stops[stop_seq] = CachedStopTime(
-                    stop_id=stu.stop_id,
-                    stop_sequence=stop_seq,
-                    first_seen_arrival=arrival,
-                    last_seen_arrival=arrival,
-                )
-
-        cache = TripUpdateCache(
-            agency=agency,
-            trip_id=trip_id,
-            stops=new_stops,
-            created_at=existing.created_at if existing else now,
-            last_min_seq=incoming_min_seq or prev_min_seq,
-        )
-        self._redis.setex(key, REDIS_TRIP_UPDATES_TTL, serializer.encode(cache))
+            args += [stop_seq, int(arrival.timestamp())]
+        return args
+
+    @staticmethod
+    def resolve_sequences(trip_update: TripUpdate, stop_id_to_seq: dict[str, int]) -> list[int]:
+        """Stop sequences the update predicts, falling back to the static stop_id -> sequence mapping."""
+        seqs = []
+        for stu in trip_update.stop_time_updates:
+            seq = stu.stop_sequence or stop_id_to_seq.get(stu.stop_id)
+            if seq is not None:
+                seqs.append(seq)
+        return seqs
 
     def delete(self, agency: str, trip_id: str) -> None:
         self._redis.delete(self._key(agency, trip_id))
-
-    def get_arrival(self, agency: str, trip_id: str, stop_sequence: int) -> datetime | None:
-        """Get last seen arrival time for a stop."""
-        cache = self.get(agency, trip_id)
-        if cache is None:
-            return None
-
-        cached = cache.stops.get(stop_sequence)
-        if cached is None:
-            return None
-
-        return cached.last_seen_arrival
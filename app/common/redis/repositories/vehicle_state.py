@@ -1,6 +1,8 @@
+from collections.abc import Iterable
+
 import redis
 
-from app.common.constants import REDIS_VEHICLE_STATE_TTL
+from app.common.constants import REDIS_SCAN_COUNT, REDIS_VEHICLE_STATE_TTL
 from app.common.redis import serializer
 from app.common.redis.schemas import VehicleState
 
@@ -28,3 +30,37 @@ class VehicleStateRepository:
 
     def delete(self, agency: str, license_plate: str) -> None:
         self._redis.delete(self._key(agency, license_plate))
+
+    def get_all(self) -> list[VehicleState]:
+        """Load every stored vehicle state (SCAN + MGET in batches). Unparseable entries are skipped."""
+        states: list[VehicleState] = []
+        batch: list[bytes] = []
+        for key in self._redis.scan_iter(match="vs:*", count=REDIS_SCAN_COUNT):
+            batch.append(key)
+            if len(batch) >= REDIS_SCAN_COUNT:
+                states.extend(self._get_many(batch))
+                batch = []
+        if batch:
+            states.extend(self._get_many(batch))
+        return states
+
+    def _get_many(self, keys: list[bytes]) -> list[VehicleState]:
+        values: list[bytes | None] = self._redis.mget(keys)  # type: ignore[assignment]
+        states: list[VehicleState] = []
+        for data in values:
+            if data is None:
+                continue
+            try:
+                states.append(serializer.decode_vehicle_state(data))
+            except Exception:
+                continue
+        return states
+
+    def write_many(self, saved: Iterable[VehicleState], deleted: Iterable[tuple[str, str]]) -> None:
+        """Save and delete many vehicle states in a single pipelined round trip."""
+        pipe = self._redis.pipeline(transaction=False)
+        for state in saved:
+            pipe.setex(self._key(state.agency, state.license_plate), REDIS_VEHICLE_STATE_TTL, serializer.encode(state))
+        for agency, license_plate in deleted:
+            pipe.delete(self._key(agency, license_plate))
+        pipe.execute()
@@ -16,17 +16,101 @@ class VehicleState(msgspec.Struct):
 class CachedStopTime(msgspec.Struct):
     """Cached arrival times for a single stop"""
 
-    stop_id: str
     stop_sequence: int
     first_seen_arrival: datetime
     last_seen_arrival: datetime
 
 
 class TripUpdateCache(msgspec.Struct):
-    """Cached TripUpdate predictions for a trip"""
+    """Cached TripUpdate predictions for a trip (stored as one Redis hash, see TripUpdatesRepository)"""
 
     agency: str
     trip_id: str
     stops: dict[int, CachedStopTime] = msgspec.field(default_factory=dict)  # stop_sequence -> CachedStopTime
     created_at: datetime = msgspec.field(default_factory=lambda: datetime.now(UTC))
     last_min_seq: int | None = None
+
+
+class PublishedPosition(msgspec.Struct, array_like=True):
+    """Vehicle position as sent from the poller to the stop writer"""
+
+    trip_id: str
+    vehicle_id: str
+    license_plate: str | None
+    stop_id: str | None
+    stop_sequence: int | None
+    status: int | None
+    timestamp: datetime
+
+
+class VehiclePositionsMessage(msgspec.Struct, array_like=True):
+    """All vehicle positions of a single feed snapshot, published as one message"""
+
+    agency: str
+    positions: list[PublishedPosition]
+
+
+class LiveVehicle(msgspec.Struct):
+    """A vehicle of the live positions snapshot, enriched with static trip data"""
+
+    trip_id: str
+    license_plate: str
+    line_number: str
+    headsign: str
+    shape_id: str | None
+    latitude: float
+    longitude: float
+    bearing: float | None
+    timestamp: str
+
+
+class LiveVehicleResponse(msgspec.Struct):
+    """Live positions snapshot built by the poller once per cycle and served by the API as is"""
+
+    version: int
+    count: int
+    vehicles: list[LiveVehicle]
+
+
+class LiveVehicleColumns(msgspec.Struct):
+    """
+    Live positions snapshot in columnar form, served to map clients as application/msgpack. Vehicle i is row i of
+    every column. Numeric columns are packed little-endian arrays a client can view as typed arrays without parsing;
+    `line`, `headsign` and `shape` hold indexes into the `lines`, `headsigns` and `shapes` dictionaries.
+    """
+
+    version: int
+    count: int
+    trip_id: list[str]
+    license_plate: list[str]
+    lines: list[str]
+    headsigns: list[str]
+    shapes: list[str | None]
+    line: bytes  # uint16
+    headsign: bytes  # uint16
+    shape: bytes  # uint16
+    latitude: bytes  # float32
+    longitude: bytes  # float32
+    bearing: bytes  # float32, NaN if unknown
+    timestamp: bytes  # uint32, seconds since the epoch
+
+
+class LiveVehicleMove(msgspec.Struct):
+    """New position of a vehicle that is still on the same trip"""
+
+    license_plate: str
+    latitude: float
+    longitude: float
+    bearing: float | None
+    timestamp: str
+
+
+class LiveVehicleDelta(msgspec.Struct):
+    """Changes of the live positions snapshot from version `since` to `version`, vehicles keyed by license plate"""
+
+    version: int
+    since: int
+    count: int  # vehicles in the snapshot at `version`
+    added: list[LiveVehicle]  # new vehicles, and vehicles that switched trips
+    moved: list[LiveVehicleMove]
+    removed: list[str]
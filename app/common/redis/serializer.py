@@ -1,11 +1,24 @@
+import math
+from collections.abc import Hashable, Iterable
+from datetime import UTC, datetime
+
 import msgspec
+import numpy as np
 
-from app.common.redis.schemas import TripUpdateCache, VehicleState
+from app.common.models.enums import Agency, VehicleStatus
+from app.common.models.gtfs_realtime import VehiclePosition, VehiclePositionBatch
+from app.common.redis.schemas import (
+    LiveVehicle,
+    LiveVehicleColumns,
+    PublishedPosition,
+    VehiclePositionsMessage,
+    VehicleState,
+)
 
 _encoder = msgspec.msgpack.Encoder()
 
 _vehicle_state_decoder = msgspec.msgpack.Decoder(VehicleState)
-_trip_update_decoder = msgspec.msgpack.Decoder(TripUpdateCache)
+_vehicle_positions_decoder = msgspec.msgpack.Decoder(VehiclePositionsMessage)
 
 
 def encode(obj: msgspec.Struct) -> bytes:
@@ -16,5 +29,107 @@ def decode_vehicle_state(data: bytes) -> VehicleState:
     return _vehicle_state_decoder.decode(data)
 
 
-def decode_trip_update(data: bytes) -> TripUpdateCache:
-    return _trip_update_decoder.decode(data)
+def encode_vehicle_positions(agency: Agency, positions: list[VehiclePosition]) -> bytes:
+    """Encode a feed snapshot of vehicle positions as a single compact msgpack message."""
+    return _encoder.encode(
+        VehiclePositionsMessage(
+            agency=agency.value,
+            positions=[
+                PublishedPosition(
+                    trip_id=pos.trip_id,
+                    vehicle_id=pos.vehicle_id,
+                    license_plate=pos.license_plate,
+                    stop_id=pos.stop_id,
+                    stop_sequence=pos.stop_sequence,
+                    status=pos.status.value if pos.status is not None else None,
+                    timestamp=pos.timestamp,
+                )
+                for pos in positions
+            ],
+        )
+    )
+
+
+def encode_vehicle_positions_batch(batch: VehiclePositionBatch) -> bytes:
+    """Encode a columnar feed snapshot in the same wire format as encode_vehicle_positions."""
+    return _encoder.encode(
+        VehiclePositionsMessage(
+            agency=batch.agency.value,
+            positions=[
+                PublishedPosition(
+                    trip_id=trip_id,
+                    vehicle_id=vehicle_id,
+                    license_plate=license_plate,
+                    stop_id=stop_id,
+                    stop_sequence=None if seq < 0 else seq,
+                    status=None if status < 0 else status,
+                    timestamp=datetime.fromtimestamp(ts, tz=UTC),
+                )
+                for trip_id, vehicle_id, license_plate, stop_id, seq, status, ts in zip(
+                    batch.trip_id.tolist(),
+                    batch.vehicle_id.tolist(),
+                    batch.license_plate.tolist(),
+                    batch.stop_id.tolist(),
+                    batch.stop_sequence.tolist(),
+                    batch.status.tolist(),
+                    batch.timestamp.tolist(),
+                    strict=True,
+                )
+            ],
+        )
+    )
+
+
+def decode_vehicle_positions(data: bytes) -> list[VehiclePosition]:
+    message = _vehicle_positions_decoder.decode(data)
+    agency = Agency(message.agency)
+    return [
+        VehiclePosition(
+            agency=agency,
+            trip_id=pos.trip_id,
+            vehicle_id=pos.vehicle_id,
+            license_plate=pos.license_plate,
+            latitude=None,
+            longitude=None,
+            bearing=None,
+            stop_id=pos.stop_id,
+            stop_sequence=pos.stop_sequence,
+            status=VehicleStatus.from_int(pos.status),
+            timestamp=pos.timestamp,
+        )
+        for pos in message.positions
+    ]
+
+
+def _dictionary_encode[H: Hashable](values: Iterable[H]) -> tuple[list[H], bytes]:
+    """Distinct values in order of appearance, and each value's index among them as packed uint16."""
+    index: dict[H, int] = {}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    return list(index), np.array(codes, dtype="<u2").tobytes()
+
+
+def encode_live_columns(version: int, vehicles: list[LiveVehicle]) -> bytes:
+    """Encode live vehicles as msgpack LiveVehicleColumns."""
+    lines, line = _dictionary_encode(v.line_number for v in vehicles)
+    headsigns, headsign = _dictionary_encode(v.headsign for v in vehicles)
+    shapes, shape = _dictionary_encode(v.shape_id for v in vehicles)
+    # Timestamps are UTC ISO 8601 strings, parsed in one pass without the offset
+    timestamps = np.array([v.timestamp[:-6] for v in vehicles], dtype="datetime64[s]").astype("<u4")
+    return _encoder.encode(
+        LiveVehicleColumns(
+            version=version,
+            count=len(vehicles),
+            trip_id=[v.trip_id for v in vehicles],
+            license_plate=[v.license_plate for v in vehicles],
+            lines=lines,
+            headsigns=headsigns,
+            shapes=shapes,
+            line=line,
+            headsign=headsign,
+            shape=shape,
+            latitude=np.array([v.latitude for v in vehicles], dtype="<f4").tobytes(),
+            longitude=np.array([v.longitude for v in vehicles], dtype="<f4").tobytes(),
+            bearing=np.array([math.nan if v.bearing is None else v.bearing for v in vehicles], dtype="<f4").tobytes(),
+            timestamp=timestamps.tobytes(),
+        )
+    )
@@ -3,7 +3,10 @@ import shutil
 import time
 from pathlib import Path
 
-from app.common.constants import IMPORT_CYCLE_SLEEP, REDIS_KEY_GTFS_READY
+import msgspec
+import redis
+
+from app.common.constants import GTFS_STATIC_UPDATED_CHANNEL, IMPORT_CYCLE_SLEEP, REDIS_KEY_GTFS_READY
 from app.common.db.connection import get_session
 from app.common.db.repositories.gtfs_meta import GtfsMetaRepository
 from app.common.feeds import get_all_feed_configs
@@ -11,6 +14,7 @@ from app.common.gtfs.hashing import sha256_file
 from app.common.redis.connection import get_client
 from app.importer.download import download_gtfs_zip
 from app.importer.load import load_gtfs_zip
+from app.importer.rollups import run_rollups
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
@@ -18,6 +22,15 @@ logger = logging.getLogger(__name__)
 ARCHIVE_DIR = Path("data")
 
 
+def _announce_update(agency: str, static_hash: str) -> None:
+    """Tell long-running consumers (stop writer, poller, API) to rebuild their static indexes."""
+    try:
+        payload = msgspec.json.encode({"agency": agency, "hash": static_hash})
+        get_client().publish(GTFS_STATIC_UPDATED_CHANNEL, payload)
+    except redis.RedisError:
+        logger.warning(f"Failed to announce {agency} static update, consumers will pick it up on their next poll")
+
+
 def run_import() -> None:
     """Run GTFS static import for all configured feeds."""
     feed_configs = get_all_feed_configs()
@@ -53,13 +66,14 @@ def run_import() -> None:
                 logger.info(f"Successfully imported {agency_name}")
 
             Path(zip_path).unlink()
+            _announce_update(feed_config.agency.value, new_hash)
 
         except Exception as e:
             logger.exception(f"Failed to import {agency_name}: {e}")
 
 
 def main() -> None:
-    """Run import every hour in a loop"""
+    """Run import (and the daily stats rollup) every hour in a loop"""
     logger.info("GTFS Importer started")
 
     while True:
@@ -67,10 +81,17 @@ def main() -> None:
             run_import()
             get_client().set(REDIS_KEY_GTFS_READY, "1")
             logger.info("GTFS ready signal set")
-            logger.info("Import cycle completed, sleeping for 1 hour")
         except Exception as e:
             logger.exception(f"Import cycle failed: {e}")
 
+        try:
+            rows = run_rollups()
+            logger.info(f"Stats rollups up to date ({rows} rows written)")
+        except Exception as e:
+            logger.exception(f"Rollup failed: {e}")
+
+        logger.info("Import cycle completed, sleeping for 1 hour")
+
         time.sleep(IMPORT_CYCLE_SLEEP)
 
 
@@ -0,0 +1,72 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import ClassVar, Protocol
+
+from sqlalchemy.orm import Session
+
+from app.common.constants import ROLLUP_CHUNK_DAYS, ROLLUP_CLOSE_DELAY, ROLLUP_LOOKBACK_DAYS, TZ
+from app.common.db.connection import get_session
+from app.common.db.repositories.line_daily_stats import LineDailyStatsRepository
+from app.common.db.repositories.rollup_watermark import RollupWatermarkRepository
+from app.common.db.repositories.stop_event import StopEventRepository
+from app.common.db.repositories.trip_segments import TripSegmentsRepository
+
+logger = logging.getLogger(__name__)
+
+
+class Rollup(Protocol):
+    """A table derived from stop_events for closed service dates, tracked by the watermark called NAME."""
+
+    NAME: ClassVar[str]
+
+    def __init__(self, session: Session) -> None: ...
+
+    def rollup(self, start_date: date, end_date: date) -> int: ...
+
+
+ROLLUPS: list[type[Rollup]] = [LineDailyStatsRepository, TripSegmentsRepository]
+
+
+def closed_through(now: datetime) -> date:
+    """Last service date that can no longer receive events."""
+    return (now.astimezone(TZ).replace(tzinfo=None) - ROLLUP_CLOSE_DELAY).date()
+
+
+def rollup_windows(watermark: date | None, first_event: date, last_closed: date) -> list[tuple[date, date]]:
+    """
+    Date ranges to aggregate, oldest first, at most ROLLUP_CHUNK_DAYS each. The last ROLLUP_LOOKBACK_DAYS rolled-up
+    days are always redone, so events written late for an already closed date still make it into the rollup.
+    """
+    start = first_event if watermark is None else max(first_event, watermark - timedelta(days=ROLLUP_LOOKBACK_DAYS - 1))
+    windows = []
+    while start <= last_closed:
+        end = min(start + timedelta(days=ROLLUP_CHUNK_DAYS - 1), last_closed)
+        windows.append((start, end))
+        start = end + timedelta(days=1)
+    return windows
+
+
+def run_rollups(now: datetime | None = None) -> int:
+    """
+    Bring every rollup up to date with the closed service dates. Each rollup keeps its own watermark, and each
+    window is committed together with it, so readers always see rollup rows and watermark agree. Returns the number
+    of rows written.
+    """
+    last_closed = closed_through(now or datetime.now(TZ))
+
+    with get_session() as session:
+        first_event = StopEventRepository(session).first_service_date()
+    if first_event is None:
+        return 0
+
+    written = 0
+    for rollup in ROLLUPS:
+        with get_session() as session:
+            watermark = RollupWatermarkRepository(session).get(rollup.NAME)
+
+        for start, end in rollup_windows(watermark, first_event, last_closed):
+            with get_session() as session:
+                written += rollup(session).rollup(start, end)
+                RollupWatermarkRepository(session).set(rollup.NAME, max(end, watermark) if watermark else end)
+            logger.info(f"Rolled up {rollup.NAME} for {start}..{end}")
+    return written
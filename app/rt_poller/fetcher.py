@@ -1,20 +1,95 @@
+import hashlib
+import logging
+from dataclasses import dataclass
+
 import requests
+from requests.adapters import HTTPAdapter
 
-from app.common.constants import USER_AGENT
+from app.common.constants import FEED_FETCH_TIMEOUT, HTTP_POOL_SIZE, USER_AGENT
 from app.common.feeds import FeedConfig
+from app.common.gtfs.parser import read_header_timestamp
+
+logger = logging.getLogger(__name__)
 
 _HEADERS = {"User-Agent": USER_AGENT}
 
 
-def fetch_vehicle_positions(feed: FeedConfig, timeout: int = 30) -> bytes:
-    """Fetch VehiclePositions.pb feed."""
-    response = requests.get(feed.vehicle_positions_url, timeout=timeout, headers=_HEADERS)
-    response.raise_for_status()
-    return response.content
+@dataclass
+class _FeedState:
+    """Validators and fingerprint of the last payload seen for a single feed URL."""
+
+    etag: str | None = None
+    last_modified: str | None = None
+    digest: bytes | None = None
+    header_timestamp: int | None = None
+
+
+class FeedFetcher:
+    """
+    Fetches GTFS Realtime feeds over a shared keep-alive connection pool.
+
+    Every request is conditional (If-None-Match / If-Modified-Since). A payload is returned only if it is new - a 304,
+    a byte-identical body or a body with an unchanged FeedHeader.timestamp all return None, so callers can skip
+    parsing and publishing entirely. A caller that fails to publish a returned payload must forget() its URL.
+
+    A single instance is shared by all polling threads. Each URL is only ever fetched by one thread at a time, so the
+    per-URL state needs no locking.
+    """
+
+    def __init__(self, timeout: float = FEED_FETCH_TIMEOUT, pool_size: int = HTTP_POOL_SIZE):
+        self._timeout = timeout
+        self._session = requests.Session()
+        self._session.headers.update(_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._states: dict[str, _FeedState] = {}
+
+    def fetch_vehicle_positions(self, feed: FeedConfig) -> bytes | None:
+        """Fetch VehiclePositions.pb feed. Returns None if it has not changed since the last fetch."""
+        return self._get(feed.vehicle_positions_url)
+
+    def fetch_trip_updates(self, feed: FeedConfig) -> bytes | None:
+        """Fetch TripUpdates.pb feed. Returns None if it has not changed since the last fetch."""
+        return self._get(feed.trip_updates_url)
+
+    def _get(self, url: str) -> bytes | None:
+        state = self._states.setdefault(url, _FeedState())
+
+        headers: dict[str, str] = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+        response = self._session.get(url, timeout=self._timeout, headers=headers)
+        if response.status_code == requests.codes.not_modified:
+            return None
+        response.raise_for_status()
+
+        state.etag = response.headers.get("ETag")
+        state.last_modified = response.headers.get("Last-Modified")
+
+        content = response.content
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        if digest == state.digest:
+            return None
+        state.digest = digest
+
+        header_timestamp = read_header_timestamp(content)
+        if header_timestamp is not None and header_timestamp == state.header_timestamp:
+            logger.debug(f"{url}: payload changed but header timestamp {header_timestamp} did not, skipping")
+            return None
+        state.header_timestamp = header_timestamp
+
+        return content
 
+    def forget(self, url: str) -> None:
+        """
+        Drop what is known about the last payload of a URL, so the next fetch returns it even if it has not changed.
+        For when a returned payload could not be published - otherwise it would be skipped as already seen.
+        """
+        self._states.pop(url, None)
 
-def fetch_trip_updates(feed: FeedConfig, timeout: int = 30) -> bytes:
-    """Fetch TripUpdates.pb feed."""
-    response = requests.get(feed.trip_updates_url, timeout=timeout, headers=_HEADERS)
-    response.raise_for_status()
-    return response.content
+    def close(self) -> None:
+        self._session.close()
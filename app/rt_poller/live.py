@@ -0,0 +1,165 @@
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Iterable
+
+import msgspec
+import numpy as np
+
+from app.common.constants import LIVE_FEED_STALE_AFTER, LIVE_VEHICLES_DELTA_HISTORY
+from app.common.gtfs.snapshot import StaticHolder, StaticSnapshot
+from app.common.models.enums import Agency
+from app.common.models.gtfs_realtime import VehiclePositionBatch
+from app.common.redis.repositories.live_vehicles import LiveVehiclesRepository
+from app.common.redis.schemas import LiveVehicle, LiveVehicleDelta, LiveVehicleMove, LiveVehicleResponse
+from app.common.redis.serializer import encode_live_columns
+
+logger = logging.getLogger(__name__)
+
+_LiveVehicles = dict[str, LiveVehicle]  # license_plate -> vehicle
+
+
+def build_live_vehicles(batches: Iterable[VehiclePositionBatch], snapshot: StaticSnapshot) -> list[LiveVehicle]:
+    """Vehicles with a position on a known trip, enriched with the trip's line, headsign and shape."""
+    vehicles: list[LiveVehicle] = []
+    for batch in batches:
+        batch = batch.select(batch.has_position)
+        if not len(batch):
+            continue
+
+        # Timestamps formatted in one vectorized pass, matching datetime.isoformat() for UTC
+        timestamps = np.char.add(np.datetime_as_string(batch.timestamp.astype("datetime64[s]"), unit="s"), "+00:00")
+
+        for trip_id, license_plate, lat, lon, bearing, ts in zip(
+            batch.trip_id.tolist(),
+            batch.license_plate.tolist(),
+            batch.latitude.tolist(),
+            batch.longitude.tolist(),
+            batch.bearing.tolist(),
+            timestamps.tolist(),
+            strict=True,
+        ):
+            trip = snapshot.get_trip(trip_id)
+            if trip is None:
+                continue
+
+            vehicles.append(
+                LiveVehicle(
+                    trip_id=trip_id,
+                    license_plate=license_plate,
+                    line_number=trip.line_number,
+                    headsign=trip.headsign or "",
+                    shape_id=trip.shape_id,
+                    latitude=lat,
+                    longitude=lon,
+                    bearing=None if math.isnan(bearing) else bearing,
+                    timestamp=ts,
+                )
+            )
+    return vehicles
+
+
+def _trip_fields(vehicle: LiveVehicle) -> tuple[str, str, str, str | None]:
+    return vehicle.trip_id, vehicle.line_number, vehicle.headsign, vehicle.shape_id
+
+
+def diff_live_vehicles(old: _LiveVehicles, new: _LiveVehicles, since: int, version: int) -> LiveVehicleDelta:
+    """
+    Changes from `old` to `new`. A vehicle on the same trip is sent as a move (position fields only) - line,
+    headsign and shape cannot change within a trip, so only new vehicles and trip switches carry them.
+    """
+    added: list[LiveVehicle] = []
+    moved: list[LiveVehicleMove] = []
+    for plate, vehicle in new.items():
+        prev = old.get(plate)
+        if prev is None or _trip_fields(prev) != _trip_fields(vehicle):
+            added.append(vehicle)
+        elif prev != vehicle:
+            moved.append(
+                LiveVehicleMove(
+                    license_plate=plate,
+                    latitude=vehicle.latitude,
+                    longitude=vehicle.longitude,
+                    bearing=vehicle.bearing,
+                    timestamp=vehicle.timestamp,
+                )
+            )
+    removed = [plate for plate in old if plate not in new]
+    return LiveVehicleDelta(version=version, since=since, count=len(new), added=added, moved=moved, removed=removed)
+
+
+class LiveSnapshot:
+    """
+    Latest vehicle positions batch of every feed, published to Redis as one versioned LiveVehicleResponse.
+
+    Feeds update the snapshot as their polls complete, and it is encoded and written at most once per poll cycle, so
+    the API serves positions with a single Redis read and never fetches the feeds or queries the database itself.
+    The last LIVE_VEHICLES_DELTA_HISTORY versions are kept in memory, and a delta from each of them to the new
+    version is precomputed alongside, for clients that already hold an older snapshot. So is the columnar msgpack
+    encoding of the snapshot, for map clients.
+
+    A feed that has not been polled successfully for LIVE_FEED_STALE_AFTER seconds is dropped, so its last vehicles
+    are not served as live while its endpoint is down. Once every feed is gone the snapshot is left to expire.
+    """
+
+    def __init__(self, repo: LiveVehiclesRepository, static: StaticHolder[StaticSnapshot]):
+        self._repo = repo
+        self._static = static
+        self._batches: dict[Agency, VehiclePositionBatch] = {}
+        self._polled_at: dict[Agency, float] = {}  # time.monotonic() of each feed's last successful poll
+        self._dirty = False
+        self._built_from = static.current
+        self._history: deque[tuple[int, _LiveVehicles]] = deque(maxlen=LIVE_VEHICLES_DELTA_HISTORY)
+
+    def update(self, batch: VehiclePositionBatch) -> None:
+        self._batches[batch.agency] = batch
+        self._polled_at[batch.agency] = time.monotonic()
+        self._dirty = True
+
+    def confirm(self, agency: Agency) -> None:
+        """Record a successful poll that returned the same feed as before (304 Not Modified)."""
+        if agency in self._batches:
+            self._polled_at[agency] = time.monotonic()
+
+    def _drop_stale(self) -> None:
+        now = time.monotonic()
+        for agency, polled_at in list(self._polled_at.items()):
+            if now - polled_at > LIVE_FEED_STALE_AFTER:
+                logger.warning(f"{agency.value}: no vehicle positions for {now - polled_at:.0f}s, dropping them")
+                del self._batches[agency], self._polled_at[agency]
+                self._dirty = True
+
+    def publish(self) -> int | None:
+        """
+        Write the snapshot if any feed or the static data changed, or a feed went stale, since the last write,
+        otherwise only extend its expiry while some feed is still live. Returns the new version, or None.
+        """
+        self._drop_stale()
+        static = self._static.current
+        if static is not self._built_from and self._batches:
+            # Reloaded GTFS static data can change the line, headsign or shape of the same trips
+            self._dirty = True
+        if not self._dirty:
+            if self._history and self._batches:
+                self._repo.keep_alive()
+            return None
+        vehicles = build_live_vehicles(self._batches.values(), static)
+        # From the persistent counter, so clients never see the version go back after a restart or a long outage
+        version = self._repo.next_version()
+        current = {vehicle.license_plate: vehicle for vehicle in vehicles}
+        # The current version itself is included, so a client that is up to date gets an empty delta
+        deltas = {
+            since: msgspec.json.encode(diff_live_vehicles(old, current, since, version))
+            for since, old in [*self._history, (version, current)]
+        }
+        self._repo.write(
+            version,
+            msgspec.json.encode(LiveVehicleResponse(version=version, count=len(vehicles), vehicles=vehicles)),
+            deltas,
+            encode_live_columns(version, vehicles),
+        )
+        self._history.append((version, current))
+        self._built_from = static
+        self._dirty = False
+        return version
@@ -1,13 +1,18 @@
 import logging
 import signal
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from enum import StrEnum
 from threading import Event
 from typing import Any
 
+from app.common.config import get_config
 from app.common.constants import POLL_INTERVAL_SECONDS
-from app.common.feeds import get_all_feed_configs
+from app.common.feeds import FeedConfig, get_all_feed_configs
 from app.common.gtfs.readiness import wait_for_gtfs_ready
+from app.common.gtfs.snapshot import StaticHolder, StaticSnapshot
 from app.common.redis.connection import get_client
-from app.rt_poller.fetcher import fetch_trip_updates, fetch_vehicle_positions
+from app.rt_poller.fetcher import FeedFetcher
 from app.rt_poller.publisher import Publisher
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -16,36 +21,105 @@ logger = logging.getLogger(__name__)
 shutdown_event = Event()
 
 
+class FeedKind(StrEnum):
+    VEHICLE_POSITIONS = "VP"
+    TRIP_UPDATES = "TU"
+
+
+FeedJob = tuple[FeedConfig, FeedKind]
+
+
 def signal_handler(*args: Any) -> None:
     logger.info("Shutdown signal received")
     shutdown_event.set()
 
 
+def _fetch(fetcher: FeedFetcher, feed: FeedConfig, kind: FeedKind) -> bytes | None:
+    if kind is FeedKind.VEHICLE_POSITIONS:
+        return fetcher.fetch_vehicle_positions(feed)
+    return fetcher.fetch_trip_updates(feed)
+
+
+def _url(feed: FeedConfig, kind: FeedKind) -> str:
+    return feed.vehicle_positions_url if kind is FeedKind.VEHICLE_POSITIONS else feed.trip_updates_url
+
+
+def _publish(
+    publisher: Publisher, fetcher: FeedFetcher, feed: FeedConfig, kind: FeedKind, future: Future[bytes | None]
+) -> None:
+    try:
+        data = future.result()
+    except Exception as e:
+        logger.exception(f"Error polling {feed.agency.value} {kind.value}: {e}")
+        return
+    if data is None:
+        logger.debug(f"{feed.agency.value}: {kind.value} unchanged")
+        if kind is FeedKind.VEHICLE_POSITIONS:
+            publisher.confirm_vehicle_positions(feed)
+        return
+
+    try:
+        if kind is FeedKind.VEHICLE_POSITIONS:
+            count = publisher.publish_vehicle_positions(feed, data)
+        else:
+            count = publisher.process_trip_updates(feed, data)
+        logger.info(f"{feed.agency.value}: {kind.value}={count}")
+    except Exception as e:
+        # Not published - make the fetcher return the same payload again instead of skipping it as already seen
+        fetcher.forget(_url(feed, kind))
+        logger.exception(f"Error publishing {feed.agency.value} {kind.value}: {e}")
+
+
 def run_poller() -> None:
-    """Run the GTFS Realtime poller loop"""
+    """
+    Run the GTFS Realtime poller loop.
+
+    All feeds are fetched concurrently and each one is published as soon as its download completes, so the cycle
+    takes roughly as long as the slowest single fetch. A fetch that is still running when the next cycle starts is
+    not submitted again - its result is published whenever it arrives. Feeds that have not changed since the previous
+    poll are skipped without parsing. At the end of each cycle the API's live positions snapshot is rewritten if any
+    vehicle positions feed or the static data changed, or a feed has failed for too long, and its expiry extended
+    otherwise.
+    """
     redis = get_client()
-    publisher = Publisher(redis)
+    static = StaticHolder(StaticSnapshot.build)
+    static.start_watcher(redis)
+    publisher = Publisher(redis, get_config().transport, static)
+    fetcher = FeedFetcher()
     feeds = get_all_feed_configs()
+    jobs: list[FeedJob] = [(feed, kind) for feed in feeds for kind in FeedKind]
+    in_flight: dict[Future[bytes | None], FeedJob] = {}
 
     logger.info(f"Starting poller for {len(feeds)} feeds")
 
-    while not shutdown_event.is_set():
-        for feed in feeds:
-            if shutdown_event.is_set():
-                break
-            try:
-                vp_data = fetch_vehicle_positions(feed)
-                vp_count = publisher.publish_vehicle_positions(feed, vp_data)
+    with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="feed-fetch") as pool:
+        while not shutdown_event.is_set():
+            cycle_start = time.monotonic()
 
-                tu_data = fetch_trip_updates(feed)
-                tu_count = publisher.process_trip_updates(feed, tu_data)
+            busy = set(in_flight.values())
+            for feed, kind in jobs:
+                if (feed, kind) in busy:
+                    logger.warning(f"{feed.agency.value}: {kind.value} fetch still in flight, skipping this cycle")
+                    continue
+                in_flight[pool.submit(_fetch, fetcher, feed, kind)] = (feed, kind)
 
-                logger.info(f"{feed.agency.value}: VP={vp_count}, TU={tu_count}")
+            try:
+                for future in as_completed(list(in_flight), timeout=POLL_INTERVAL_SECONDS):
+                    feed, kind = in_flight.pop(future)
+                    _publish(publisher, fetcher, feed, kind, future)
+            except TimeoutError:
+                logger.warning(f"{len(in_flight)} feed fetches exceeded the poll interval")
 
+            try:
+                publisher.publish_live_snapshot()
             except Exception as e:
-                logger.exception(f"Error polling {feed.agency.value}: {e}")
+                logger.exception(f"Error publishing live vehicles snapshot: {e}")
+
+            elapsed = time.monotonic() - cycle_start
+            shutdown_event.wait(timeout=max(0.0, POLL_INTERVAL_SECONDS - elapsed))
 
-        shutdown_event.wait(timeout=POLL_INTERVAL_SECONDS)
+    fetcher.close()
+    static.stop_watcher()
 
 
 def main() -> None:
@@ -1,65 +1,130 @@
-import json
 import logging
+import math
+import time
+from dataclasses import dataclass
 
+import numpy as np
 import redis
-from cachetools import LRUCache
 
-from app.common.constants import CACHE_MAX_STOP_ID_TO_SEQ, VEHICLE_POSITIONS_CHANNEL
-from app.common.db.connection import get_session
-from app.common.db.repositories.gtfs_static import GtfsStaticRepository
+from app.common.config import TransportConfig
+from app.common.constants import REDIS_TRIP_UPDATES_TTL, STREAM_MAXLEN, TRIP_UPDATES_RESYNC_SECONDS
 from app.common.feeds import FeedConfig
-from app.common.gtfs.parser import parse_trip_updates, parse_vehicle_positions
+from app.common.gtfs.parser import parse_trip_updates, parse_vehicle_positions_batch
+from app.common.gtfs.snapshot import StaticHolder, StaticSnapshot
+from app.common.models.enums import Agency, Transport
+from app.common.models.gtfs_realtime import StopTimeUpdate, TripUpdate, VehiclePositionBatch
+from app.common.partitioning import channel_key, partition_for, stream_key
+from app.common.redis import serializer
+from app.common.redis.repositories.live_vehicles import LiveVehiclesRepository
 from app.common.redis.repositories.trip_updates import TripUpdatesRepository
+from app.rt_poller.live import LiveSnapshot
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class _SeenTrip:
+    """Stop time updates of a trip as of the last poll, and when its cache entry was last written."""
+
+    stop_time_updates: list[StopTimeUpdate]
+    written_at: float  # time.monotonic()
+
+
 class Publisher:
-    """Publishes parsed GTFS RT data to Redis Pub/Sub."""
+    """Publishes parsed GTFS RT data to Redis Pub/Sub or Redis Streams."""
 
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, transport: TransportConfig, static: StaticHolder[StaticSnapshot]):
         self._redis = redis_client
+        self._transport = transport
+        self._static = static
         self._trip_updates_repository = TripUpdatesRepository(redis_client)
-        self._stop_id_to_seq_cache: LRUCache[str, dict[str, int]] = LRUCache(maxsize=CACHE_MAX_STOP_ID_TO_SEQ)
+        self._live = LiveSnapshot(LiveVehiclesRepository(redis_client), static)
+        self._seen_trips: dict[Agency, dict[str, _SeenTrip]] = {}
+        self._last_resync: dict[Agency, float] = {}
 
     def publish_vehicle_positions(self, feed: FeedConfig, pb_data: bytes) -> int:
         """
-        Parse and publish vehicle positions to Redis Pub/Sub. Returns number of positions published.
+        Parse and publish vehicle positions. Returns number of positions published.
+
+        The feed is parsed into a columnar batch and each partition's share goes out as a single msgpack message,
+        all in one pipeline, so a poll costs one round trip regardless of the number of vehicles.
         """
-        positions = parse_vehicle_positions(pb_data, feed)
-
-        for pos in positions:
-            message = {
-                "agency": pos.agency.value,
-                "trip_id": pos.trip_id,
-                "vehicle_id": pos.vehicle_id,
-                "license_plate": pos.license_plate,
-                "stop_id": pos.stop_id,
-                "stop_sequence": pos.stop_sequence,
-                "status": pos.status.value if pos.status else None,
-                "timestamp": pos.timestamp.isoformat(),
-            }
-            self._redis.publish(VEHICLE_POSITIONS_CHANNEL, json.dumps(message))
-
-        return len(positions)
+        batch = parse_vehicle_positions_batch(pb_data, feed)
+        self._live.update(batch)
+        if not len(batch):
+            return 0
+
+        pipe = self._redis.pipeline(transaction=False)
+        for partition, partition_batch in self._split(batch):
+            data = serializer.encode_vehicle_positions_batch(partition_batch)
+            if self._transport.kind is Transport.STREAM:
+                # Trim each stream to roughly STREAM_MAXLEN entries
+                pipe.xadd(stream_key(partition), {"data": data}, maxlen=STREAM_MAXLEN, approximate=True)
+            else:
+                pipe.publish(channel_key(partition, self._transport.partitions), data)
+        pipe.execute()
+        return len(batch)
+
+    def confirm_vehicle_positions(self, feed: FeedConfig) -> None:
+        """Record that the feed was polled and has not changed, so its vehicles stay in the live snapshot."""
+        self._live.confirm(feed.agency)
+
+    def publish_live_snapshot(self) -> int | None:
+        """Write the API's live positions snapshot if anything changed (see LiveSnapshot.publish)."""
+        return self._live.publish()
+
+    def _split(self, batch: VehiclePositionBatch) -> list[tuple[int, VehiclePositionBatch]]:
+        """Split the batch by the partition (and so the stop writer worker) owning each vehicle."""
+        partitions = self._transport.partitions
+        if partitions <= 1:
+            return [(0, batch)]
+        agency = batch.agency.value
+        owners = np.fromiter(
+            (partition_for(agency, plate, partitions) for plate in batch.license_plate.tolist()),
+            dtype=np.int32,
+            count=len(batch),
+        )
+        return [(int(p), batch.select(owners == p)) for p in np.unique(owners)]
 
     def process_trip_updates(self, feed: FeedConfig, pb_data: bytes) -> int:
         """
         Parse and cache trip updates in Redis. Returns number of trip updates processed.
+
+        Only trips whose stop time updates differ from the previous poll are merged, by a server-side script fired
+        for all of them in one pipeline without reading anything back. Unchanged trips just get their TTL refreshed
+        every half TTL, and every TRIP_UPDATES_RESYNC_SECONDS all trips are rewritten so that an entry lost in Redis
+        (e.g. after a restart) is rebuilt.
         """
         updates = parse_trip_updates(pb_data, feed)
+        agency = feed.agency
+        now = time.monotonic()
 
-        with get_session() as session:
-            static_repo = GtfsStaticRepository(session)
+        resync = now - self._last_resync.get(agency, -math.inf) >= TRIP_UPDATES_RESYNC_SECONDS
+        previous = self._seen_trips.get(agency, {})
+        seen: dict[str, _SeenTrip] = {}
+        changed: dict[str, TripUpdate] = {}
+        touched: list[tuple[str, str]] = []
 
-            for update in updates:
-                stop_id_to_seq = self._get_stop_id_to_seq(static_repo, update.trip_id)
-                self._trip_updates_repository.update(update, stop_id_to_seq)
+        for update in updates:
+            prev = previous.get(update.trip_id)
+            if resync or prev is None or prev.stop_time_updates != update.stop_time_updates:
+                changed[update.trip_id] = update
+                seen[update.trip_id] = _SeenTrip(update.stop_time_updates, now)
+            elif now - prev.written_at >= REDIS_TRIP_UPDATES_TTL / 2:
+                touched.append((agency.value, update.trip_id))
+                seen[update.trip_id] = _SeenTrip(prev.stop_time_updates, now)
+            else:
+                seen[update.trip_id] = prev
 
-        return len(updates)
+        if changed or touched:
+            snapshot = self._static.current
+            self._trip_updates_repository.merge_many(
+                [(update, snapshot.stop_id_to_sequence(trip_id)) for trip_id, update in changed.items()], touched
+            )
 
-    def _get_stop_id_to_seq(self, repo: GtfsStaticRepository, trip_id: str) -> dict[str, int]:
-        """Get stop_id to stop_sequence mapping with caching."""
-        if trip_id not in self._stop_id_to_seq_cache:
-            self._stop_id_to_seq_cache[trip_id] = repo.build_stop_id_to_sequence_map(trip_id)
-        return self._stop_id_to_seq_cache[trip_id]
+        # Only remember the snapshot once it is in Redis - a failed write is retried in full on the next poll
+        self._seen_trips[agency] = seen
+        if resync:
+            self._last_resync[agency] = now
+        logger.debug(f"{agency.value}: {len(changed)} trip updates changed, {len(touched)} refreshed")
+        return len(updates)
@@ -1,55 +1,36 @@
 from datetime import date, datetime
-from zoneinfo import ZoneInfo
-
-from cachetools import LRUCache
-from sqlalchemy.orm import Session
-
-from app.common.constants import (
-    CACHE_MAX_SEQUENCES,
-    CACHE_MAX_STOP_TIMES,
-    CACHE_MAX_STOPS,
-    CACHE_MAX_TRIPS,
-    DELAY_DROP_THRESHOLD,
-)
-from app.common.db.models import CurrentStop, CurrentStopTime, CurrentTrip
-from app.common.db.repositories.gtfs_meta import GtfsMetaRepository
-from app.common.db.repositories.gtfs_static import GtfsStaticRepository
+
+from app.common.constants import DELAY_DROP_THRESHOLD, TZ
+from app.common.gtfs.snapshot import StaticHolder, StaticSnapshot, StopInfo, StopTimeInfo, TripInfo
 from app.common.gtfs.timeparse import compute_delay_seconds, compute_planned_time, compute_service_date
 from app.common.models.enums import Agency, DetectionMethod
 from app.common.models.events import StopEvent
 from app.common.models.gtfs_realtime import VehiclePosition
-from app.common.redis.repositories.saved_sequences import SavedSequencesRepository
 from app.common.redis.repositories.trip_updates import TripUpdatesRepository
-from app.common.redis.repositories.vehicle_state import VehicleStateRepository
 from app.common.redis.schemas import VehicleState
-
-TZ = ZoneInfo("Europe/Warsaw")
+from app.stop_writer.state import SavedSequencesStore, VehicleStateStore
 
 
 class StopEventDetector:
     def __init__(
         self,
-        session: Session,
-        redis_vehicle_state: VehicleStateRepository,
+        static: StaticHolder[StaticSnapshot],
+        vehicle_states: VehicleStateStore,
         redis_trip_updates: TripUpdatesRepository,
-        redis_saved_seqs: SavedSequencesRepository,
+        saved_seqs: SavedSequencesStore,
     ):
-        self._session = session
-        self._static_repo = GtfsStaticRepository(session)
-        self._meta_repo = GtfsMetaRepository(session)
-        self._vehicle_state = redis_vehicle_state
+        self._static = static
+        self._snapshot = static.current
+        self._vehicle_state = vehicle_states
         self._trip_updates = redis_trip_updates
-        self._saved_seqs = redis_saved_seqs
-
-        self._trip_cache: LRUCache[str, CurrentTrip] = LRUCache(maxsize=CACHE_MAX_TRIPS)
-        self._stop_cache: LRUCache[str, CurrentStop] = LRUCache(maxsize=CACHE_MAX_STOPS)
-        self._stop_times_cache: LRUCache[str, dict[int, CurrentStopTime]] = LRUCache(maxsize=CACHE_MAX_STOP_TIMES)
-        self._max_seq_cache: LRUCache[str, int] = LRUCache(maxsize=CACHE_MAX_SEQUENCES)
+        self._saved_seqs = saved_seqs
 
     def process_update(self, vp: VehiclePosition) -> list[StopEvent]:
         if vp.stop_sequence is None or vp.license_plate is None:
             return []
 
+        # Pin one snapshot for the whole update so a concurrent swap can't mix two static versions
+        self._snapshot = self._static.current
         events: list[StopEvent] = []
         agency_str = vp.agency.value
 
@@ -91,13 +72,19 @@ class StopEventDetector:
             curr_seq = vp.stop_sequence
 
             if curr_seq > prev_seq:
-                for missed_seq in range(prev_seq, curr_seq):
-                    if self._saved_seqs.is_saved(agency_str, vp.trip_id, service_date, missed_seq):
-                        continue
-
-                    event_time = self._trip_updates.get_arrival(agency_str, vp.trip_id, missed_seq)
-                    if not event_time:
+                missed_seqs = [
+                    seq
+                    for seq in range(prev_seq, curr_seq)
+                    if not self._saved_seqs.is_saved(agency_str, vp.trip_id, service_date, seq)
+                ]
+                # One HMGET for the whole jump instead of a round trip per missed stop
+                cached_stops = self._trip_updates.get_stops(agency_str, vp.trip_id, missed_seqs)
+
+                for missed_seq in missed_seqs:
+                    cached = cached_stops.get(missed_seq)
+                    if not cached:
                         continue
+                    event_time = cached.last_seen_arrival
 
                     missed_stop_time = self._get_stop_time(vp.trip_id, missed_seq)
                     if not missed_stop_time:
@@ -172,7 +159,14 @@ class StopEventDetector:
         if not max_seq:
             return events
 
-        for seq in range(prev_state.current_stop_sequence + 1, max_seq + 1):
+        remaining = range(prev_state.current_stop_sequence + 1, max_seq + 1)
+        cached_stops = self._trip_updates.get_stops(agency_str, trip_id, remaining)
+
+        for seq in remaining:
+            cached_stop = cached_stops.get(seq)
+            if not cached_stop:
+                continue
+
             stop_time = self._get_stop_time(trip_id, seq)
             if not stop_time:
                 continue
@@ -182,14 +176,6 @@ class StopEventDetector:
             if self._saved_seqs.is_saved(agency_str, trip_id, service_date, seq):
                 continue
 
-            cache = self._trip_updates.get(agency_str, trip_id)
-            if not cache:
-                continue
-
-            cached_stop = cache.stops.get(seq)
-            if not cached_stop:
-                continue
-
             if seq == max_seq:
                 event_time = cached_stop.first_seen_arrival
                 detection_method = DetectionMethod.TIMEOUT
@@ -238,8 +224,8 @@ class StopEventDetector:
         stop_sequence: int,
         event_time: datetime,
         service_date: date,
-        trip: CurrentTrip,
-        stop_time: CurrentStopTime,
+        trip: TripInfo,
+        stop_time: StopTimeInfo,
         detection_method: DetectionMethod,
         is_estimated: bool,
     ) -> StopEvent | None:
@@ -247,7 +233,7 @@ class StopEventDetector:
         if not stop:
             return None
 
-        static_hash = self._meta_repo.get_current_hash(vp.agency)
+        static_hash = self._get_static_hash(vp.agency)
         if not static_hash:
             return None
 
@@ -264,7 +250,7 @@ class StopEventDetector:
             service_date=service_date,
             stop_sequence=stop_sequence,
             stop_id=stop_time.stop_id,
-            line_number=trip.route.route_short_name,
+            line_number=trip.line_number,
             stop_name=stop.stop_name,
             stop_desc=stop.stop_desc,
             direction_id=trip.direction_id,
@@ -280,29 +266,17 @@ class StopEventDetector:
             max_stop_sequence=max_seq,
         )
 
-    def _get_trip(self, trip_id: str) -> CurrentTrip | None:
-        if trip_id not in self._trip_cache:
-            trip = self._static_repo.get_trip(trip_id)
-            if trip:
-                self._trip_cache[trip_id] = trip
-        return self._trip_cache.get(trip_id)
-
-    def _get_stop(self, stop_id: str) -> CurrentStop | None:
-        if stop_id not in self._stop_cache:
-            stop = self._static_repo.get_stop(stop_id)
-            if stop:
-                self._stop_cache[stop_id] = stop
-        return self._stop_cache.get(stop_id)
-
-    def _get_stop_time(self, trip_id: str, stop_sequence: int) -> CurrentStopTime | None:
-        if trip_id not in self._stop_times_cache:
-            stop_times = self._static_repo.get_stop_times_for_trip(trip_id)
-            self._stop_times_cache[trip_id] = {st.stop_sequence: st for st in stop_times}
-        return self._stop_times_cache.get(trip_id, {}).get(stop_sequence)
+    def _get_trip(self, trip_id: str) -> TripInfo | None:
+        return self._snapshot.get_trip(trip_id)
+
+    def _get_stop(self, stop_id: str) -> StopInfo | None:
+        return self._snapshot.get_stop(stop_id)
+
+    def _get_stop_time(self, trip_id: str, stop_sequence: int) -> StopTimeInfo | None:
+        return self._snapshot.get_stop_time(trip_id, stop_sequence)
 
     def _get_max_stop_sequence(self, trip_id: str) -> int | None:
-        if trip_id not in self._max_seq_cache:
-            max_seq = self._static_repo.get_max_stop_sequence(trip_id)
-            if max_seq:
-                self._max_seq_cache[trip_id] = max_seq
-        return self._max_seq_cache.get(trip_id)
+        return self._snapshot.get_max_stop_sequence(trip_id)
+
+    def _get_static_hash(self, agency: Agency) -> str | None:
+        return self._snapshot.get_hash(agency)
@@ -0,0 +1,183 @@
+import logging
+import os
+import struct
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import BinaryIO
+
+import msgspec
+
+from app.common.constants import (
+    JOURNAL_MAX_BYTES,
+    JOURNAL_REPLAY_INTERVAL,
+    JOURNAL_SEGMENT_MAX_BYTES,
+)
+from app.common.db.connection import get_session
+from app.common.db.repositories.stop_event import StopEventRepository
+from app.common.models.events import StopEvent
+
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct(">I")
+_SUFFIX = ".journal"
+_CORRUPT_SUFFIX = ".corrupt"
+
+_encoder = msgspec.msgpack.Encoder()
+_batch_decoder = msgspec.msgpack.Decoder(list[StopEvent])
+
+
+def read_segment(path: Path) -> list[list[StopEvent]]:
+    """
+    Read every complete record of a segment. A torn record at the end (crash mid-append) is ignored - its batch was
+    never acknowledged, so it will be redelivered and re-detected.
+    """
+    batches: list[list[StopEvent]] = []
+    data = path.read_bytes()
+    offset = 0
+    while offset + _LENGTH.size <= len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        start = offset + _LENGTH.size
+        if start + length > len(data):
+            logger.warning(f"{path.name}: torn record at offset {offset}, ignoring the tail")
+            break
+        batches.append(_batch_decoder.decode(data[start : start + length]))
+        offset = start + length
+    return batches
+
+
+class SpillJournal:
+    """
+    Append-only on-disk journal for stop event batches that could not be written to the database.
+
+    Each batch is one record - a 4-byte big-endian length followed by the msgpack-encoded events - and is fsynced
+    before append() returns, so a spilled batch survives a crash and its source messages can be acknowledged.
+    Records go to numbered segment files that are rotated at JOURNAL_SEGMENT_MAX_BYTES; segments are deleted once
+    replayed, and the oldest are dropped if the journal ever outgrows JOURNAL_MAX_BYTES.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_max_bytes: int = JOURNAL_SEGMENT_MAX_BYTES,
+        max_bytes: int = JOURNAL_MAX_BYTES,
+    ):
+        self._dir = directory
+        self._segment_max_bytes = segment_max_bytes
+        self._max_bytes = max_bytes
+        self._lock = Lock()
+        self._file: BinaryIO | None = None
+        self._dir.mkdir(parents=True, exist_ok=True)
+        existing = self.segments()
+        self._next_id = int(existing[-1].stem) + 1 if existing else 0
+
+    def segments(self) -> list[Path]:
+        """All segment files, oldest first (including the one currently being appended to)."""
+        return sorted(self._dir.glob(f"*{_SUFFIX}"))
+
+    def append(self, events: list[StopEvent]) -> None:
+        payload = _encoder.encode(events)
+        with self._lock:
+            file = self._file
+            if file is None or file.tell() >= self._segment_max_bytes:
+                file = self._open_segment()
+            file.write(_LENGTH.pack(len(payload)) + payload)
+            file.flush()
+            os.fsync(file.fileno())
+        self._enforce_limit()
+
+    def seal(self) -> list[Path]:
+        """Close the active segment and return every sealed segment, ready to be replayed."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            return self.segments()
+
+    def remove(self, path: Path) -> None:
+        """Delete a replayed segment. It may already be gone if it was dropped to enforce the size limit."""
+        with self._lock:
+            path.unlink(missing_ok=True)
+
+    def quarantine(self, path: Path) -> None:
+        """Set aside a segment that cannot be decoded, so it no longer blocks the newer ones and can be inspected."""
+        with self._lock:
+            try:
+                path.rename(path.with_suffix(_CORRUPT_SUFFIX))
+            except FileNotFoundError:
+                return
+        logger.error(f"Spill journal segment {path.name} is corrupt, moved aside as {path.stem}{_CORRUPT_SUFFIX}")
+
+    def _open_segment(self) -> BinaryIO:
+        if self._file is not None:
+            self._file.close()
+        path = self._dir / f"{self._next_id:012d}{_SUFFIX}"
+        self._next_id += 1
+        self._file = path.open("ab")
+        logger.info(f"Opened spill journal segment {path.name}")
+        return self._file
+
+    def _enforce_limit(self) -> None:
+        with self._lock:
+            active = Path(self._file.name) if self._file is not None else None
+            segments = self.segments()
+            total = sum(p.stat().st_size for p in segments)
+            for path in segments:
+                if total <= self._max_bytes or path == active:
+                    break
+                size = path.stat().st_size
+                path.unlink()
+                total -= size
+                logger.error(f"Spill journal over {self._max_bytes} bytes, dropped oldest segment {path.name}")
+
+    def close(self) -> None:
+        self.seal()
+
+
+class JournalReplayer:
+    """Background thread that drains spilled batches into stop_events once the database is reachable again."""
+
+    def __init__(self, journal: SpillJournal, interval: float = JOURNAL_REPLAY_INTERVAL):
+        self._journal = journal
+        self._interval = interval
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="journal-replayer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            if not self._journal.segments():
+                continue
+            try:
+                self.replay()
+            except Exception as e:
+                logger.warning(f"Spill journal replay failed, will retry: {e}")
+
+    def replay(self) -> int:
+        """
+        Replay every sealed segment, each in its own transaction. Inserts are ON CONFLICT DO NOTHING, so a segment
+        that was partially replayed before a crash can safely be replayed again. A segment with a corrupt record is
+        quarantined rather than retried forever. Returns the number of events replayed.
+        """
+        replayed = 0
+        for path in self._journal.seal():
+            try:
+                batches = read_segment(path)
+            except FileNotFoundError:
+                # Dropped to enforce the size limit since seal()
+                continue
+            except msgspec.DecodeError:
+                self._journal.quarantine(path)
+                continue
+            with get_session() as session:
+                repo = StopEventRepository(session)
+                for events in batches:
+                    replayed += repo.insert_batch(events)
+            self._journal.remove(path)
+            logger.info(f"Replayed spill journal segment {path.name} ({len(batches)} batches)")
+        return replayed
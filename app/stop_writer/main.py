@@ -1,16 +1,25 @@
 import logging
+import multiprocessing
 import signal
+from multiprocessing.process import BaseProcess
 from threading import Event
 from typing import Any
 
+from app.common.config import get_config
+from app.common.constants import SUPERVISOR_CHECK_INTERVAL, SUPERVISOR_SHUTDOWN_TIMEOUT
 from app.common.db.connection import get_session
 from app.common.gtfs.readiness import wait_for_gtfs_ready
+from app.common.gtfs.snapshot import StaticHolder, StaticSnapshot
+from app.common.models.enums import Transport
+from app.common.partitioning import channel_key, owned_partitions, partition_for
 from app.common.redis.connection import get_client
 from app.common.redis.repositories.saved_sequences import SavedSequencesRepository
 from app.common.redis.repositories.trip_updates import TripUpdatesRepository
 from app.common.redis.repositories.vehicle_state import VehicleStateRepository
 from app.stop_writer.detector import StopEventDetector
-from app.stop_writer.subscriber import Subscriber
+from app.stop_writer.journal import JournalReplayer, SpillJournal
+from app.stop_writer.state import SavedSequencesStore, VehicleStateStore
+from app.stop_writer.subscriber import StreamSubscriber, Subscriber
 from app.stop_writer.writer import BatchWriter
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -24,25 +33,42 @@ def signal_handler(*args: Any) -> None:
     shutdown_event.set()
 
 
-def run_writer() -> None:
+def run_writer(worker: int = 0) -> None:
+    """Run one stop writer: consume the partitions owned by `worker`, detect stop events and persist them."""
+    config = get_config()
+    transport = config.transport
+    partitions = owned_partitions(worker, config.writer_workers, transport.partitions)
+    owned = set(partitions)
+
     redis_client = get_client()
+    static = StaticHolder(StaticSnapshot.build)
+    static.start_watcher(redis_client)
 
-    vehicle_state_repo = VehicleStateRepository(redis_client)
+    vehicle_states = VehicleStateStore(VehicleStateRepository(redis_client))
+    vehicle_states.load(lambda s: partition_for(s.agency, s.license_plate, transport.partitions) in owned)
     trip_updates_repo = TripUpdatesRepository(redis_client)
-    saved_seqs_repo = SavedSequencesRepository(redis_client)
+    saved_seqs = SavedSequencesStore(SavedSequencesRepository(redis_client))
+
+    subscriber: Subscriber | StreamSubscriber
+    if transport.kind is Transport.STREAM:
+        subscriber = StreamSubscriber(redis_client, partitions)
+    else:
+        subscriber = Subscriber(redis_client, [channel_key(p, transport.partitions) for p in partitions])
 
-    subscriber = Subscriber(redis_client)
+    journal = SpillJournal(config.data_dir / "spill" / str(worker))
+    replayer = JournalReplayer(journal)
+    replayer.start()
 
-    logger.info("Starting stop writer")
+    logger.info(f"Starting stop writer {worker} ({transport.kind.value} transport, partitions {partitions})")
 
     with get_session() as session:
         detector = StopEventDetector(
-            session=session,
-            redis_vehicle_state=vehicle_state_repo,
+            static=static,
+            vehicle_states=vehicle_states,
             redis_trip_updates=trip_updates_repo,
-            redis_saved_seqs=saved_seqs_repo,
+            saved_seqs=saved_seqs,
         )
-        writer = BatchWriter(session)
+        writer = BatchWriter(session, checkpoint=subscriber.checkpoint, journal=journal)
 
         try:
             while not shutdown_event.is_set():
@@ -53,9 +79,50 @@ def run_writer() -> None:
                         writer.add_many(events)
                 else:
                     writer.flush()
+                vehicle_states.flush_if_due()
+                saved_seqs.flush_if_due()
         finally:
-            writer.flush()
+            writer.close()
+            vehicle_states.flush()
+            saved_seqs.flush()
             subscriber.close()
+            static.stop_watcher()
+            replayer.stop()
+            journal.close()
+
+
+def _worker_main(worker: int) -> None:
+    """Entry point of a worker process spawned by the supervisor."""
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    run_writer(worker)
+
+
+def run_supervisor(workers: int) -> None:
+    """
+    Run `workers` stop writer processes, each owning its own share of the vehicle partitions (and so its own
+    detector, writer and in-process state). A worker that dies is restarted; on shutdown every worker gets SIGTERM
+    and is given time to flush.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    processes: dict[int, BaseProcess] = {}
+
+    while not shutdown_event.is_set():
+        for worker in range(workers):
+            process = processes.get(worker)
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.error(f"Stop writer worker {worker} exited with code {process.exitcode}, restarting")
+            process = ctx.Process(target=_worker_main, args=(worker,), name=f"stop-writer-{worker}")
+            process.start()
+            processes[worker] = process
+        shutdown_event.wait(SUPERVISOR_CHECK_INTERVAL)
+
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        process.join(timeout=SUPERVISOR_SHUTDOWN_TIMEOUT)
 
 
 def main() -> None:
@@ -64,8 +131,12 @@ def main() -> None:
 
     logger.info("Stop Writer starting, waiting for GTFS data...")
     wait_for_gtfs_ready()
-    logger.info("GTFS ready, starting writer")
-    run_writer()
+    workers = get_config().writer_workers
+    logger.info(f"GTFS ready, starting {workers} writer(s)")
+    if workers > 1:
+        run_supervisor(workers)
+    else:
+        run_writer()
     logger.info("Stop writer shutdown complete")
 
 
@@ -0,0 +1,151 @@
+import logging
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import UTC, date, datetime, timedelta
+
+import redis
+
+from app.common.constants import REDIS_VEHICLE_STATE_TTL, STATE_FLUSH_INTERVAL, TZ
+from app.common.redis.repositories.saved_sequences import SavedKey, SavedSequencesRepository
+from app.common.redis.repositories.vehicle_state import VehicleStateRepository
+from app.common.redis.schemas import VehicleState
+
+logger = logging.getLogger(__name__)
+
+_VehicleKey = tuple[str, str]  # (agency, license_plate)
+
+
+class VehicleStateStore:
+    """
+    In-process vehicle state table with write-behind to Redis.
+
+    The stop writer is the only process that reads or writes vehicle state, so while it runs the dict is
+    authoritative and the detector never waits on Redis. Changes are written back in one pipelined batch per flush
+    interval, and the table is rehydrated from Redis on startup so a restart does not lose in-progress trips.
+    """
+
+    def __init__(self, repo: VehicleStateRepository, flush_interval: timedelta = STATE_FLUSH_INTERVAL):
+        self._repo = repo
+        self._flush_interval = flush_interval
+        self._states: dict[_VehicleKey, VehicleState] = {}
+        self._dirty: set[_VehicleKey] = set()
+        self._deleted: set[_VehicleKey] = set()
+        self._last_flush = datetime.now(UTC)
+
+    def load(self, owns: Callable[[VehicleState], bool] | None = None) -> int:
+        """
+        Rehydrate the table from Redis. Returns the number of vehicles loaded. With several worker processes each
+        one passes `owns` to keep only the vehicles routed to it.
+        """
+        for state in self._repo.get_all():
+            if owns is None or owns(state):
+                self._states[(state.agency, state.license_plate)] = state
+        logger.info(f"Loaded {len(self._states)} vehicle states from Redis")
+        return len(self._states)
+
+    def get(self, agency: str, license_plate: str) -> VehicleState | None:
+        return self._states.get((agency, license_plate))
+
+    def save(self, state: VehicleState) -> None:
+        key = (state.agency, state.license_plate)
+        self._states[key] = state
+        self._dirty.add(key)
+        self._deleted.discard(key)
+
+    def delete(self, agency: str, license_plate: str) -> None:
+        key = (agency, license_plate)
+        self._states.pop(key, None)
+        self._dirty.discard(key)
+        self._deleted.add(key)
+
+    def flush_if_due(self) -> None:
+        if datetime.now(UTC) - self._last_flush > self._flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write dirty and deleted entries to Redis in one pipeline. On failure they stay pending and are retried on the
+        next flush - the in-process table remains authoritative either way.
+        """
+        self._last_flush = datetime.now(UTC)
+        self._evict_expired()
+        if not self._dirty and not self._deleted:
+            return 0
+
+        dirty, deleted = self._dirty, self._deleted
+        self._dirty, self._deleted = set(), set()
+        try:
+            self._repo.write_many((self._states[key] for key in dirty), deleted)
+        except redis.RedisError:
+            logger.warning("Failed to flush vehicle states to Redis, will retry", exc_info=True)
+            self._dirty, self._deleted = dirty, deleted
+            return 0
+        return len(dirty) + len(deleted)
+
+    def _evict_expired(self) -> None:
+        """Drop vehicles not seen for longer than the Redis TTL - their Redis copy expires on its own."""
+        cutoff = datetime.now(UTC) - timedelta(seconds=REDIS_VEHICLE_STATE_TTL)
+        expired = [key for key, state in self._states.items() if state.last_timestamp < cutoff]
+        for key in expired:
+            del self._states[key]
+            self._dirty.discard(key)
+
+
+class SavedSequencesStore:
+    """
+    In-process cache of stop sequences already saved, kept as one bitset per (agency, trip, service_date).
+
+    The first lookup for a trip loads its set with a single SMEMBERS; after that dedup checks are local bit tests.
+    New marks are buffered and written back with one pipeline per flush. Entries for service dates older than
+    yesterday are evicted - their Redis sets expire on their own.
+    """
+
+    def __init__(self, repo: SavedSequencesRepository, flush_interval: timedelta = STATE_FLUSH_INTERVAL):
+        self._repo = repo
+        self._flush_interval = flush_interval
+        self._saved: dict[SavedKey, int] = {}
+        self._pending: defaultdict[SavedKey, set[int]] = defaultdict(set)
+        self._last_flush = datetime.now(UTC)
+
+    def _bits(self, key: SavedKey) -> int:
+        bits = self._saved.get(key)
+        if bits is None:
+            bits = 0
+            for seq in self._repo.get_saved(*key):
+                bits |= 1 << seq
+            self._saved[key] = bits
+        return bits
+
+    def is_saved(self, agency: str, trip_id: str, service_date: date, stop_sequence: int) -> bool:
+        return bool(self._bits((agency, trip_id, service_date)) >> stop_sequence & 1)
+
+    def mark_saved(self, agency: str, trip_id: str, service_date: date, stop_sequence: int) -> None:
+        key = (agency, trip_id, service_date)
+        self._saved[key] = self._bits(key) | 1 << stop_sequence
+        self._pending[key].add(stop_sequence)
+
+    def flush_if_due(self) -> None:
+        if datetime.now(UTC) - self._last_flush > self._flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered marks to Redis in one pipeline. On failure they stay buffered for the next flush."""
+        self._last_flush = datetime.now(UTC)
+        self._evict_old_dates()
+        if not self._pending:
+            return 0
+
+        pending = self._pending
+        self._pending = defaultdict(set)
+        try:
+            self._repo.mark_saved_many(pending)
+        except redis.RedisError:
+            logger.warning("Failed to flush saved sequences to Redis, will retry", exc_info=True)
+            self._pending = pending
+            return 0
+        return sum(len(seqs) for seqs in pending.values())
+
+    def _evict_old_dates(self) -> None:
+        cutoff = datetime.now(TZ).date() - timedelta(days=1)
+        for key in [key for key in self._saved if key[2] < cutoff]:
+            del self._saved[key]
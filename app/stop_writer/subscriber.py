@@ -1,27 +1,74 @@
 import json
 import logging
+from collections import defaultdict, deque
+from collections.abc import Callable
 from datetime import datetime
+from functools import partial
 
 import redis
+from redis.typing import KeyT, StreamIdT
 
-from app.common.constants import SUBSCRIBER_TIMEOUT, VEHICLE_POSITIONS_CHANNEL
+from app.common.constants import (
+    STREAM_CONSUMER,
+    STREAM_GROUP,
+    STREAM_READ_COUNT,
+    SUBSCRIBER_TIMEOUT,
+    VEHICLE_POSITIONS_CHANNEL,
+)
 from app.common.models.enums import Agency, VehicleStatus
 from app.common.models.gtfs_realtime import VehiclePosition
+from app.common.partitioning import stream_key
+from app.common.redis import serializer
 
 logger = logging.getLogger(__name__)
 
 
+def _noop() -> None:
+    pass
+
+
+def decode_message(data: bytes) -> list[VehiclePosition]:
+    """
+    Decode a vehicle positions message. Accepts both the msgpack feed snapshot and the legacy per-vehicle JSON
+    message, so poller and writer can be deployed independently.
+    """
+    if data[:1] != b"{":
+        return serializer.decode_vehicle_positions(data)
+
+    payload = json.loads(data)
+    return [
+        VehiclePosition(
+            agency=Agency(payload["agency"]),
+            trip_id=payload["trip_id"],
+            vehicle_id=payload["vehicle_id"],
+            license_plate=payload["license_plate"],
+            latitude=None,
+            longitude=None,
+            bearing=None,
+            stop_id=payload["stop_id"],
+            stop_sequence=payload["stop_sequence"],
+            status=VehicleStatus(payload["status"]) if payload["status"] else None,
+            timestamp=datetime.fromisoformat(payload["timestamp"]),
+        )
+    ]
+
+
 class Subscriber:
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, channels: list[str] | None = None):
         self._redis = redis_client
+        self._channels = channels or [VEHICLE_POSITIONS_CHANNEL]
         self._pubsub = redis_client.pubsub()  # type: ignore[no-untyped-call]
-        self._pubsub.subscribe(VEHICLE_POSITIONS_CHANNEL)
+        self._pubsub.subscribe(*self._channels)
+        self._pending: deque[VehiclePosition] = deque()
 
     def get_next(self, timeout: float = SUBSCRIBER_TIMEOUT) -> VehiclePosition | None:
         """
-        Get next vehicle position message. Returns None if no message within timeout
-        or if message is unparseable. Reconnects automatically on Redis disconnect.
+        Get next vehicle position. Returns None if no message within timeout or if message is unparseable.
+        Reconnects automatically on Redis disconnect.
         """
+        if self._pending:
+            return self._pending.popleft()
+
         try:
             message = self._pubsub.get_message(timeout=timeout)
         except redis.ConnectionError:
@@ -33,24 +80,13 @@ class Subscriber:
             return None
 
         try:
-            data = json.loads(message["data"])
-            return VehiclePosition(
-                agency=Agency(data["agency"]),
-                trip_id=data["trip_id"],
-                vehicle_id=data["vehicle_id"],
-                license_plate=data["license_plate"],
-                latitude=None,
-                longitude=None,
-                bearing=None,
-                stop_id=data["stop_id"],
-                stop_sequence=data["stop_sequence"],
-                status=VehicleStatus(data["status"]) if data["status"] else None,
-                timestamp=datetime.fromisoformat(data["timestamp"]),
-            )
+            self._pending.extend(decode_message(message["data"]))
         except Exception as e:
             logger.exception(f"Failed to parse message: {e}")
             return None
 
+        return self._pending.popleft() if self._pending else None
+
     def _reconnect(self) -> None:
         try:
             self._pubsub.close()
@@ -58,10 +94,131 @@ class Subscriber:
             pass
         try:
             self._pubsub = self._redis.pubsub()  # type: ignore[no-untyped-call]
-            self._pubsub.subscribe(VEHICLE_POSITIONS_CHANNEL)
+            self._pubsub.subscribe(*self._channels)
             logger.info("Redis pub/sub reconnected")
         except redis.ConnectionError:
             logger.warning("Redis reconnect failed, will retry on next call")
 
+    def checkpoint(self) -> Callable[[], None]:
+        """Pub/sub has no delivery tracking - nothing to acknowledge."""
+        return _noop
+
     def close(self) -> None:
         self._pubsub.close()
+
+
+class StreamSubscriber:
+    """
+    Consumes vehicle positions from partitioned Redis Streams through a consumer group.
+
+    Entries stay in the group's pending list until acknowledged, so anything the writer has not committed yet is
+    redelivered after a crash or restart: on start the subscriber first re-reads its own pending entries ("0") and
+    only then switches to new ones (">").
+    """
+
+    def __init__(self, redis_client: redis.Redis, partitions: list[int]):
+        self._redis = redis_client
+        self._streams = [stream_key(p) for p in partitions]
+        self._read_from: dict[KeyT, StreamIdT] = dict.fromkeys(self._streams, "0")
+        # Positions waiting to be handed out. The last position of an entry carries its (stream, id) reference.
+        self._pending: deque[tuple[VehiclePosition | None, tuple[str, bytes] | None]] = deque()
+        self._delivered: defaultdict[str, list[bytes]] = defaultdict(list)
+
+        for key in self._streams:
+            self._ensure_group(key)
+
+    def _ensure_group(self, key: str) -> None:
+        try:
+            self._redis.xgroup_create(key, STREAM_GROUP, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def get_next(self, timeout: float = SUBSCRIBER_TIMEOUT) -> VehiclePosition | None:
+        """
+        Get next vehicle position. Returns None if no entry arrived within timeout or if the entry is unparseable.
+        """
+        if not self._pending:
+            try:
+                self._read(timeout)
+            except redis.ConnectionError:
+                logger.warning("Redis connection lost, will retry on next call")
+                return None
+
+        while self._pending:
+            position, entry = self._pending.popleft()
+            if entry is not None:
+                stream, entry_id = entry
+                self._delivered[stream].append(entry_id)
+            if position is not None:
+                return position
+
+        return None
+
+    def _read(self, timeout: float) -> None:
+        response: list[tuple[bytes, list[tuple[bytes, dict[bytes, bytes] | None]]]] | None
+        backlog: dict[KeyT, StreamIdT] = {key: since for key, since in self._read_from.items() if since != ">"}
+        if backlog:
+            # History reads return immediately, so BLOCK is only used once every backlog is drained
+            response = self._redis.xreadgroup(  # type: ignore[assignment]
+                STREAM_GROUP, STREAM_CONSUMER, backlog, count=STREAM_READ_COUNT
+            )
+        else:
+            response = self._redis.xreadgroup(  # type: ignore[assignment]
+                STREAM_GROUP, STREAM_CONSUMER, self._read_from, count=STREAM_READ_COUNT, block=int(timeout * 1000)
+            )
+
+        returned: set[str] = set()
+        for raw_key, entries in response or []:
+            key = raw_key.decode()
+            if entries:
+                # A drained history read still returns the stream, with no entries
+                returned.add(key)
+            for entry_id, fields in entries:
+                self._enqueue(key, entry_id, fields)
+                if key in backlog:
+                    self._read_from[key] = entry_id.decode()
+
+        for drained in backlog.keys() - returned:
+            logger.info(f"{drained!s}: pending backlog drained, reading new entries")
+            self._read_from[drained] = ">"
+
+    def _enqueue(self, key: str, entry_id: bytes, fields: dict[bytes, bytes] | None) -> None:
+        positions: list[VehiclePosition] = []
+        if fields:
+            try:
+                positions = decode_message(fields[b"data"])
+            except Exception as e:
+                logger.exception(f"Failed to parse stream entry {key} {entry_id!r}: {e}")
+
+        if not positions:
+            # Trimmed or unparseable entry - acknowledge it with the next checkpoint so it is not redelivered forever
+            self._pending.append((None, (key, entry_id)))
+            return
+
+        for pos in positions[:-1]:
+            self._pending.append((pos, None))
+        self._pending.append((positions[-1], (key, entry_id)))
+
+    def checkpoint(self) -> Callable[[], None]:
+        """
+        Snapshot the entries fully handed out so far. Returns a callback that acknowledges exactly those entries -
+        call it once the stop events derived from them are committed.
+        """
+        delivered = dict(self._delivered)
+        self._delivered = defaultdict(list)
+        if not delivered:
+            return _noop
+        return partial(self._ack, delivered)
+
+    def _ack(self, delivered: dict[str, list[bytes]]) -> None:
+        pipe = self._redis.pipeline(transaction=False)
+        for key, ids in delivered.items():
+            pipe.xack(key, STREAM_GROUP, *ids)
+        try:
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning("Failed to acknowledge stream entries, they will be redelivered on restart", exc_info=True)
+
+    def close(self) -> None:
+        pass
@@ -1,29 +1,74 @@
 import logging
+from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
+from queue import Queue
+from threading import Event, Thread
 
 from sqlalchemy.orm import Session
 
-from app.common.constants import WRITER_BATCH_SIZE, WRITER_FLUSH_INTERVAL
+from app.common.constants import (
+    WRITER_BATCH_SIZE,
+    WRITER_FLUSH_INTERVAL,
+    WRITER_MAX_ATTEMPTS,
+    WRITER_QUEUE_SIZE,
+    WRITER_RETRY_BACKOFF,
+    WRITER_RETRY_BACKOFF_MAX,
+)
 from app.common.db.repositories.stop_event import StopEventRepository
 from app.common.models.events import StopEvent
+from app.stop_writer.journal import SpillJournal
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class _Batch:
+    """Sealed buffer handed to the flush worker, with the callback to run once it is committed."""
+
+    events: list[StopEvent]
+    on_commit: Callable[[], None] | None
+
+
 class BatchWriter:
     def __init__(
         self,
         session: Session,
         batch_size: int = WRITER_BATCH_SIZE,
         flush_interval: timedelta = WRITER_FLUSH_INTERVAL,
+        checkpoint: Callable[[], Callable[[], None]] | None = None,
+        queue_size: int = WRITER_QUEUE_SIZE,
+        max_attempts: int = WRITER_MAX_ATTEMPTS,
+        retry_backoff: float = WRITER_RETRY_BACKOFF,
+        journal: SpillJournal | None = None,
     ):
+        """
+        Buffers stop events and writes them from a dedicated flush worker thread, so the reader never waits on
+        Postgres. The session is only ever used by the worker.
+
+        checkpoint is called whenever a buffer is sealed and returns a callback that is invoked once the sealed
+        events are committed (e.g. to acknowledge the stream entries they were derived from).
+
+        A batch that still fails after max_attempts is spilled to the journal (if given) for later replay.
+        """
         self._session = session
+        self._checkpoint = checkpoint
         self._repo = StopEventRepository(session)
         self._batch_size = batch_size
         self._flush_interval = flush_interval
+        self._max_attempts = max_attempts
+        self._retry_backoff = retry_backoff
+        self._journal = journal
         self._buffer: list[StopEvent] = []
         self._last_flush = datetime.now(UTC)
 
+        # Double buffering: the reader fills a new buffer while up to queue_size sealed ones wait for the worker.
+        # When the queue is full, flush() blocks - back-pressure instead of unbounded memory growth.
+        self._queue: Queue[_Batch | None] = Queue(maxsize=queue_size)
+        self._closing = Event()
+        self._worker = Thread(target=self._run, name="batch-writer", daemon=True)
+        self._worker.start()
+
     def add_many(self, events: list[StopEvent]) -> None:
         """
         Add multiple events to buffer.
@@ -35,28 +80,85 @@ class BatchWriter:
 
     def flush(self) -> int:
         """
-        Write buffered events to database.
+        Seal the buffered events and hand them to the flush worker. Returns the number of events handed off.
+        """
+        on_commit = self._checkpoint() if self._checkpoint else None
+        self._last_flush = datetime.now(UTC)
+
+        if not self._buffer:
+            if on_commit:
+                on_commit()
+            return 0
+
+        batch = _Batch(self._buffer, on_commit)
+        self._buffer = []
+        self._queue.put(batch)
+        return len(batch.events)
+
+    def join(self) -> None:
+        """Block until every sealed batch has been written (or given up on)."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Flush the remaining buffer, let the worker drain the queue and stop it."""
+        self.flush()
+        self._closing.set()
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is None:
+                    return
+                self._write(batch)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, batch: _Batch) -> None:
+        """
+        Write a batch, retrying with exponential backoff.
 
         Note: Explicit commit/rollback needed because session runs in infinite loop so context manager automatic
         commit never executes.
         """
-        if not self._buffer:
-            return 0
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                count = self._repo.insert_batch(batch.events)
+                self._session.commit()
+                self._session.expire_all()
+                logger.info(f"Wrote {count} stop events")
+            except Exception as e:
+                logger.exception(f"Failed to write batch (attempt {attempt}/{self._max_attempts}): {e}")
+                self._session.rollback()
+                self._session.expire_all()
+                if attempt < self._max_attempts:
+                    delay = min(self._retry_backoff * 2 ** (attempt - 1), WRITER_RETRY_BACKOFF_MAX)
+                    self._closing.wait(delay)
+                continue
+
+            if batch.on_commit:
+                batch.on_commit()
+            return
+
+        self._spill(batch)
+
+    def _spill(self, batch: _Batch) -> None:
+        if self._journal is None:
+            logger.error(f"Giving up on batch of {len(batch.events)} stop events after {self._max_attempts} attempts")
+            return
 
         try:
-            count = self._repo.insert_batch(self._buffer)
-            self._session.commit()
-            self._session.expire_all()
-            logger.info(f"Wrote {count} stop events")
-            self._buffer.clear()
-            self._last_flush = datetime.now(UTC)
-            return count
-        except Exception as e:
-            logger.exception(f"Failed to write batch: {e}")
-            self._session.rollback()
-            self._session.expire_all()
-            self._buffer.clear()
-            return 0
+            self._journal.append(batch.events)
+        except OSError as e:
+            logger.exception(f"Failed to spill batch of {len(batch.events)} stop events: {e}")
+            return
+
+        logger.warning(f"Spilled batch of {len(batch.events)} stop events to the journal")
+        # Durable on disk now - the source messages can be acknowledged
+        if batch.on_commit:
+            batch.on_commit()
 
     def _should_flush(self) -> bool:
         if len(self._buffer) >= self._batch_size:
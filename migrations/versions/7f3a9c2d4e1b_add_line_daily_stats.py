@@ -0,0 +1,48 @@
+"""add line_daily_stats rollup
+
+Revision ID: 7f3a9c2d4e1b
+Revises: 01d4d78ab2b2
+Create Date: 2026-10-17 10:12:41.208431
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3a9c2d4e1b'
+down_revision: Union[str, Sequence[str], None] = '01d4d78ab2b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "line_daily_stats",
+        sa.Column("line_number", sa.Text(), nullable=False),
+        sa.Column("service_date", sa.Date(), nullable=False),
+        sa.Column("trips_count", sa.Integer(), nullable=False),
+        sa.Column("punctuality_total", sa.Integer(), nullable=False),
+        sa.Column("on_time_count", sa.Integer(), nullable=False),
+        sa.Column("slightly_delayed_count", sa.Integer(), nullable=False),
+        sa.Column("delayed_count", sa.Integer(), nullable=False),
+        sa.Column("delay_sum", sa.BigInteger(), nullable=False),
+        sa.Column("delay_count", sa.Integer(), nullable=False),
+        sa.Column("delay_trips_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("line_number", "service_date"),
+    )
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.Text(), nullable=False),
+        sa.Column("rolled_up_through", sa.Date(), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rollup_watermarks")
+    op.drop_table("line_daily_stats")
@@ -0,0 +1,73 @@
+"""add trip_segments and trip_summaries
+
+Revision ID: b84e1d07c5a2
+Revises: 7f3a9c2d4e1b
+Create Date: 2026-10-17 13:40:05.517902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b84e1d07c5a2'
+down_revision: Union[str, Sequence[str], None] = '7f3a9c2d4e1b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "trip_segments",
+        sa.Column("trip_id", sa.Text(), nullable=False),
+        sa.Column("service_date", sa.Date(), nullable=False),
+        sa.Column("to_sequence", sa.Integer(), nullable=False),
+        sa.Column("from_sequence", sa.Integer(), nullable=False),
+        sa.Column("line_number", sa.Text(), nullable=False),
+        sa.Column("vehicle_number", sa.Text(), nullable=True),
+        sa.Column("from_stop", sa.Text(), nullable=False),
+        sa.Column("to_stop", sa.Text(), nullable=False),
+        sa.Column("from_planned_time", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("from_event_time", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("to_planned_time", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("to_event_time", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("delay_generated_seconds", sa.Integer(), nullable=False),
+        sa.Column("headsign", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("trip_id", "service_date", "to_sequence"),
+    )
+    op.execute("""
+        CREATE INDEX idx_trip_segments_line_delay
+        ON trip_segments (line_number, delay_generated_seconds DESC)
+    """)
+    op.create_index("idx_trip_segments_date", "trip_segments", ["service_date"])
+
+    op.create_table(
+        "trip_summaries",
+        sa.Column("trip_id", sa.Text(), nullable=False),
+        sa.Column("service_date", sa.Date(), nullable=False),
+        sa.Column("line_number", sa.Text(), nullable=False),
+        sa.Column("vehicle_number", sa.Text(), nullable=True),
+        sa.Column("first_stop", sa.Text(), nullable=False),
+        sa.Column("last_stop", sa.Text(), nullable=False),
+        sa.Column("first_planned_time", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("first_event_time", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("last_planned_time", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("last_event_time", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("start_delay_seconds", sa.Integer(), nullable=False),
+        sa.Column("end_delay_seconds", sa.Integer(), nullable=False),
+        sa.Column("delay_generated_seconds", sa.Integer(), nullable=False),
+        sa.Column("headsign", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("trip_id", "service_date"),
+    )
+    op.execute("""
+        CREATE INDEX idx_trip_summaries_line_delay
+        ON trip_summaries (line_number, delay_generated_seconds DESC)
+    """)
+    op.create_index("idx_trip_summaries_date", "trip_summaries", ["service_date"])
+
+
+def downgrade() -> None:
+    op.drop_table("trip_summaries")
+    op.drop_table("trip_segments")
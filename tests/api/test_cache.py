@@ -0,0 +1,161 @@
+import threading
+import time
+from datetime import date
+
+import msgspec
+import pytest
+import redis
+from pytest_mock import MockerFixture
+
+from app.api import cache
+from app.common.constants import CACHE_STALE_FACTOR, DEFAULT_TTL
+
+START = date(2026, 3, 1)
+END = date(2026, 3, 2)
+KEY = "stats:v2:trend:194:2026-03-01:2026-03-02"
+
+
+class Result(msgspec.Struct):
+    value: int
+
+
+def entry(body: bytes, expires_in: float, compute_seconds: float = 0.0) -> bytes:
+    return cache._HEADER.pack(time.time() + expires_in, compute_seconds) + body
+
+
+@pytest.fixture
+def client(mocker: MockerFixture):
+    client = mocker.MagicMock()
+    client.get.return_value = None
+    client.set.return_value = True
+    mocker.patch.object(cache, "get_client", return_value=client)
+    return client
+
+
+@pytest.fixture
+def refresher(mocker: MockerFixture):
+    return mocker.patch.object(cache, "_refresher")
+
+
+def compute_once(mocker: MockerFixture):
+    return mocker.MagicMock(return_value={"trend": Result(1), "punctuality": Result(2)})
+
+
+class TestGetOrCompute:
+    def test_miss_computes_and_caches_every_result(self, mocker: MockerFixture, client):
+        compute = compute_once(mocker)
+
+        body = cache.get_or_compute("trend", "194", START, END, compute=compute, refresh=mocker.MagicMock())
+
+        assert body == b'{"value":1}'
+        compute.assert_called_once()
+        pipe = client.pipeline.return_value
+        assert [c.args[0] for c in pipe.setex.call_args_list] == [KEY, "stats:v2:punctuality:194:2026-03-01:2026-03-02"]
+        assert pipe.setex.call_args.args[1] == DEFAULT_TTL * CACHE_STALE_FACTOR
+        assert pipe.setex.call_args.args[2].endswith(b'{"value":2}')
+        token = client.set.call_args.args[1]
+        client.set.assert_called_once_with(f"lock:{KEY}", token, nx=True, ex=cache.CACHE_LOCK_TTL)
+        client.eval.assert_called_once_with(cache._RELEASE_SCRIPT, 1, f"lock:{KEY}", token)
+
+    def test_fresh_hit(self, mocker: MockerFixture, client, refresher):
+        client.get.return_value = entry(b"cached", expires_in=60)
+        compute = compute_once(mocker)
+
+        assert cache.get_or_compute("trend", "194", START, END, compute=compute, refresh=compute) == b"cached"
+
+        compute.assert_not_called()
+        refresher.submit.assert_not_called()
+
+    def test_truncated_entry_is_a_miss(self, mocker: MockerFixture, client):
+        client.get.return_value = b"short"
+        compute = compute_once(mocker)
+
+        assert cache.get_or_compute("trend", "194", START, END, compute=compute, refresh=compute) == b'{"value":1}'
+
+    def test_stale_hit_is_served_while_refreshing(self, mocker: MockerFixture, client, refresher):
+        client.get.return_value = entry(b"stale", expires_in=-1)
+        compute, refresh = compute_once(mocker), compute_once(mocker)
+
+        assert cache.get_or_compute("trend", "194", START, END, compute=compute, refresh=refresh) == b"stale"
+
+        compute.assert_not_called()
+        assert refresher.submit.call_args.args[-2] is refresh
+        assert refresher.submit.call_args.args[-1] == client.set.call_args.args[1]
+
+    def test_stale_hit_refreshed_by_one_worker_only(self, mocker: MockerFixture, client, refresher):
+        client.get.return_value = entry(b"stale", expires_in=-1)
+        client.set.return_value = None
+
+        assert cache.get_or_compute("trend", "194", START, END, compute_once(mocker), compute_once(mocker)) == b"stale"
+
+        refresher.submit.assert_not_called()
+
+    def test_early_refresh_scales_with_compute_time(self, mocker: MockerFixture):
+        mocker.patch.object(cache.random, "random", return_value=0.9)  # -log(0.1) ~ 2.3
+
+        assert cache._should_refresh(cache._Entry(b"", time.time() + 2, compute_seconds=1.0))
+        assert not cache._should_refresh(cache._Entry(b"", time.time() + 2, compute_seconds=0.1))
+
+    def test_waits_for_another_workers_result(self, mocker: MockerFixture, client):
+        mocker.patch.object(cache, "CACHE_LOCK_POLL_INTERVAL", 0)
+        client.set.return_value = None
+        client.get.side_effect = [None, None, entry(b"theirs", expires_in=60)]
+        compute = compute_once(mocker)
+
+        assert cache.get_or_compute("trend", "194", START, END, compute=compute, refresh=compute) == b"theirs"
+
+        compute.assert_not_called()
+
+    def test_computes_when_lock_holder_gives_up(self, mocker: MockerFixture, client):
+        mocker.patch.object(cache, "CACHE_LOCK_POLL_INTERVAL", 0)
+        client.set.return_value = None
+        client.exists.return_value = 0
+        compute = compute_once(mocker)
+
+        assert cache.get_or_compute("trend", "194", START, END, compute=compute, refresh=compute) == b'{"value":1}'
+
+    def test_lock_held_by_another_worker_is_not_released(self, mocker: MockerFixture, client):
+        mocker.patch.object(cache, "CACHE_LOCK_POLL_INTERVAL", 0)
+        mocker.patch.object(cache, "CACHE_LOCK_TTL", 0.01)
+        client.set.return_value = None
+        client.exists.return_value = 1
+        compute = compute_once(mocker)
+
+        assert cache.get_or_compute("trend", "194", START, END, compute=compute, refresh=compute) == b'{"value":1}'
+
+        client.eval.assert_not_called()
+        client.delete.assert_not_called()
+
+    def test_concurrent_misses_in_one_worker_share_a_computation(self, mocker: MockerFixture, client):
+        release = threading.Event()
+
+        def compute():
+            release.wait(5)
+            return {"trend": Result(1)}
+
+        compute_mock = mocker.MagicMock(side_effect=compute)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.get_or_compute("trend", "194", START, END, compute_mock, compute_mock))
+            )
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == [b'{"value":1}', b'{"value":1}']
+        compute_mock.assert_called_once()
+        assert not cache._inflight
+
+    def test_redis_down_computes_locally(self, mocker: MockerFixture, client):
+        client.get.side_effect = redis.ConnectionError
+        client.set.side_effect = redis.ConnectionError
+        client.pipeline.side_effect = redis.ConnectionError
+        compute = compute_once(mocker)
+
+        assert cache.get_or_compute("trend", "194", START, END, compute=compute, refresh=compute) == b'{"value":1}'
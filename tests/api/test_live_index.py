@@ -0,0 +1,107 @@
+import msgspec
+import pytest
+from pytest_mock import MockerFixture
+
+from app.api.live_filter import LiveFilter
+from app.api.live_index import LiveIndex, LiveIndexCache
+from app.common.redis.schemas import LiveVehicle, LiveVehicleColumns, LiveVehicleResponse
+
+
+def vehicle(plate: str, line: str, lat: float, lon: float) -> LiveVehicle:
+    return LiveVehicle(
+        trip_id=f"trip_{plate}",
+        license_plate=plate,
+        line_number=line,
+        headsign="Dworzec Główny",
+        shape_id=None,
+        latitude=lat,
+        longitude=lon,
+        bearing=None,
+        timestamp="2026-02-15T17:07:00+00:00",
+    )
+
+
+VEHICLES = [
+    vehicle("A", "152", 50.061, 19.941),
+    vehicle("B", "50", 50.062, 19.945),
+    vehicle("C", "152", 50.091, 19.981),
+    vehicle("D", "4", 50.011, 20.001),
+]
+
+
+def snapshot(version: int, vehicles: list[LiveVehicle] = VEHICLES) -> bytes:
+    return msgspec.json.encode(LiveVehicleResponse(version=version, count=len(vehicles), vehicles=vehicles))
+
+
+def plates(data: bytes) -> list[str]:
+    return [v["license_plate"] for v in msgspec.json.decode(data)["vehicles"]]
+
+
+class TestLiveIndex:
+    @pytest.fixture
+    def index(self) -> LiveIndex:
+        return LiveIndex(LiveVehicleResponse(version=1, count=len(VEHICLES), vehicles=VEHICLES))
+
+    def test_bbox_selects_only_the_vehicles_inside_it(self, index):
+        # B is in the same grid cell as A, but outside the box
+        live_filter = LiveFilter(bbox=(19.9405, 50.0605, 19.9415, 50.0615))
+
+        assert [v.license_plate for v in index.select(live_filter)] == ["A"]
+
+    def test_boxes_touching_the_same_cells_share_a_cell_set(self, index):
+        assert index.cells((19.94, 50.06, 19.949, 50.069)) == index.cells((19.942, 50.061, 19.943, 50.062))
+
+    def test_large_box_matches_only_populated_cells(self, index):
+        assert index.cells((-180.0, -90.0, 180.0, 90.0)) == index.cells((19.0, 50.0, 21.0, 51.0))
+        assert len(index.cells((19.0, 50.0, 21.0, 51.0))) == 3
+
+    def test_lines_and_bbox(self, index):
+        lines = LiveFilter(lines=frozenset({"152", "4"}))
+        both = LiveFilter(lines=frozenset({"152"}), bbox=(19.9, 50.0, 20.0, 50.1))
+
+        assert [v.license_plate for v in index.select(lines)] == ["A", "C", "D"]
+        assert [v.license_plate for v in index.select(both)] == ["A", "C"]
+
+    @pytest.mark.parametrize(
+        "live_filter",
+        [
+            LiveFilter(bbox=(19.942, 50.0, 19.99, 50.1)),
+            LiveFilter(bbox=(19.941, 50.061, 19.945, 50.062)),
+            LiveFilter(lines=frozenset({"50", "4"}), bbox=(19.94, 50.0, 20.01, 50.07)),
+        ],
+    )
+    def test_selects_the_vehicles_the_stream_filter_matches(self, index, live_filter):
+        assert index.select(live_filter) == [v for v in VEHICLES if live_filter.matches(v)]
+
+
+class TestLiveIndexCache:
+    def test_filtered_response_is_cached_per_version(self, mocker: MockerFixture):
+        load = mocker.MagicMock(return_value=snapshot(1))
+        cache = LiveIndexCache()
+        live_filter = LiveFilter(lines=frozenset({"152"}))
+
+        first = cache.get(1, live_filter, False, load)
+        second = cache.get(1, live_filter, False, load)
+
+        assert first is second
+        assert plates(first) == ["A", "C"]
+        load.assert_called_once()
+
+    def test_new_version_rebuilds_the_index(self, mocker: MockerFixture):
+        load = mocker.MagicMock(side_effect=[snapshot(1), snapshot(2, VEHICLES[:1])])
+        cache = LiveIndexCache()
+        live_filter = LiveFilter(lines=frozenset({"152"}))
+
+        cache.get(1, live_filter, False, load)
+        data = cache.get(2, live_filter, False, load)
+
+        assert msgspec.json.decode(data)["version"] == 2
+        assert plates(data) == ["A"]
+
+    def test_packed(self):
+        cache = LiveIndexCache()
+
+        data = cache.get(1, LiveFilter(bbox=(19.94, 50.06, 19.95, 50.07)), True, lambda: snapshot(1))
+
+        columns = msgspec.msgpack.decode(data, type=LiveVehicleColumns)
+        assert (columns.version, columns.license_plate) == (1, ["A", "B"])
@@ -0,0 +1,157 @@
+import asyncio
+
+import msgspec
+import pytest
+from fastapi import HTTPException
+from pytest_mock import MockerFixture
+
+from app.api.live_filter import LiveFilter
+from app.api.live_stream import LiveBroadcaster, filter_delta
+from app.common.constants import LIVE_STREAM_QUEUE_SIZE
+from app.common.redis.schemas import LiveVehicle, LiveVehicleDelta, LiveVehicleMove, LiveVehicleResponse
+
+TIMESTAMP = "2026-02-15T17:07:00+00:00"
+
+
+def vehicle(plate: str, line: str = "152", lat: float = 50.06, lon: float = 19.94) -> LiveVehicle:
+    return LiveVehicle(
+        trip_id=f"trip_{line}",
+        license_plate=plate,
+        line_number=line,
+        headsign="Dworzec Główny",
+        shape_id=None,
+        latitude=lat,
+        longitude=lon,
+        bearing=None,
+        timestamp=TIMESTAMP,
+    )
+
+
+def move(plate: str, lat: float, lon: float) -> LiveVehicleMove:
+    return LiveVehicleMove(license_plate=plate, latitude=lat, longitude=lon, bearing=None, timestamp=TIMESTAMP)
+
+
+def delta(version: int, since: int, **changes) -> LiveVehicleDelta:
+    changes = {"added": [], "moved": [], "removed": [], **changes}
+    return LiveVehicleDelta(version=version, since=since, count=0, **changes)
+
+
+INSIDE = LiveFilter(bbox=(19.9, 50.0, 20.0, 50.1))
+
+
+class TestLiveFilter:
+    def test_lines_and_bbox_must_both_match(self):
+        live_filter = LiveFilter.from_query(["152"], "19.9,50.0,20.0,50.1")
+
+        assert live_filter.matches(vehicle("A"))
+        assert not live_filter.matches(vehicle("A", line="50"))
+        assert not live_filter.matches(vehicle("A", lat=51.0))
+
+    @pytest.mark.parametrize(
+        "bbox", ["nan,50,20,51", "19,50,inf,51", "1e308,50,20,51", "19,-91,20,51", "19,50,181,51", "20,50,19,51", "1,2,3"]
+    )
+    def test_invalid_bbox_is_rejected(self, bbox):
+        with pytest.raises(HTTPException) as error:
+            LiveFilter.from_query(None, bbox)
+
+        assert error.value.status_code == 422
+
+    def test_no_query_is_empty(self):
+        assert LiveFilter.from_query(None, None).is_empty
+
+
+class TestFilterDelta:
+    def test_vehicle_moving_out_is_removed_and_moving_in_is_added(self):
+        before = {"A": vehicle("A"), "B": vehicle("B", lat=51.0)}
+        after = {"A": vehicle("A", lat=51.0), "B": vehicle("B")}
+
+        filtered = filter_delta(delta(2, 1, moved=[move("A", 51.0, 19.94), move("B", 50.06, 19.94)]), before, after, INSIDE)
+
+        assert filtered.added == [after["B"]]
+        assert filtered.moved == []
+        assert filtered.removed == ["A"]
+        assert filtered.count == 1
+
+    def test_none_when_nothing_inside_changed(self):
+        before = {"A": vehicle("A", lat=51.0)}
+        after = {"A": vehicle("A", lat=51.1)}
+
+        assert filter_delta(delta(2, 1, moved=[move("A", 51.1, 19.94)]), before, after, INSIDE) is None
+
+
+@pytest.fixture
+def broadcaster(mocker: MockerFixture):
+    snapshot = LiveVehicleResponse(version=1, count=1, vehicles=[vehicle("A")])
+    repo = mocker.patch("app.api.live_stream.LiveVehiclesRepository").return_value
+    repo.get.return_value = msgspec.json.encode(snapshot)
+    mocker.patch("app.api.live_stream.get_client")
+    return LiveBroadcaster(mocker.MagicMock()), repo
+
+
+class TestLiveBroadcaster:
+    def test_client_gets_the_snapshot_then_published_deltas(self, broadcaster):
+        broadcaster, _ = broadcaster
+
+        async def run() -> list[bytes]:
+            await broadcaster._resync()
+            stream = broadcaster.stream(LiveFilter())
+            first = await anext(stream)
+            data = msgspec.json.encode(delta(2, 1, moved=[move("A", 50.07, 19.94)]))
+            await broadcaster._on_message(data)
+            return [first, await anext(stream)]
+
+        snapshot, update = asyncio.run(run())
+
+        assert snapshot.startswith(b"event: snapshot\ndata: ")
+        assert msgspec.json.decode(snapshot.split(b"data: ")[1])["version"] == 1
+        assert update.startswith(b"event: delta\ndata: ")
+        assert broadcaster._version == 2
+        assert broadcaster._vehicles["A"].latitude == 50.07
+
+    def test_version_gap_reloads_the_snapshot(self, broadcaster):
+        broadcaster, repo = broadcaster
+
+        async def run() -> None:
+            await broadcaster._resync()
+            repo.get.return_value = msgspec.json.encode(LiveVehicleResponse(version=5, count=0, vehicles=[]))
+            await broadcaster._on_message(msgspec.json.encode(delta(5, 4)))
+
+        asyncio.run(run())
+
+        assert broadcaster._version == 5
+        assert broadcaster._vehicles == {}
+
+    def test_lower_version_reloads_the_snapshot(self, broadcaster):
+        broadcaster, repo = broadcaster
+
+        async def run() -> list[bytes]:
+            await broadcaster._resync()
+            stream = broadcaster.stream(LiveFilter())
+            await anext(stream)
+            repo.get.return_value = msgspec.json.encode(LiveVehicleResponse(version=1, count=0, vehicles=[]))
+            broadcaster._version = 40
+            await broadcaster._on_message(msgspec.json.encode(delta(2, 1)))
+            return [await anext(stream)]
+
+        (event,) = asyncio.run(run())
+
+        assert event.startswith(b"event: snapshot")
+        assert broadcaster._version == 1
+
+    def test_slow_client_starts_over_from_the_snapshot(self, broadcaster):
+        broadcaster, _ = broadcaster
+
+        async def run() -> list[bytes]:
+            await broadcaster._resync()
+            stream = broadcaster.stream(LiveFilter())
+            await anext(stream)
+            for version in range(2, LIVE_STREAM_QUEUE_SIZE + 3):
+                await broadcaster._on_message(msgspec.json.encode(delta(version, version - 1)))
+            queued = broadcaster._subscribers.copy().pop().queue
+            return [queued.get_nowait() for _ in range(queued.qsize())]
+
+        queued = asyncio.run(run())
+
+        assert len(queued) == 1
+        assert queued[0].startswith(b"event: snapshot")
+        assert msgspec.json.decode(queued[0].split(b"data: ")[1])["version"] == LIVE_STREAM_QUEUE_SIZE + 2
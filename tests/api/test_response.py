@@ -0,0 +1,24 @@
+import pytest
+from starlette.requests import Request
+
+from app.api.response import accepts_msgpack
+
+
+def request(accept: str | None) -> Request:
+    headers = [] if accept is None else [(b"accept", accept.encode())]
+    return Request({"type": "http", "headers": headers})
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        (None, False),
+        ("*/*", False),
+        ("application/json", False),
+        ("application/msgpack", True),
+        ("application/json;q=0.5, application/x-msgpack", True),
+        ("application/msgpack;q=0", False),
+    ],
+)
+def test_accepts_msgpack(accept, expected):
+    assert accepts_msgpack(request(accept)) is expected
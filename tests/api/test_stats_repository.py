@@ -0,0 +1,61 @@
+from datetime import date
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.api.repositories.stats_repository import StatsRepository
+
+
+class TestStatsRepositorySplit:
+    @pytest.mark.parametrize(
+        "watermark, expected",
+        [
+            (None, (date(2026, 2, 28), date(2026, 3, 1))),
+            (date(2026, 3, 10), (date(2026, 3, 10), date(2026, 3, 11))),
+            (date(2026, 4, 1), (date(2026, 3, 15), date(2026, 3, 16))),
+            (date(2026, 2, 1), (date(2026, 2, 1), date(2026, 3, 1))),
+        ],
+    )
+    def test_split_at_watermark(self, mocker: MockerFixture, watermark, expected):
+        mocker.patch(
+            "app.api.repositories.stats_repository.RollupWatermarkRepository.get", return_value=watermark
+        )
+
+        assert StatsRepository(mocker.MagicMock())._split("line_daily_stats", date(2026, 3, 1), date(2026, 3, 15)) == expected
+
+
+class TestOverview:
+    def test_rows_are_grouped_by_part(self, mocker: MockerFixture):
+        mocker.patch("app.api.repositories.stats_repository.RollupWatermarkRepository.get", return_value=None)
+        session = mocker.MagicMock()
+        session.execute.return_value.mappings.return_value.all.return_value = [
+            {"part": "max_delay", "delay_generated_seconds": 60, "trip_id": "t1"},
+            {"part": "trend", "service_date": date(2026, 3, 2), "avg_delay_seconds": 90, "trips_count": 4},
+            {"part": "max_delay", "delay_generated_seconds": 120, "trip_id": "t2"},
+            {"part": "totals", "trips_count": 7, "total": 10, "on_time": 5, "slightly_delayed": 3, "delayed": 2},
+            {"part": "trend", "service_date": date(2026, 3, 1), "avg_delay_seconds": 30, "trips_count": 3},
+        ]
+        mocker.patch("app.api.repositories.stats_repository._SEGMENT_FIELDS", ["trip_id", "delay_generated_seconds"])
+
+        overview = StatsRepository(session).overview("194", date(2026, 3, 1), date(2026, 3, 2))
+
+        assert overview["trips_count"] == 7
+        assert overview["punctuality"] == {"total": 10, "on_time": 5, "slightly_delayed": 3, "delayed": 2}
+        assert [day["date"] for day in overview["trend"]] == [date(2026, 3, 1), date(2026, 3, 2)]
+        assert [row["trip_id"] for row in overview["max_delay"]] == ["t2", "t1"]
+        assert overview["route_delay"] == []
+
+    def test_raw_tail_starts_at_the_earlier_watermark(self, mocker: MockerFixture):
+        watermarks = {"line_daily_stats": date(2026, 3, 10), "trip_segments": date(2026, 3, 5)}
+        mocker.patch(
+            "app.api.repositories.stats_repository.RollupWatermarkRepository.get", side_effect=watermarks.get
+        )
+        session = mocker.MagicMock()
+        session.execute.return_value.mappings.return_value.all.return_value = []
+
+        StatsRepository(session).overview("194", date(2026, 3, 1), date(2026, 3, 15))
+
+        params = session.execute.call_args.args[1]
+        assert params["tail_start"] == date(2026, 3, 6)
+        assert params["stats_raw_start"] == date(2026, 3, 11)
+        assert params["from_date"] == date(2026, 3, 6)
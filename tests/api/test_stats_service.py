@@ -0,0 +1,71 @@
+from datetime import date
+
+import msgspec
+import pytest
+from fastapi import HTTPException
+from pytest_mock import MockerFixture
+
+from app.api.services import stats_service
+from app.api.services.stats_service import StatsService
+
+START = date(2026, 3, 1)
+END = date(2026, 3, 2)
+
+OVERVIEW = {
+    "trips_count": 7,
+    "punctuality": {"total": 10, "on_time": 5, "slightly_delayed": 3, "delayed": 2},
+    "trend": [{"date": START, "avg_delay_seconds": 30, "trips_count": 3}],
+    "max_delay": [],
+    "route_delay": [],
+}
+
+
+@pytest.fixture
+def cache(mocker: MockerFixture):
+    """The cache always misses: get_or_compute returns the requested body from the foreground computation."""
+    cache = mocker.patch.object(stats_service, "cache")
+    cache.get_or_compute.side_effect = lambda endpoint, *_, compute, refresh: msgspec.json.encode(compute()[endpoint])
+    return cache
+
+
+@pytest.fixture
+def service(mocker: MockerFixture):
+    service = StatsService(mocker.MagicMock())
+    service._repo = mocker.MagicMock()
+    service._repo.overview.return_value = OVERVIEW
+    return service
+
+
+class TestStatsService:
+    def test_one_query_builds_every_endpoint(self, cache, service):
+        body = msgspec.json.decode(service.punctuality("194", START, END))
+
+        assert body["total_stops"] == 10
+        assert body["on_time_percent"] == 50.0
+        compute = cache.get_or_compute.call_args.kwargs["compute"]
+        assert set(compute()) == {"max-delay", "route-delay", "punctuality", "trend", "overview"}
+        assert service._repo.overview.call_count == 2
+
+    def test_overview_matches_endpoints(self, cache, service):
+        overview = msgspec.json.decode(service.overview("194", START, END))
+
+        assert overview["trips_analyzed"] == 7
+        assert overview["trend"] == msgspec.json.decode(service.trend("194", START, END))
+
+    def test_refresh_uses_its_own_session(self, mocker: MockerFixture, cache, service):
+        get_session = mocker.patch.object(stats_service, "get_session")
+        repo = mocker.patch.object(stats_service, "StatsRepository")
+        repo.return_value.overview.return_value = OVERVIEW
+        service.trend("194", START, END)
+
+        cache.get_or_compute.call_args.kwargs["refresh"]()
+
+        repo.assert_called_once_with(get_session.return_value.__enter__.return_value)
+
+    def test_unknown_line(self, cache, service):
+        service._repo.overview.return_value = OVERVIEW | {"trips_count": 0}
+
+        with pytest.raises(HTTPException) as exc:
+            service.route_delay("194", START, END)
+
+        assert exc.value.status_code == 404
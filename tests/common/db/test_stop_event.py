@@ -0,0 +1,63 @@
+from datetime import UTC, date, datetime
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.common.db.repositories.stop_event import StopEventRepository
+from app.common.models.enums import Agency, DetectionMethod
+from app.common.models.events import StopEvent
+
+
+def make_event(stop_sequence: int) -> StopEvent:
+    return StopEvent(
+        agency=Agency.MPK,
+        trip_id="trip_1",
+        service_date=date(2026, 2, 9),
+        stop_sequence=stop_sequence,
+        stop_id=f"stop_{stop_sequence}",
+        line_number="152",
+        stop_name="Rondo Mogilskie",
+        stop_desc="01",
+        direction_id=0,
+        headsign="Dworzec Główny",
+        planned_time=datetime(2026, 2, 9, 12, 0, tzinfo=UTC),
+        event_time=datetime(2026, 2, 9, 12, 1, tzinfo=UTC),
+        delay_seconds=60,
+        vehicle_id="v1",
+        license_plate="AB123",
+        detection_method=DetectionMethod.STOPPED_AT,
+        is_estimated=False,
+        static_hash="abc123hash",
+        max_stop_sequence=30,
+    )
+
+
+@pytest.fixture
+def session(mocker: MockerFixture):
+    return mocker.MagicMock()
+
+
+def test_empty_batch_does_nothing(session):
+    assert StopEventRepository(session).insert_batch([]) == 0
+    session.execute.assert_not_called()
+
+
+def test_small_batch_uses_insert(session):
+    assert StopEventRepository(session).insert_batch([make_event(1), make_event(2)]) == 2
+
+    session.execute.assert_called_once()
+    session.connection.assert_not_called()
+
+
+def test_large_batch_uses_binary_copy(session, mocker: MockerFixture):
+    mocker.patch("app.common.db.repositories.stop_event.COPY_MIN_BATCH_SIZE", 3)
+    cursor = session.connection.return_value.connection.dbapi_connection.cursor.return_value
+    copy = cursor.copy.return_value.__enter__.return_value
+
+    assert StopEventRepository(session).insert_batch([make_event(i) for i in range(3)]) == 3
+
+    session.execute.assert_not_called()
+    assert copy.write_row.call_count == 3
+    assert copy.write_row.call_args_list[0].args[0][:4] == ("mpk", "trip_1", date(2026, 2, 9), 0)
+    assert cursor.execute.call_count == 2  # create staging + merge
+    cursor.close.assert_called_once()
@@ -0,0 +1,110 @@
+import math
+from datetime import UTC, datetime
+
+import numpy as np
+from google.transit import gtfs_realtime_pb2
+
+from app.common.feeds import FeedConfig
+from app.common.gtfs.parser import parse_vehicle_positions, parse_vehicle_positions_batch
+from app.common.models.enums import Agency, VehicleStatus
+from app.common.redis import serializer
+
+FEED = FeedConfig(
+    agency=Agency.MPK_TRAM,
+    static_url="https://example.com/static.zip",
+    static_filename="static.zip",
+    vehicle_positions_url="https://example.com/vp.pb",
+    trip_updates_url="https://example.com/tu.pb",
+    id_prefix="tram",
+)
+
+
+def make_feed() -> bytes:
+    msg = gtfs_realtime_pb2.FeedMessage()
+    msg.header.gtfs_realtime_version = "2.0"
+    msg.header.timestamp = 1_700_000_000
+
+    full = msg.entity.add()
+    full.id = "1"
+    full.vehicle.trip.trip_id = "trip_1"
+    full.vehicle.vehicle.id = "v1"
+    full.vehicle.vehicle.license_plate = "RP101"
+    full.vehicle.position.latitude = 50.06
+    full.vehicle.position.longitude = 19.94
+    full.vehicle.position.bearing = 90.0
+    full.vehicle.stop_id = "stop_1"
+    full.vehicle.current_stop_sequence = 3
+    full.vehicle.current_status = 1
+    full.vehicle.timestamp = 1_700_000_000
+
+    sparse = msg.entity.add()
+    sparse.id = "2"
+    sparse.vehicle.trip.trip_id = "trip_2"
+    sparse.vehicle.vehicle.license_plate = "RP102"
+    sparse.vehicle.timestamp = 1_700_000_010
+
+    no_plate = msg.entity.add()
+    no_plate.id = "3"
+    no_plate.vehicle.trip.trip_id = "trip_3"
+    no_plate.vehicle.timestamp = 1_700_000_020
+
+    no_timestamp = msg.entity.add()
+    no_timestamp.id = "4"
+    no_timestamp.vehicle.trip.trip_id = "trip_4"
+    no_timestamp.vehicle.vehicle.license_plate = "RP104"
+
+    return msg.SerializeToString()
+
+
+class TestParseVehiclePositionsBatch:
+    def test_columns(self):
+        batch = parse_vehicle_positions_batch(make_feed(), FEED)
+
+        assert len(batch) == 2
+        assert batch.agency == Agency.MPK_TRAM
+        assert batch.trip_id.tolist() == ["tram:trip_1", "tram:trip_2"]
+        assert batch.license_plate.tolist() == ["RP101", "RP102"]
+        assert batch.stop_id.tolist() == ["tram:stop_1", None]
+        assert batch.stop_sequence.tolist() == [3, -1]
+        assert batch.status.tolist() == [1, -1]
+        assert batch.timestamp.tolist() == [1_700_000_000, 1_700_000_010]
+        assert batch.has_position.tolist() == [True, False]
+        assert math.isnan(batch.bearing[1])
+
+    def test_select(self):
+        batch = parse_vehicle_positions_batch(make_feed(), FEED)
+
+        selected = batch.select(batch.has_position)
+
+        assert len(selected) == 1
+        assert selected.license_plate.tolist() == ["RP101"]
+
+    def test_invalid_payload_returns_empty_batch(self):
+        batch = parse_vehicle_positions_batch(b"not a protobuf message", FEED)
+
+        assert len(batch) == 0
+        assert batch.latitude.dtype == np.float64
+
+    def test_to_positions(self):
+        full, sparse = parse_vehicle_positions(make_feed(), FEED)
+
+        assert full.vehicle_id == "v1"
+        assert full.latitude is not None and full.latitude == np.float32(50.06)
+        assert full.status == VehicleStatus(1)
+        assert full.timestamp == datetime.fromtimestamp(1_700_000_000, tz=UTC)
+        assert sparse.vehicle_id == ""
+        assert sparse.latitude is None
+        assert sparse.bearing is None
+        assert sparse.stop_sequence is None
+        assert sparse.status is None
+        assert not sparse.has_position
+
+    def test_batch_encoding_matches_per_vehicle_encoding(self):
+        pb_data = make_feed()
+
+        batch = parse_vehicle_positions_batch(pb_data, FEED)
+        positions = parse_vehicle_positions(pb_data, FEED)
+
+        assert serializer.encode_vehicle_positions_batch(batch) == serializer.encode_vehicle_positions(
+            FEED.agency, positions
+        )
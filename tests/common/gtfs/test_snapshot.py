@@ -0,0 +1,71 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from app.common.gtfs.snapshot import StaticHolder, StaticSnapshot, StopTimeInfo, TripInfo
+from app.common.models.enums import Agency
+
+
+@pytest.fixture
+def snapshot(mocker: MockerFixture) -> StaticSnapshot:
+    static_repo = mocker.patch("app.common.gtfs.snapshot.GtfsStaticRepository").return_value
+    static_repo.get_all_trip_rows.return_value = [
+        ("trip_1", "152", 0, "Dworzec Główny", None),
+        ("trip_2", "50", 1, "Kurdwanów", "shape_2"),
+    ]
+    static_repo.get_all_stop_rows.return_value = [("stop_a", "Rondo Mogilskie", "01")]
+    static_repo.iter_all_stop_time_rows.return_value = iter(
+        [
+            ("trip_1", 1, "stop_a", 43200),
+            ("trip_1", 2, "stop_b", 43260),
+            ("trip_1", 4, "stop_c", 43380),
+            ("trip_2", 1, "stop_c", 50000),
+        ]
+    )
+    meta_repo = mocker.patch("app.common.gtfs.snapshot.GtfsMetaRepository").return_value
+    meta_repo.get_all_hashes.return_value = {Agency.MPK: "abc123hash"}
+
+    return StaticSnapshot.build(mocker.MagicMock())
+
+
+def test_trip_and_stop_lookup(snapshot):
+    assert snapshot.get_trip("trip_2") == TripInfo("trip_2", "50", 1, "Kurdwanów", "shape_2")
+    assert snapshot.get_stop("stop_a").stop_name == "Rondo Mogilskie"
+    assert snapshot.get_hash(Agency.MPK) == "abc123hash"
+    assert snapshot.get_hash(Agency.MOBILIS) is None
+
+
+def test_stop_time_lookup(snapshot):
+    assert snapshot.get_stop_time("trip_1", 4) == StopTimeInfo(4, "stop_c", 43380)
+    assert snapshot.get_stop_time("trip_2", 1) == StopTimeInfo(1, "stop_c", 50000)
+    assert snapshot.get_stop_time("trip_1", 3) is None
+    assert snapshot.get_stop_time("trip_1", 5) is None
+    assert snapshot.get_stop_time("unknown", 1) is None
+
+
+def test_max_stop_sequence(snapshot):
+    assert snapshot.get_max_stop_sequence("trip_1") == 4
+    assert snapshot.get_max_stop_sequence("trip_2") == 1
+    assert snapshot.get_max_stop_sequence("unknown") is None
+
+
+def test_stop_id_to_sequence(snapshot):
+    assert snapshot.stop_id_to_sequence("trip_1") == {"stop_a": 1, "stop_b": 2, "stop_c": 4}
+    assert snapshot.stop_id_to_sequence("unknown") == {}
+
+
+def test_holder_swaps_only_when_hashes_change(mocker: MockerFixture):
+    mocker.patch("app.common.gtfs.snapshot.get_session")
+    meta_repo = mocker.patch("app.common.gtfs.snapshot.GtfsMetaRepository").return_value
+    meta_repo.get_all_hashes.return_value = {Agency.MPK: "v1"}
+    build = mocker.MagicMock(side_effect=["index_v1", "index_v2"])
+
+    holder = StaticHolder(build)
+
+    assert holder.refresh() is False
+    assert holder.current == "index_v1"
+
+    meta_repo.get_all_hashes.return_value = {Agency.MPK: "v2"}
+
+    assert holder.refresh() is True
+    assert holder.current == "index_v2"
+    assert holder.hashes == {Agency.MPK: "v2"}
@@ -0,0 +1,109 @@
+import struct
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.common.constants import REDIS_TRIP_UPDATES_TTL
+from app.common.models.enums import Agency
+from app.common.models.gtfs_realtime import StopTimeUpdate, TripUpdate
+from app.common.redis.repositories.trip_updates import TripUpdatesRepository
+from app.common.redis.schemas import CachedStopTime
+
+ARRIVAL = datetime(2025, 1, 15, 8, 0, tzinfo=UTC)
+LATER = ARRIVAL + timedelta(minutes=3)
+
+
+def make_update(trip_id: str, *stops: tuple[int | None, str, datetime | None]) -> TripUpdate:
+    return TripUpdate(
+        agency=Agency.MPK,
+        trip_id=trip_id,
+        vehicle_id=None,
+        timestamp=ARRIVAL,
+        stop_time_updates=[
+            StopTimeUpdate(stop_id=stop_id, stop_sequence=seq, arrival_time=arrival, departure_time=None)
+            for seq, stop_id, arrival in stops
+        ],
+    )
+
+
+def packed(first_seen: datetime, last_seen: datetime) -> bytes:
+    return struct.pack(">II", int(first_seen.timestamp()), int(last_seen.timestamp()))
+
+
+@pytest.fixture
+def client(mocker: MockerFixture):
+    return mocker.MagicMock()
+
+
+@pytest.fixture
+def repo(client):
+    return TripUpdatesRepository(client)
+
+
+class TestMergeMany:
+    def test_pipelines_one_script_call_per_trip(self, client, repo):
+        pipe = client.pipeline.return_value
+        script = client.register_script.return_value
+
+        repo.merge_many(
+            [(make_update("t1", (1, "s1", ARRIVAL)), {}), (make_update("t2", (2, "s2", LATER)), {})],
+            [("mpk", "t3")],
+        )
+
+        assert [c.kwargs["keys"] for c in script.call_args_list] == [["tuh:mpk:t1"], ["tuh:mpk:t2"]]
+        assert all(c.kwargs["client"] is pipe for c in script.call_args_list)
+        pipe.expire.assert_called_once_with("tuh:mpk:t3", REDIS_TRIP_UPDATES_TTL)
+        pipe.execute.assert_called_once()
+        client.hmget.assert_not_called()
+
+    def test_script_args(self, client, repo):
+        update = make_update("t1", (None, "s4", ARRIVAL), (5, "s5", LATER), (6, "s6", None))
+
+        repo.merge_many([(update, {"s4": 4})], [])
+
+        ttl, now, incoming_min, *pairs = client.register_script.return_value.call_args.kwargs["args"]
+        assert ttl == REDIS_TRIP_UPDATES_TTL
+        assert now == pytest.approx(datetime.now(UTC).timestamp(), abs=5)
+        # Stop 6 has no prediction but still counts towards the minimum sequence
+        assert incoming_min == 4
+        assert pairs == [4, int(ARRIVAL.timestamp()), 5, int(LATER.timestamp())]
+
+    def test_unresolved_stops_are_skipped(self, client, repo):
+        repo.merge_many([(make_update("t1", (None, "unknown", ARRIVAL)), {})], [])
+
+        assert client.register_script.return_value.call_args.kwargs["args"][2:] == [""]
+
+
+class TestReads:
+    def test_get_stops_reads_only_requested_fields(self, client, repo):
+        client.hmget.return_value = [None, packed(ARRIVAL, LATER)]
+
+        stops = repo.get_stops("mpk", "t1", range(3, 5))
+
+        client.hmget.assert_called_once_with("tuh:mpk:t1", [3, 4])
+        assert stops == {4: CachedStopTime(4, ARRIVAL, LATER)}
+
+    def test_get_arrival(self, client, repo):
+        client.hmget.return_value = [packed(ARRIVAL, LATER)]
+
+        assert repo.get_arrival("mpk", "t1", 4) == LATER
+
+    def test_get_whole_trip(self, client, repo):
+        client.hgetall.return_value = {
+            b"4": packed(ARRIVAL, LATER),
+            b"min": b"4",
+            b"created": str(int(ARRIVAL.timestamp())).encode(),
+        }
+
+        cache = repo.get("mpk", "t1")
+
+        assert cache is not None
+        assert cache.stops == {4: CachedStopTime(4, ARRIVAL, LATER)}
+        assert cache.last_min_seq == 4
+        assert cache.created_at == ARRIVAL
+
+    def test_get_missing_trip(self, client, repo):
+        client.hgetall.return_value = {}
+
+        assert repo.get("mpk", "t1") is None
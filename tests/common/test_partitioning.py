@@ -0,0 +1,46 @@
+from collections import Counter
+
+from app.common.partitioning import channel_key, owned_partitions, partition_for, stream_key
+
+
+def test_single_partition_always_zero():
+    assert partition_for("mpk", "AB123", 1) == 0
+
+
+def test_partition_is_stable():
+    assert partition_for("mpk", "AB123", 4) == partition_for("mpk", "AB123", 4)
+
+
+def test_partition_in_range():
+    assert all(0 <= partition_for("mpk", f"AB{i}", 3) < 3 for i in range(200))
+
+
+def test_partitions_roughly_balanced():
+    counts = Counter(partition_for("mpk", f"AB{i}", 4) for i in range(4000))
+
+    assert len(counts) == 4
+    assert min(counts.values()) > 800
+
+
+def test_growing_partitions_moves_few_vehicles():
+    plates = [f"AB{i}" for i in range(2000)]
+
+    moved = sum(partition_for("mpk", p, 4) != partition_for("mpk", p, 5) for p in plates)
+
+    assert moved < len(plates) * 0.3
+
+
+def test_stream_key():
+    assert stream_key(2) == "vp_stream:2"
+
+
+def test_channel_key_single_partition_keeps_legacy_channel():
+    assert channel_key(0, 1) == "vehicle_positions"
+    assert channel_key(2, 4) == "vehicle_positions:2"
+
+
+def test_owned_partitions_cover_every_partition_once():
+    owned = [owned_partitions(w, 3, 8) for w in range(3)]
+
+    assert owned[0] == [0, 3, 6]
+    assert sorted(p for partitions in owned for p in partitions) == list(range(8))
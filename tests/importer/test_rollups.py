@@ -0,0 +1,68 @@
+from datetime import UTC, date, datetime
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.importer import rollups
+from app.importer.rollups import closed_through, rollup_windows
+
+
+class TestClosedThrough:
+    @pytest.mark.parametrize(
+        "now, expected",
+        [
+            # 2026-03-03 05:00 Warsaw: 2026-03-02 is still receiving events for trips past 24:00
+            (datetime(2026, 3, 3, 4, 0, tzinfo=UTC), date(2026, 3, 1)),
+            # 2026-03-03 07:00 Warsaw: 30 hours after the midnight of 2026-03-02
+            (datetime(2026, 3, 3, 6, 0, tzinfo=UTC), date(2026, 3, 2)),
+        ],
+    )
+    def test_closes_service_date_after_delay(self, now, expected):
+        assert closed_through(now) == expected
+
+
+class TestRollupWindows:
+    def test_backfill_in_chunks(self):
+        windows = rollup_windows(None, date(2026, 1, 1), date(2026, 3, 1))
+
+        assert windows == [
+            (date(2026, 1, 1), date(2026, 1, 31)),
+            (date(2026, 2, 1), date(2026, 3, 1)),
+        ]
+
+    def test_redoes_lookback_days(self):
+        windows = rollup_windows(date(2026, 3, 10), date(2026, 1, 1), date(2026, 3, 11))
+
+        assert windows == [(date(2026, 3, 8), date(2026, 3, 11))]
+
+    def test_nothing_closed_yet(self):
+        assert rollup_windows(None, date(2026, 3, 11), date(2026, 3, 10)) == []
+
+
+
+class TestRunRollups:
+    def test_each_rollup_follows_its_own_watermark(self, mocker: MockerFixture):
+        mocker.patch.object(rollups, "get_session")
+        mocker.patch.object(rollups.StopEventRepository, "first_service_date", return_value=date(2026, 1, 1))
+        watermarks = {"line_daily_stats": date(2026, 3, 10), "trip_segments": None}
+        mocker.patch.object(rollups.RollupWatermarkRepository, "get", side_effect=watermarks.get)
+        set_watermark = mocker.patch.object(rollups.RollupWatermarkRepository, "set")
+        daily = mocker.patch.object(rollups.LineDailyStatsRepository, "rollup", return_value=1)
+        segments = mocker.patch.object(rollups.TripSegmentsRepository, "rollup", return_value=1)
+
+        written = rollups.run_rollups(datetime(2026, 3, 13, 12, 0, tzinfo=UTC))
+
+        daily.assert_called_once_with(date(2026, 3, 8), date(2026, 3, 12))
+        assert segments.call_args_list[0].args == (date(2026, 1, 1), date(2026, 1, 31))
+        assert segments.call_args_list[-1].args == (date(2026, 3, 4), date(2026, 3, 12))
+        assert written == 1 + len(segments.call_args_list)
+        set_watermark.assert_any_call("line_daily_stats", date(2026, 3, 12))
+        set_watermark.assert_called_with("trip_segments", date(2026, 3, 12))
+
+    def test_no_events_yet(self, mocker: MockerFixture):
+        mocker.patch.object(rollups, "get_session")
+        mocker.patch.object(rollups.StopEventRepository, "first_service_date", return_value=None)
+        rollup = mocker.patch.object(rollups.LineDailyStatsRepository, "rollup")
+
+        assert rollups.run_rollups() == 0
+        rollup.assert_not_called()
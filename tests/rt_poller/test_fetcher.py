@@ -0,0 +1,129 @@
+import pytest
+from google.transit import gtfs_realtime_pb2
+from pytest_mock import MockerFixture
+
+from app.common.feeds import FeedConfig
+from app.common.models.enums import Agency
+from app.rt_poller.fetcher import FeedFetcher
+
+FEED = FeedConfig(
+    agency=Agency.MPK,
+    static_url="https://example.com/static.zip",
+    static_filename="static.zip",
+    vehicle_positions_url="https://example.com/vp.pb",
+    trip_updates_url="https://example.com/tu.pb",
+)
+
+
+def make_feed(timestamp: int, trip_id: str = "trip_1") -> bytes:
+    msg = gtfs_realtime_pb2.FeedMessage()
+    msg.header.gtfs_realtime_version = "2.0"
+    msg.header.timestamp = timestamp
+    entity = msg.entity.add()
+    entity.id = "1"
+    entity.vehicle.trip.trip_id = trip_id
+    return msg.SerializeToString()
+
+
+def make_response(mocker: MockerFixture, status: int = 200, content: bytes = b"", headers: dict | None = None):
+    response = mocker.MagicMock()
+    response.status_code = status
+    response.content = content
+    response.headers = headers or {}
+    return response
+
+
+@pytest.fixture
+def fetcher():
+    return FeedFetcher()
+
+
+@pytest.fixture
+def mock_get(mocker: MockerFixture, fetcher):
+    return mocker.patch.object(fetcher._session, "get")
+
+
+def test_returns_new_payload(fetcher, mock_get, mocker):
+    payload = make_feed(1000)
+    mock_get.return_value = make_response(mocker, content=payload)
+
+    assert fetcher.fetch_vehicle_positions(FEED) == payload
+
+
+def test_not_modified_returns_none(fetcher, mock_get, mocker):
+    mock_get.return_value = make_response(mocker, status=304)
+
+    assert fetcher.fetch_vehicle_positions(FEED) is None
+
+
+def test_sends_validators_from_previous_response(fetcher, mock_get, mocker):
+    mock_get.return_value = make_response(
+        mocker,
+        content=make_feed(1000),
+        headers={"ETag": '"abc"', "Last-Modified": "Mon, 09 Feb 2026 12:00:00 GMT"},
+    )
+    fetcher.fetch_vehicle_positions(FEED)
+
+    mock_get.return_value = make_response(mocker, status=304)
+    fetcher.fetch_vehicle_positions(FEED)
+
+    headers = mock_get.call_args.kwargs["headers"]
+    assert headers["If-None-Match"] == '"abc"'
+    assert headers["If-Modified-Since"] == "Mon, 09 Feb 2026 12:00:00 GMT"
+
+
+def test_identical_payload_returns_none(fetcher, mock_get, mocker):
+    payload = make_feed(1000)
+    mock_get.return_value = make_response(mocker, content=payload)
+
+    fetcher.fetch_vehicle_positions(FEED)
+
+    assert fetcher.fetch_vehicle_positions(FEED) is None
+
+
+def test_same_header_timestamp_returns_none(fetcher, mock_get, mocker):
+    mock_get.return_value = make_response(mocker, content=make_feed(1000, trip_id="trip_1"))
+    fetcher.fetch_vehicle_positions(FEED)
+
+    mock_get.return_value = make_response(mocker, content=make_feed(1000, trip_id="trip_2"))
+
+    assert fetcher.fetch_vehicle_positions(FEED) is None
+
+
+def test_newer_header_timestamp_returns_payload(fetcher, mock_get, mocker):
+    mock_get.return_value = make_response(mocker, content=make_feed(1000))
+    fetcher.fetch_vehicle_positions(FEED)
+
+    newer = make_feed(1005)
+    mock_get.return_value = make_response(mocker, content=newer)
+
+    assert fetcher.fetch_vehicle_positions(FEED) == newer
+
+
+def test_feeds_tracked_independently(fetcher, mock_get, mocker):
+    payload = make_feed(1000)
+    mock_get.return_value = make_response(mocker, content=payload)
+
+    fetcher.fetch_vehicle_positions(FEED)
+
+    assert fetcher.fetch_trip_updates(FEED) == payload
+
+
+def test_http_error_raises(fetcher, mock_get, mocker):
+    response = make_response(mocker, status=500)
+    response.raise_for_status.side_effect = Exception("500 Server Error")
+    mock_get.return_value = response
+
+    with pytest.raises(Exception, match="500"):
+        fetcher.fetch_vehicle_positions(FEED)
+
+
+def test_forgotten_payload_is_returned_again(fetcher, mock_get, mocker):
+    payload = make_feed(1000)
+    mock_get.return_value = make_response(mocker, content=payload, headers={"ETag": '"v1"'})
+    fetcher.fetch_vehicle_positions(FEED)
+
+    fetcher.forget(FEED.vehicle_positions_url)
+
+    assert fetcher.fetch_vehicle_positions(FEED) == payload
+    assert "If-None-Match" not in mock_get.call_args.kwargs["headers"]
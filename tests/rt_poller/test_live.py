@@ -0,0 +1,246 @@
+import itertools
+import math
+
+import msgspec
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
+
+from app.common.constants import LIVE_FEED_STALE_AFTER, POLL_INTERVAL_SECONDS
+from app.common.gtfs.snapshot import TripInfo
+from app.common.models.enums import Agency
+from app.common.models.gtfs_realtime import VehiclePositionBatch
+from app.common.redis.repositories.live_vehicles import LiveVehiclesRepository
+from app.common.redis.schemas import LiveVehicleColumns
+from app.common.redis.serializer import encode_live_columns
+from app.rt_poller.live import LiveSnapshot, build_live_vehicles, diff_live_vehicles
+
+TRIPS = {
+    "trip_1": TripInfo("trip_1", "152", 0, "Dworzec Główny", "shape_1"),
+    "trip_2": TripInfo("trip_2", "50", 1, None, None),
+}
+
+
+def make_batch(agency: Agency, *rows: tuple[str, str, float, float, float]) -> VehiclePositionBatch:
+    n = len(rows)
+    return VehiclePositionBatch(
+        agency=agency,
+        trip_id=np.array([r[0] for r in rows], dtype=object),
+        vehicle_id=np.array([""] * n, dtype=object),
+        license_plate=np.array([r[1] for r in rows], dtype=object),
+        stop_id=np.array([None] * n, dtype=object),
+        latitude=np.array([r[2] for r in rows], dtype=np.float64),
+        longitude=np.array([r[3] for r in rows], dtype=np.float64),
+        bearing=np.array([r[4] for r in rows], dtype=np.float64),
+        stop_sequence=np.full(n, -1, dtype=np.int32),
+        status=np.full(n, -1, dtype=np.int8),
+        timestamp=np.full(n, 1_700_000_000, dtype=np.int64),
+    )
+
+
+@pytest.fixture
+def static(mocker: MockerFixture):
+    static = mocker.MagicMock()
+    static.current.get_trip.side_effect = TRIPS.get
+    return static
+
+
+@pytest.fixture
+def repo(mocker: MockerFixture):
+    repo = mocker.MagicMock(spec=LiveVehiclesRepository)
+    repo.next_version.side_effect = itertools.count(42)
+    return repo
+
+
+@pytest.fixture
+def clock(mocker: MockerFixture):
+    return mocker.patch("app.rt_poller.live.time.monotonic", return_value=1000.0)
+
+
+class TestBuildLiveVehicles:
+    def test_enriches_known_trips_with_a_position(self, static):
+        batch = make_batch(
+            Agency.MPK,
+            ("trip_1", "DN001", 50.06, 19.94, 90.0),
+            ("trip_2", "DN002", 50.07, 19.95, math.nan),
+            ("unknown", "DN003", 50.08, 19.96, 0.0),
+            ("trip_1", "DN004", math.nan, math.nan, 0.0),
+        )
+
+        first, second = build_live_vehicles([batch], static.current)
+
+        assert (first.license_plate, first.line_number, first.headsign, first.shape_id) == (
+            "DN001",
+            "152",
+            "Dworzec Główny",
+            "shape_1",
+        )
+        assert first.timestamp == "2023-11-14T22:13:20+00:00"
+        assert second.headsign == ""
+        assert second.bearing is None
+
+
+class TestEncodeLiveColumns:
+    def test_columns_round_trip(self, static):
+        vehicles = build_live_vehicles(
+            [
+                make_batch(
+                    Agency.MPK,
+                    ("trip_1", "DN001", 50.06, 19.94, 90.0),
+                    ("trip_2", "DN002", 50.07, 19.95, math.nan),
+                    ("trip_1", "DN003", 50.08, 19.96, 0.0),
+                )
+            ],
+            static.current,
+        )
+
+        columns = msgspec.msgpack.decode(encode_live_columns(7, vehicles), type=LiveVehicleColumns)
+
+        assert (columns.version, columns.count) == (7, 3)
+        assert columns.license_plate == ["DN001", "DN002", "DN003"]
+        assert [columns.lines[i] for i in np.frombuffer(columns.line, dtype="<u2")] == ["152", "50", "152"]
+        assert [columns.headsigns[i] for i in np.frombuffer(columns.headsign, dtype="<u2")] == [
+            "Dworzec Główny",
+            "",
+            "Dworzec Główny",
+        ]
+        assert [columns.shapes[i] for i in np.frombuffer(columns.shape, dtype="<u2")] == ["shape_1", None, "shape_1"]
+        np.testing.assert_allclose(np.frombuffer(columns.latitude, dtype="<f4"), [50.06, 50.07, 50.08], rtol=1e-6)
+        assert np.isnan(np.frombuffer(columns.bearing, dtype="<f4")[1])
+        assert np.frombuffer(columns.timestamp, dtype="<u4").tolist() == [1_700_000_000] * 3
+
+
+class TestLiveSnapshot:
+    def test_publishes_every_feed_with_the_next_version(self, static, repo):
+        live = LiveSnapshot(repo, static)
+        live.update(make_batch(Agency.MPK, ("trip_1", "DN001", 50.06, 19.94, 90.0)))
+        live.update(make_batch(Agency.MOBILIS, ("trip_2", "DN002", 50.07, 19.95, 0.0)))
+
+        assert live.publish() == 42
+
+        version, data, _, _ = repo.write.call_args.args
+        body = msgspec.json.decode(data)
+        assert version == body["version"] == 42
+        assert [v["license_plate"] for v in body["vehicles"]] == ["DN001", "DN002"]
+
+    def test_newer_batch_replaces_the_feeds_previous_one(self, static, repo):
+        live = LiveSnapshot(repo, static)
+        live.update(make_batch(Agency.MPK, ("trip_1", "DN001", 50.06, 19.94, 90.0)))
+        live.publish()
+        live.update(make_batch(Agency.MPK, ("trip_2", "DN002", 50.07, 19.95, 0.0)))
+
+        assert live.publish() == 43
+
+        body = msgspec.json.decode(repo.write.call_args.args[1])
+        assert [v["license_plate"] for v in body["vehicles"]] == ["DN002"]
+
+    def test_deltas_from_recent_versions(self, static, repo):
+        live = LiveSnapshot(repo, static)
+        live.update(make_batch(Agency.MPK, ("trip_1", "DN001", 50.06, 19.94, 90.0), ("trip_2", "DN002", 50.0, 19.0, 0)))
+        live.publish()
+        live.update(make_batch(Agency.MPK, ("trip_1", "DN001", 50.07, 19.94, 90.0)))
+        live.publish()
+
+        deltas = {since: msgspec.json.decode(data) for since, data in repo.write.call_args.args[2].items()}
+
+        assert set(deltas) == {42, 43}
+        assert deltas[42]["moved"] == [
+            {
+                "license_plate": "DN001",
+                "latitude": 50.07,
+                "longitude": 19.94,
+                "bearing": 90.0,
+                "timestamp": "2023-11-14T22:13:20+00:00",
+            }
+        ]
+        assert deltas[42]["removed"] == ["DN002"]
+        assert deltas[43] == {
+            "version": 43,
+            "since": 43,
+            "count": 1,
+            "added": [],
+            "moved": [],
+            "removed": [],
+        }
+
+    def test_version_comes_from_the_persistent_counter(self, static, repo):
+        repo.next_version.side_effect = [7]
+        live = LiveSnapshot(repo, static)
+        live.update(make_batch(Agency.MPK, ("trip_1", "DN001", 50.06, 19.94, 90.0)))
+
+        assert live.publish() == 7
+        assert repo.write.call_args.args[0] == 7
+
+    def test_unchanged_snapshot_expiry_is_extended(self, static, repo):
+        live = LiveSnapshot(repo, static)
+        live.update(make_batch(Agency.MPK, ("trip_1", "DN001", 50.06, 19.94, 90.0)))
+        live.publish()
+
+        assert live.publish() is None
+        repo.write.assert_called_once()
+        repo.keep_alive.assert_called_once()
+
+    def test_static_reload_republishes(self, static, repo, mocker: MockerFixture):
+        live = LiveSnapshot(repo, static)
+        live.update(make_batch(Agency.MPK, ("trip_1", "DN001", 50.06, 19.94, 90.0)))
+        live.publish()
+        static.current = mocker.MagicMock(get_trip=lambda trip_id: TripInfo(trip_id, "152", 0, "Nowy Bieżanów", None))
+
+        assert live.publish() == 43
+        body = msgspec.json.decode(repo.write.call_args.args[1])
+        assert body["vehicles"][0]["headsign"] == "Nowy Bieżanów"
+
+    def test_failing_feed_is_dropped_once_stale(self, static, repo, clock):
+        live = LiveSnapshot(repo, static)
+        live.update(make_batch(Agency.MPK, ("trip_1", "DN001", 50.06, 19.94, 90.0)))
+        live.update(make_batch(Agency.MOBILIS, ("trip_2", "DN002", 50.07, 19.95, 0.0)))
+        live.publish()
+
+        # MOBILIS keeps failing, MPK keeps answering 304 Not Modified
+        cycles = int(LIVE_FEED_STALE_AFTER // POLL_INTERVAL_SECONDS) + 1
+        for _ in range(cycles):
+            clock.return_value += POLL_INTERVAL_SECONDS
+            live.confirm(Agency.MPK)
+            live.publish()
+
+        assert repo.write.call_count == 2
+        body = msgspec.json.decode(repo.write.call_args.args[1])
+        assert [v["license_plate"] for v in body["vehicles"]] == ["DN001"]
+        assert msgspec.json.decode(repo.write.call_args.args[2][42])["removed"] == ["DN002"]
+
+    def test_snapshot_expires_when_every_feed_is_stale(self, static, repo, clock):
+        live = LiveSnapshot(repo, static)
+        live.update(make_batch(Agency.MPK, ("trip_1", "DN001", 50.06, 19.94, 90.0)))
+        live.publish()
+        clock.return_value += LIVE_FEED_STALE_AFTER + 1
+
+        assert live.publish() == 43
+        assert msgspec.json.decode(repo.write.call_args.args[1])["vehicles"] == []
+        assert live.publish() is None
+        repo.keep_alive.assert_not_called()
+
+    def test_nothing_written_without_changes(self, static, repo):
+        live = LiveSnapshot(repo, static)
+
+        assert live.publish() is None
+        repo.write.assert_not_called()
+        repo.keep_alive.assert_not_called()
+
+
+class TestDiffLiveVehicles:
+    def test_trip_switch_is_sent_in_full(self, static):
+        (before,) = build_live_vehicles([make_batch(Agency.MPK, ("trip_1", "DN001", 50.0, 19.0, 0.0))], static.current)
+        (after,) = build_live_vehicles([make_batch(Agency.MPK, ("trip_2", "DN001", 50.0, 19.0, 0.0))], static.current)
+
+        delta = diff_live_vehicles({"DN001": before}, {"DN001": after}, since=1, version=2)
+
+        assert delta.added == [after]
+        assert delta.moved == delta.removed == []
+
+    def test_unchanged_vehicle_is_left_out(self, static):
+        (vehicle,) = build_live_vehicles([make_batch(Agency.MPK, ("trip_1", "DN001", 50.0, 19.0, 0.0))], static.current)
+
+        delta = diff_live_vehicles({"DN001": vehicle}, {"DN001": vehicle}, since=1, version=2)
+
+        assert delta.added == delta.moved == delta.removed == []
+        assert delta.count == 1
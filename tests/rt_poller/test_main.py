@@ -0,0 +1,129 @@
+import logging
+import threading
+from concurrent.futures import Future
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.common.feeds import FeedConfig
+from app.common.models.enums import Agency
+from app.rt_poller import main
+from app.rt_poller.main import FeedKind, _publish, run_poller
+
+FEED = FeedConfig(
+    agency=Agency.MPK,
+    static_url="https://example.com/static.zip",
+    static_filename="static.zip",
+    vehicle_positions_url="https://example.com/vp.pb",
+    trip_updates_url="https://example.com/tu.pb",
+)
+
+
+class Cycles:
+    """Stands in for shutdown_event: counts poll cycles (one wait() ends each) and stops the loop after `limit`."""
+
+    def __init__(self, limit: int, on_cycle=None):
+        self.limit = limit
+        self.on_cycle = on_cycle
+        self.count = 0
+
+    def is_set(self) -> bool:
+        return self.count >= self.limit
+
+    def wait(self, timeout: float | None = None) -> bool:
+        self.count += 1
+        if self.on_cycle is not None:
+            self.on_cycle(self.count)
+        return self.is_set()
+
+
+@pytest.fixture
+def poller(mocker: MockerFixture):
+    """run_poller with one feed, mocked I/O and a short poll interval."""
+    mocker.patch.object(main, "get_client")
+    mocker.patch.object(main, "get_config")
+    mocker.patch.object(main, "StaticHolder")
+    mocker.patch.object(main, "get_all_feed_configs", return_value=[FEED])
+    mocker.patch.object(main, "POLL_INTERVAL_SECONDS", 0.05)
+    publisher = mocker.patch.object(main, "Publisher").return_value
+    fetcher = mocker.patch.object(main, "FeedFetcher").return_value
+    fetcher.fetch_vehicle_positions.return_value = b"vp"
+    fetcher.fetch_trip_updates.return_value = b"tu"
+    return publisher, fetcher
+
+
+def test_every_feed_is_fetched_and_published_each_cycle(poller, mocker: MockerFixture):
+    publisher, fetcher = poller
+    mocker.patch.object(main, "shutdown_event", Cycles(2))
+
+    run_poller()
+
+    assert fetcher.fetch_vehicle_positions.call_count == fetcher.fetch_trip_updates.call_count == 2
+    assert publisher.publish_vehicle_positions.call_count == publisher.process_trip_updates.call_count == 2
+
+
+def test_failed_fetch_does_not_stop_the_loop(poller, mocker: MockerFixture):
+    publisher, fetcher = poller
+    fetcher.fetch_trip_updates.side_effect = TimeoutError("read timed out")
+    mocker.patch.object(main, "shutdown_event", Cycles(2))
+
+    run_poller()
+
+    assert fetcher.fetch_trip_updates.call_count == 2
+    assert publisher.publish_vehicle_positions.call_count == 2
+    publisher.process_trip_updates.assert_not_called()
+
+
+def test_slow_fetch_is_skipped_while_in_flight_and_published_late(poller, mocker: MockerFixture, caplog):
+    publisher, fetcher = poller
+    release = threading.Event()
+
+    def slow_fetch(feed):
+        release.wait(5)
+        return b"vp"
+
+    fetcher.fetch_vehicle_positions.side_effect = slow_fetch
+    # Released at the end of cycle 2, so its result arrives during cycle 3
+    mocker.patch.object(main, "shutdown_event", Cycles(3, lambda cycle: cycle == 2 and release.set()))
+
+    with caplog.at_level(logging.WARNING, logger=main.__name__):
+        run_poller()
+
+    fetcher.fetch_vehicle_positions.assert_called_once()
+    assert fetcher.fetch_trip_updates.call_count == 3
+    publisher.publish_vehicle_positions.assert_called_once_with(FEED, b"vp")
+    assert "fetch still in flight, skipping this cycle" in caplog.text
+    assert "1 feed fetches exceeded the poll interval" in caplog.text
+
+
+def done(result: bytes | None) -> Future[bytes | None]:
+    future: Future[bytes | None] = Future()
+    future.set_result(result)
+    return future
+
+
+def test_failed_publish_makes_the_fetcher_forget_the_payload(mocker: MockerFixture):
+    publisher, fetcher = mocker.MagicMock(), mocker.MagicMock()
+    publisher.process_trip_updates.side_effect = ConnectionError("Redis down")
+
+    _publish(publisher, fetcher, FEED, FeedKind.TRIP_UPDATES, done(b"payload"))
+
+    fetcher.forget.assert_called_once_with("https://example.com/tu.pb")
+
+
+def test_published_payload_is_remembered(mocker: MockerFixture):
+    publisher, fetcher = mocker.MagicMock(), mocker.MagicMock()
+
+    _publish(publisher, fetcher, FEED, FeedKind.VEHICLE_POSITIONS, done(b"payload"))
+
+    publisher.publish_vehicle_positions.assert_called_once_with(FEED, b"payload")
+    fetcher.forget.assert_not_called()
+
+
+def test_unchanged_vehicle_positions_keep_the_feed_live(mocker: MockerFixture):
+    publisher, fetcher = mocker.MagicMock(), mocker.MagicMock()
+
+    _publish(publisher, fetcher, FEED, FeedKind.VEHICLE_POSITIONS, done(None))
+
+    publisher.confirm_vehicle_positions.assert_called_once_with(FEED)
+    publisher.publish_vehicle_positions.assert_not_called()
@@ -0,0 +1,115 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.common.config import TransportConfig
+from app.common.feeds import FeedConfig
+from app.common.models.enums import Agency, Transport
+from app.common.models.gtfs_realtime import StopTimeUpdate, TripUpdate
+from app.common.redis.repositories.trip_updates import TripUpdatesRepository
+from app.rt_poller import publisher as publisher_module
+from app.rt_poller.publisher import Publisher
+
+FEED = FeedConfig(
+    agency=Agency.MPK,
+    static_url="https://example.com/static.zip",
+    static_filename="static.zip",
+    vehicle_positions_url="https://example.com/vp.pb",
+    trip_updates_url="https://example.com/tu.pb",
+)
+
+ARRIVAL = datetime(2025, 1, 15, 8, 0, tzinfo=UTC)
+
+
+def make_update(trip_id: str, arrival: datetime = ARRIVAL, stop_sequence: int = 1) -> TripUpdate:
+    return TripUpdate(
+        agency=Agency.MPK,
+        trip_id=trip_id,
+        vehicle_id=None,
+        timestamp=ARRIVAL,
+        stop_time_updates=[
+            StopTimeUpdate(stop_id="s1", stop_sequence=stop_sequence, arrival_time=arrival, departure_time=None)
+        ],
+    )
+
+
+@pytest.fixture
+def repo(mocker: MockerFixture):
+    return mocker.MagicMock(spec=TripUpdatesRepository)
+
+
+@pytest.fixture
+def publisher(mocker: MockerFixture, repo):
+    publisher = Publisher(mocker.MagicMock(), TransportConfig(kind=Transport.PUBSUB, partitions=1), mocker.MagicMock())
+    publisher._trip_updates_repository = repo
+    return publisher
+
+
+def merged_trips(repo) -> list[str]:
+    updates, _ = repo.merge_many.call_args.args
+    return [update.trip_id for update, _ in updates]
+
+
+class TestProcessTripUpdates:
+    def test_first_poll_writes_every_trip(self, mocker: MockerFixture, publisher, repo):
+        mocker.patch.object(publisher_module, "parse_trip_updates", return_value=[make_update("t1"), make_update("t2")])
+
+        assert publisher.process_trip_updates(FEED, b"") == 2
+
+        assert merged_trips(repo) == ["t1", "t2"]
+
+    def test_only_changed_trips_are_rewritten(self, mocker: MockerFixture, publisher, repo):
+        parse = mocker.patch.object(publisher_module, "parse_trip_updates")
+        parse.return_value = [make_update("t1"), make_update("t2")]
+        publisher.process_trip_updates(FEED, b"")
+        repo.reset_mock()
+
+        parse.return_value = [make_update("t1"), make_update("t2", ARRIVAL + timedelta(minutes=2))]
+        publisher.process_trip_updates(FEED, b"")
+
+        assert merged_trips(repo) == ["t2"]
+
+    def test_unchanged_feed_skips_redis(self, mocker: MockerFixture, publisher, repo):
+        mocker.patch.object(publisher_module, "parse_trip_updates", return_value=[make_update("t1")])
+        publisher.process_trip_updates(FEED, b"")
+        repo.reset_mock()
+
+        publisher.process_trip_updates(FEED, b"")
+
+        repo.merge_many.assert_not_called()
+
+    def test_unchanged_trip_ttl_is_refreshed(self, mocker: MockerFixture, publisher, repo):
+        clock = mocker.patch.object(publisher_module.time, "monotonic", return_value=1000.0)
+        mocker.patch.object(publisher_module, "parse_trip_updates", return_value=[make_update("t1")])
+        mocker.patch.object(publisher_module, "TRIP_UPDATES_RESYNC_SECONDS", 10**9)
+        publisher.process_trip_updates(FEED, b"")
+        repo.reset_mock()
+
+        clock.return_value = 1000.0 + publisher_module.REDIS_TRIP_UPDATES_TTL / 2
+        publisher.process_trip_updates(FEED, b"")
+
+        repo.merge_many.assert_called_once_with([], [("mpk", "t1")])
+
+    def test_resync_rewrites_every_trip(self, mocker: MockerFixture, publisher, repo):
+        clock = mocker.patch.object(publisher_module.time, "monotonic", return_value=1000.0)
+        mocker.patch.object(publisher_module, "parse_trip_updates", return_value=[make_update("t1")])
+        publisher.process_trip_updates(FEED, b"")
+        repo.reset_mock()
+
+        clock.return_value = 1000.0 + publisher_module.TRIP_UPDATES_RESYNC_SECONDS
+        publisher.process_trip_updates(FEED, b"")
+
+        assert merged_trips(repo) == ["t1"]
+
+    def test_failed_write_is_retried_next_poll(self, mocker: MockerFixture, publisher, repo):
+        mocker.patch.object(publisher_module, "parse_trip_updates", return_value=[make_update("t1")])
+        repo.merge_many.side_effect = ConnectionError
+        with pytest.raises(ConnectionError):
+            publisher.process_trip_updates(FEED, b"")
+        repo.merge_many.side_effect = None
+
+        publisher.process_trip_updates(FEED, b"")
+
+        assert merged_trips(repo) == ["t1"]
+
@@ -3,7 +3,7 @@ from datetime import UTC, datetime
 import pytest
 from pytest_mock import MockerFixture
 
-from app.common.db.models import CurrentRoute, CurrentStop, CurrentStopTime, CurrentTrip
+from app.common.gtfs.snapshot import StopInfo, StopTimeInfo, TripInfo
 from app.common.models.enums import Agency, VehicleStatus
 from app.common.models.gtfs_realtime import VehiclePosition
 from app.common.redis.schemas import CachedStopTime, TripUpdateCache, VehicleState
@@ -49,34 +49,18 @@ def make_vehicle_state(
     )
 
 
-def make_trip(trip_id: str = "trip_1", route_short_name: str = "152", agency_id: str = "mpk") -> CurrentTrip:
-    route = CurrentRoute()
-    route.route_id = "route_1"
-    route.agency_id = agency_id
-    route.route_short_name = route_short_name
-
-    trip = CurrentTrip()
-    trip.trip_id = trip_id
-    trip.route_id = "route_1"
-    trip.agency_id = agency_id
-    trip.service_id = "service_1"
-    trip.direction_id = 0
-    trip.headsign = "Dworzec Główny"
-    trip.shape_id = None
-    trip.route = route
-    return trip
-
-
-def make_stop(stop_id: str = "stop_5", stop_name: str = "Rondo Mogilskie", agency_id: str = "mpk") -> CurrentStop:
-    stop = CurrentStop()
-    stop.stop_id = stop_id
-    stop.agency_id = agency_id
-    stop.stop_name = stop_name
-    stop.stop_code = None
-    stop.stop_desc = "01"
-    stop.stop_lat = 50.06
-    stop.stop_lon = 19.94
-    return stop
+def make_trip(trip_id: str = "trip_1", route_short_name: str = "152") -> TripInfo:
+    return TripInfo(
+        trip_id=trip_id,
+        line_number=route_short_name,
+        direction_id=0,
+        headsign="Dworzec Główny",
+        shape_id=None,
+    )
+
+
+def make_stop(stop_id: str = "stop_5", stop_name: str = "Rondo Mogilskie") -> StopInfo:
+    return StopInfo(stop_id=stop_id, stop_name=stop_name, stop_desc="01")
 
 
 def make_stop_time(
@@ -84,16 +68,12 @@ def make_stop_time(
     stop_sequence: int = 5,
     stop_id: str | None = None,
     arrival_seconds: int = 43200,
-    agency_id: str = "mpk",
-) -> CurrentStopTime:
-    st = CurrentStopTime()
-    st.trip_id = trip_id
-    st.stop_sequence = stop_sequence
-    st.stop_id = stop_id or f"stop_{stop_sequence}"
-    st.agency_id = agency_id
-    st.arrival_seconds = arrival_seconds
-    st.departure_seconds = arrival_seconds + 30
-    return st
+) -> StopTimeInfo:
+    return StopTimeInfo(
+        stop_sequence=stop_sequence,
+        stop_id=stop_id or f"stop_{stop_sequence}",
+        arrival_seconds=arrival_seconds,
+    )
 
 
 def make_trip_update_cache(
@@ -105,7 +85,6 @@ def make_trip_update_cache(
     if stops:
         for seq, (first, last) in stops.items():
             cached_stops[seq] = CachedStopTime(
-                stop_id=f"stop_{seq}",
                 stop_sequence=seq,
                 first_seen_arrival=first,
                 last_seen_arrival=last,
@@ -127,8 +106,7 @@ def mock_vehicle_state(mocker: MockerFixture):
 @pytest.fixture
 def mock_trip_updates(mocker: MockerFixture):
     mock = mocker.MagicMock()
-    mock.get.return_value = None
-    mock.get_arrival.return_value = None
+    mock.get_stops.return_value = {}
     return mock
 
 
@@ -149,12 +127,11 @@ def detector(mocker: MockerFixture, mock_vehicle_state, mock_trip_updates, mock_
         side_effect=lambda tid, seq: make_stop_time(trip_id=tid, stop_sequence=seq),
     )
     mocker.patch.object(StopEventDetector, "_get_max_stop_sequence", return_value=10)
-    mock_meta = mocker.patch("app.stop_writer.detector.GtfsMetaRepository")
-    mock_meta.return_value.get_current_hash.return_value = "abc123hash"
+    mocker.patch.object(StopEventDetector, "_get_static_hash", return_value="abc123hash")
 
     return StopEventDetector(
-        session=mocker.MagicMock(),
-        redis_vehicle_state=mock_vehicle_state,
+        static=mocker.MagicMock(),
+        vehicle_states=mock_vehicle_state,
         redis_trip_updates=mock_trip_updates,
-        redis_saved_seqs=mock_saved_seqs,
+        saved_seqs=mock_saved_seqs,
     )
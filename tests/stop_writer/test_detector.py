@@ -1,6 +1,7 @@
 from datetime import UTC, datetime
 
 from app.common.models.enums import Agency, DetectionMethod, VehicleStatus
+from app.common.redis.schemas import CachedStopTime
 
 from conftest import make_trip_update_cache, make_vehicle_position, make_vehicle_state
 
@@ -57,7 +58,9 @@ def test_seq_jump_detects_missed_stops(detector, mock_vehicle_state, mock_trip_u
     mock_vehicle_state.get.return_value = make_vehicle_state(trip_id="trip_1", stop_sequence=3)
 
     cached_time = datetime(2026, 2, 9, 11, 59, 0, tzinfo=UTC)
-    mock_trip_updates.get_arrival.side_effect = lambda a, t, seq: cached_time if seq in (3, 4) else None
+    mock_trip_updates.get_stops.return_value = make_trip_update_cache(
+        stops={3: (cached_time, cached_time), 4: (cached_time, cached_time)}
+    ).stops
 
     vp = make_vehicle_position(status=VehicleStatus.IN_TRANSIT_TO, stop_sequence=5)
 
@@ -73,7 +76,9 @@ def test_seq_jump_skips_saved(detector, mock_vehicle_state, mock_trip_updates, m
     mock_vehicle_state.get.return_value = make_vehicle_state(trip_id="trip_1", stop_sequence=3)
 
     cached_time = datetime(2026, 2, 9, 11, 59, 0, tzinfo=UTC)
-    mock_trip_updates.get_arrival.return_value = cached_time
+    mock_trip_updates.get_stops.side_effect = lambda a, t, seqs: {
+        seq: CachedStopTime(seq, cached_time, cached_time) for seq in seqs
+    }
 
     mock_saved_seqs.is_saved.side_effect = lambda a, t, d, seq: seq == 3
 
@@ -88,7 +93,7 @@ def test_seq_jump_skips_saved(detector, mock_vehicle_state, mock_trip_updates, m
 
 def test_seq_jump_skips_no_cached_time(detector, mock_vehicle_state, mock_trip_updates):
     mock_vehicle_state.get.return_value = make_vehicle_state(trip_id="trip_1", stop_sequence=3)
-    mock_trip_updates.get_arrival.return_value = None
+    mock_trip_updates.get_stops.return_value = {}
 
     vp = make_vehicle_position(status=VehicleStatus.IN_TRANSIT_TO, stop_sequence=5)
 
@@ -124,10 +129,10 @@ def test_trip_change_completes_previous(detector, mock_vehicle_state, mock_trip_
 
     t9 = datetime(2026, 2, 9, 12, 5, 0, tzinfo=UTC)
     t10 = datetime(2026, 2, 9, 12, 8, 0, tzinfo=UTC)
-    mock_trip_updates.get.return_value = make_trip_update_cache(
+    mock_trip_updates.get_stops.return_value = make_trip_update_cache(
         trip_id="trip_1",
         stops={9: (t9, t9), 10: (t10, t10)},
-    )
+    ).stops
 
     vp = make_vehicle_position(trip_id="trip_2", status=VehicleStatus.STOPPED_AT, stop_sequence=1)
 
@@ -143,10 +148,10 @@ def test_last_stop_uses_first_seen_arrival(detector, mock_vehicle_state, mock_tr
 
     first_seen = datetime(2026, 2, 9, 12, 5, 0, tzinfo=UTC)
     last_seen = datetime(2026, 2, 9, 12, 8, 0, tzinfo=UTC)
-    mock_trip_updates.get.return_value = make_trip_update_cache(
+    mock_trip_updates.get_stops.return_value = make_trip_update_cache(
         trip_id="trip_1",
         stops={10: (first_seen, last_seen)},
-    )
+    ).stops
 
     vp = make_vehicle_position(trip_id="trip_2", status=VehicleStatus.IN_TRANSIT_TO, stop_sequence=1)
 
@@ -163,10 +168,10 @@ def test_non_last_stop_uses_last_seen_arrival(detector, mock_vehicle_state, mock
     first_seen = datetime(2026, 2, 9, 12, 3, 0, tzinfo=UTC)
     last_seen = datetime(2026, 2, 9, 12, 5, 0, tzinfo=UTC)
     t10 = datetime(2026, 2, 9, 12, 10, 0, tzinfo=UTC)
-    mock_trip_updates.get.return_value = make_trip_update_cache(
+    mock_trip_updates.get_stops.return_value = make_trip_update_cache(
         trip_id="trip_1",
         stops={8: (first_seen, last_seen), 9: (first_seen, last_seen), 10: (t10, t10)},
-    )
+    ).stops
 
     vp = make_vehicle_position(trip_id="trip_2", status=VehicleStatus.IN_TRANSIT_TO, stop_sequence=1)
 
@@ -179,7 +184,7 @@ def test_non_last_stop_uses_last_seen_arrival(detector, mock_vehicle_state, mock
 
 def test_trip_completion_cleans_redis(detector, mock_vehicle_state, mock_trip_updates):
     mock_vehicle_state.get.return_value = make_vehicle_state(trip_id="trip_1", stop_sequence=9)
-    mock_trip_updates.get.return_value = None
+    mock_trip_updates.get_stops.return_value = {}
 
     vp = make_vehicle_position(trip_id="trip_2", status=VehicleStatus.IN_TRANSIT_TO, stop_sequence=1)
 
@@ -227,7 +232,9 @@ def test_stopped_at_plus_seq_jump_combined(detector, mock_vehicle_state, mock_tr
     mock_vehicle_state.get.return_value = make_vehicle_state(trip_id="trip_1", stop_sequence=3)
 
     cached_time = datetime(2026, 2, 9, 11, 59, 0, tzinfo=UTC)
-    mock_trip_updates.get_arrival.side_effect = lambda a, t, seq: cached_time if seq in (3, 4) else None
+    mock_trip_updates.get_stops.return_value = make_trip_update_cache(
+        stops={3: (cached_time, cached_time), 4: (cached_time, cached_time)}
+    ).stops
 
     vp = make_vehicle_position(status=VehicleStatus.STOPPED_AT, stop_sequence=5)
 
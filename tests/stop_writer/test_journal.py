@@ -0,0 +1,135 @@
+from datetime import UTC, date, datetime
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.common.models.enums import Agency, DetectionMethod
+from app.common.models.events import StopEvent
+from app.stop_writer.journal import JournalReplayer, SpillJournal, read_segment
+from app.stop_writer.writer import BatchWriter
+
+
+def _make_event(stop_sequence: int = 1) -> StopEvent:
+    return StopEvent(
+        agency=Agency.MPK,
+        trip_id="trip_1",
+        service_date=date(2026, 2, 9),
+        stop_sequence=stop_sequence,
+        stop_id=f"stop_{stop_sequence}",
+        line_number="152",
+        stop_name="Test Stop",
+        stop_desc=None,
+        direction_id=0,
+        headsign="Dworzec",
+        planned_time=datetime(2026, 2, 9, 12, 0, 0, tzinfo=UTC),
+        event_time=datetime(2026, 2, 9, 12, 1, 0, tzinfo=UTC),
+        delay_seconds=60,
+        vehicle_id="v1",
+        license_plate="AB123",
+        detection_method=DetectionMethod.SEQ_JUMP,
+        is_estimated=True,
+        static_hash="abc123",
+        max_stop_sequence=10,
+    )
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return SpillJournal(tmp_path, segment_max_bytes=1024, max_bytes=10 * 1024)
+
+
+def test_append_and_read_round_trip(journal):
+    journal.append([_make_event(1), _make_event(2)])
+    journal.append([_make_event(3)])
+
+    (segment,) = journal.seal()
+    batches = read_segment(segment)
+
+    assert batches == [[_make_event(1), _make_event(2)], [_make_event(3)]]
+    assert batches[0][0].detection_method is DetectionMethod.SEQ_JUMP
+
+
+def test_segments_rotate_at_size_limit(journal):
+    for i in range(10):
+        journal.append([_make_event(i)] * 3)
+
+    assert len(journal.seal()) > 1
+
+
+def test_torn_tail_is_ignored(journal):
+    journal.append([_make_event(1)])
+    (segment,) = journal.seal()
+    with segment.open("ab") as f:
+        f.write(b"\x00\x00\x10\x00partial")
+
+    assert read_segment(segment) == [[_make_event(1)]]
+
+
+def test_oldest_segments_dropped_over_limit(tmp_path):
+    journal = SpillJournal(tmp_path, segment_max_bytes=512, max_bytes=2048)
+
+    for i in range(40):
+        journal.append([_make_event(i)] * 3)
+
+    segments = journal.seal()
+    assert sum(p.stat().st_size for p in segments) <= 2048 + 512
+    assert read_segment(segments[-1])[-1][0].stop_sequence == 39
+
+
+def test_numbering_continues_after_restart(tmp_path):
+    SpillJournal(tmp_path).append([_make_event(1)])
+
+    journal = SpillJournal(tmp_path)
+    journal.append([_make_event(2)])
+
+    assert [p.name for p in journal.seal()] == ["000000000000.journal", "000000000001.journal"]
+
+
+def test_replay_inserts_and_removes_segments(journal, mocker: MockerFixture):
+    mocker.patch("app.stop_writer.journal.get_session")
+    repo = mocker.patch("app.stop_writer.journal.StopEventRepository").return_value
+    repo.insert_batch.side_effect = len
+    journal.append([_make_event(1), _make_event(2)])
+
+    assert JournalReplayer(journal).replay() == 2
+    assert journal.segments() == []
+
+
+def test_replay_quarantines_corrupt_segment_and_continues(tmp_path, mocker: MockerFixture):
+    mocker.patch("app.stop_writer.journal.get_session")
+    repo = mocker.patch("app.stop_writer.journal.StopEventRepository").return_value
+    repo.insert_batch.side_effect = len
+    journal = SpillJournal(tmp_path, segment_max_bytes=1)
+    journal.append([_make_event(1)])
+    journal.append([_make_event(2)])
+    corrupt, _ = journal.seal()
+    corrupt.write_bytes(b"\x00\x00\x00\x03\xc1\xc1\xc1")
+
+    assert JournalReplayer(journal).replay() == 1
+    assert journal.segments() == []
+    assert corrupt.with_suffix(".corrupt").exists()
+
+
+def test_replay_skips_segment_dropped_meanwhile(journal, mocker: MockerFixture):
+    mocker.patch("app.stop_writer.journal.get_session")
+    repo = mocker.patch("app.stop_writer.journal.StopEventRepository").return_value
+    journal.append([_make_event(1)])
+    (segment,) = journal.seal()
+    mocker.patch.object(journal, "seal", return_value=[segment])
+    segment.unlink()
+
+    assert JournalReplayer(journal).replay() == 0
+    repo.insert_batch.assert_not_called()
+
+
+def test_writer_spills_and_acks_after_retries(journal, mocker: MockerFixture):
+    session = mocker.MagicMock()
+    session.execute.side_effect = Exception("DB down")
+    on_commit = mocker.MagicMock()
+    writer = BatchWriter(session, checkpoint=lambda: on_commit, max_attempts=2, retry_backoff=0, journal=journal)
+    writer.add_many([_make_event()])
+
+    writer.close()
+
+    on_commit.assert_called_once()
+    assert read_segment(journal.seal()[0]) == [[_make_event()]]
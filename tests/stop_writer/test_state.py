@@ -0,0 +1,121 @@
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+import redis
+from pytest_mock import MockerFixture
+
+from app.stop_writer.state import SavedSequencesStore, VehicleStateStore
+
+from conftest import make_vehicle_state
+
+
+def recent() -> datetime:
+    return datetime.now(UTC) - timedelta(minutes=1)
+
+
+@pytest.fixture
+def mock_repo(mocker: MockerFixture):
+    repo = mocker.MagicMock()
+    repo.get_all.return_value = []
+    return repo
+
+
+@pytest.fixture
+def store(mock_repo):
+    return VehicleStateStore(mock_repo)
+
+
+def test_save_is_served_from_memory(store, mock_repo):
+    state = make_vehicle_state(timestamp=recent())
+
+    store.save(state)
+
+    assert store.get("mpk", "AB123") is state
+    mock_repo.get.assert_not_called()
+    mock_repo.write_many.assert_not_called()
+
+
+def test_load_rehydrates_from_redis(store, mock_repo):
+    mock_repo.get_all.return_value = [make_vehicle_state(license_plate="AB123"), make_vehicle_state(license_plate="CD4")]
+
+    assert store.load() == 2
+    assert store.get("mpk", "CD4").license_plate == "CD4"
+
+
+def test_flush_writes_dirty_and_deleted_once(store, mock_repo):
+    state = make_vehicle_state(license_plate="AB123", timestamp=recent())
+    store.save(state)
+    store.save(make_vehicle_state(license_plate="CD4", timestamp=recent()))
+    store.delete("mpk", "CD4")
+
+    assert store.flush() == 2
+    saved, deleted = mock_repo.write_many.call_args.args
+    assert list(saved) == [state]
+    assert deleted == {("mpk", "CD4")}
+
+    assert store.flush() == 0
+    mock_repo.write_many.assert_called_once()
+
+
+def test_failed_flush_is_retried(store, mock_repo):
+    store.save(make_vehicle_state(timestamp=recent()))
+    mock_repo.write_many.side_effect = redis.ConnectionError()
+
+    assert store.flush() == 0
+
+    mock_repo.write_many.side_effect = None
+    assert store.flush() == 1
+
+
+def test_flush_evicts_expired_vehicles(store, mock_repo):
+    store.save(make_vehicle_state(timestamp=datetime.now(UTC) - timedelta(hours=4)))
+
+    assert store.flush() == 0
+    assert store.get("mpk", "AB123") is None
+
+
+# Saved sequences
+
+
+@pytest.fixture
+def saved_repo(mocker: MockerFixture):
+    repo = mocker.MagicMock()
+    repo.get_saved.return_value = {3}
+    return repo
+
+
+@pytest.fixture
+def saved_store(saved_repo):
+    return SavedSequencesStore(saved_repo)
+
+
+def test_saved_loads_trip_once(saved_store, saved_repo):
+    today = datetime.now(UTC).date()
+
+    assert saved_store.is_saved("mpk", "trip_1", today, 3)
+    assert not saved_store.is_saved("mpk", "trip_1", today, 4)
+    saved_store.mark_saved("mpk", "trip_1", today, 4)
+
+    assert saved_store.is_saved("mpk", "trip_1", today, 4)
+    saved_repo.get_saved.assert_called_once_with("mpk", "trip_1", today)
+
+
+def test_saved_flush_batches_marks(saved_store, saved_repo):
+    today = datetime.now(UTC).date()
+    saved_store.mark_saved("mpk", "trip_1", today, 4)
+    saved_store.mark_saved("mpk", "trip_1", today, 5)
+    saved_store.mark_saved("mpk", "trip_2", today, 1)
+
+    assert saved_store.flush() == 3
+    saved_repo.mark_saved_many.assert_called_once_with(
+        {("mpk", "trip_1", today): {4, 5}, ("mpk", "trip_2", today): {1}}
+    )
+
+
+def test_saved_flush_evicts_old_service_dates(saved_store, saved_repo):
+    saved_store.is_saved("mpk", "trip_1", date(2020, 1, 1), 3)
+    saved_store.flush()
+
+    saved_store.is_saved("mpk", "trip_1", date(2020, 1, 1), 3)
+
+    assert saved_repo.get_saved.call_count == 2
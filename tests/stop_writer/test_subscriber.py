@@ -0,0 +1,163 @@
+import json
+from datetime import UTC, datetime
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.common.models.enums import Agency, VehicleStatus
+from app.common.redis import serializer
+from app.stop_writer.subscriber import StreamSubscriber, Subscriber, decode_message
+
+from conftest import make_vehicle_position
+
+
+@pytest.fixture
+def mock_pubsub(mocker: MockerFixture):
+    return mocker.MagicMock()
+
+
+@pytest.fixture
+def subscriber(mocker: MockerFixture, mock_pubsub):
+    client = mocker.MagicMock()
+    client.pubsub.return_value = mock_pubsub
+    return Subscriber(client)
+
+
+def test_decode_batch_message():
+    positions = [
+        make_vehicle_position(stop_sequence=3, license_plate="AB123"),
+        make_vehicle_position(stop_sequence=7, license_plate="CD456", status=VehicleStatus.INCOMING_AT),
+    ]
+
+    decoded = decode_message(serializer.encode_vehicle_positions(Agency.MPK, positions))
+
+    assert [p.license_plate for p in decoded] == ["AB123", "CD456"]
+    assert [p.stop_sequence for p in decoded] == [3, 7]
+    assert decoded[1].status == VehicleStatus.INCOMING_AT
+    assert decoded[0].timestamp == positions[0].timestamp
+    assert decoded[0].agency == Agency.MPK
+
+
+def test_decode_legacy_json_message():
+    data = json.dumps(
+        {
+            "agency": "mpk",
+            "trip_id": "trip_1",
+            "vehicle_id": "v1",
+            "license_plate": "AB123",
+            "stop_id": "stop_5",
+            "stop_sequence": 5,
+            "status": 1,
+            "timestamp": "2026-02-09T12:00:00+00:00",
+        }
+    ).encode()
+
+    decoded = decode_message(data)
+
+    assert len(decoded) == 1
+    assert decoded[0].status == VehicleStatus.STOPPED_AT
+    assert decoded[0].timestamp == datetime(2026, 2, 9, 12, 0, 0, tzinfo=UTC)
+
+
+def test_get_next_drains_batch_before_reading(subscriber, mock_pubsub):
+    positions = [make_vehicle_position(license_plate=f"AB{i}") for i in range(3)]
+    mock_pubsub.get_message.return_value = {
+        "type": "message",
+        "data": serializer.encode_vehicle_positions(Agency.MPK, positions),
+    }
+
+    received = [subscriber.get_next() for _ in range(3)]
+
+    assert [p.license_plate for p in received] == ["AB0", "AB1", "AB2"]
+    mock_pubsub.get_message.assert_called_once()
+
+
+def test_get_next_returns_none_on_garbage(subscriber, mock_pubsub):
+    mock_pubsub.get_message.return_value = {"type": "message", "data": b"\xc1garbage"}
+
+    assert subscriber.get_next() is None
+
+
+def test_get_next_ignores_subscribe_confirmation(subscriber, mock_pubsub):
+    mock_pubsub.get_message.return_value = {"type": "subscribe", "data": 1}
+
+    assert subscriber.get_next() is None
+
+
+# Redis Streams transport
+
+
+def stream_response(key: str, entries: list[tuple[bytes, dict | None]]):
+    return [[key.encode(), entries]]
+
+
+@pytest.fixture
+def mock_redis(mocker: MockerFixture):
+    client = mocker.MagicMock()
+    client.xreadgroup.return_value = []
+    return client
+
+
+def test_stream_creates_group_per_partition(mock_redis):
+    StreamSubscriber(mock_redis, [0, 1])
+
+    created = [c.args[0] for c in mock_redis.xgroup_create.call_args_list]
+    assert created == ["vp_stream:0", "vp_stream:1"]
+
+
+def test_stream_reads_backlog_before_new_entries(mock_redis):
+    subscriber = StreamSubscriber(mock_redis, [0])
+
+    subscriber.get_next()
+    subscriber.get_next()
+
+    first, second = mock_redis.xreadgroup.call_args_list
+    assert first.args[2] == {"vp_stream:0": "0"}
+    assert second.args[2] == {"vp_stream:0": ">"}
+
+
+def test_stream_switches_to_new_entries_when_history_read_is_empty(mock_redis):
+    mock_redis.xreadgroup.return_value = [[b"vp_stream:0", []]]
+    subscriber = StreamSubscriber(mock_redis, [0])
+
+    subscriber.get_next()
+    subscriber.get_next()
+
+    first, second = mock_redis.xreadgroup.call_args_list
+    assert first.args[2] == {"vp_stream:0": "0"}
+    assert second.args[2] == {"vp_stream:0": ">"}
+    assert second.kwargs["block"] > 0
+
+
+def test_stream_checkpoint_acks_fully_delivered_entries(mock_redis):
+    data = serializer.encode_vehicle_positions(Agency.MPK, [make_vehicle_position(), make_vehicle_position()])
+    mock_redis.xreadgroup.return_value = stream_response("vp_stream:0", [(b"1-0", {b"data": data})])
+    subscriber = StreamSubscriber(mock_redis, [0])
+
+    subscriber.get_next()
+    subscriber.checkpoint()()
+    mock_redis.pipeline.return_value.xack.assert_not_called()
+
+    subscriber.get_next()
+    subscriber.checkpoint()()
+
+    mock_redis.pipeline.return_value.xack.assert_called_once_with("vp_stream:0", "stop_writer", b"1-0")
+
+
+def test_stream_trimmed_entry_is_acked(mock_redis):
+    mock_redis.xreadgroup.return_value = stream_response("vp_stream:0", [(b"1-0", None)])
+    subscriber = StreamSubscriber(mock_redis, [0])
+
+    assert subscriber.get_next() is None
+    subscriber.checkpoint()()
+
+    mock_redis.pipeline.return_value.xack.assert_called_once_with("vp_stream:0", "stop_writer", b"1-0")
+
+
+def test_pubsub_subscribes_to_partition_channels(mocker: MockerFixture, mock_pubsub):
+    client = mocker.MagicMock()
+    client.pubsub.return_value = mock_pubsub
+
+    Subscriber(client, ["vehicle_positions:0", "vehicle_positions:2"])
+
+    mock_pubsub.subscribe.assert_called_once_with("vehicle_positions:0", "vehicle_positions:2")
@@ -39,7 +39,9 @@ def mock_session(mocker: MockerFixture):
 
 @pytest.fixture
 def writer(mock_session):
-    return BatchWriter(mock_session, batch_size=5, flush_interval=timedelta(seconds=10))
+    writer = BatchWriter(mock_session, batch_size=5, flush_interval=timedelta(seconds=10), retry_backoff=0)
+    yield writer
+    writer.close()
 
 
 def test_flush_empty_buffer_returns_zero(writer):
@@ -58,6 +60,7 @@ def test_flush_commits_session(writer, mock_session):
     writer.add_many([_make_event()])
 
     writer.flush()
+    writer.join()
 
     mock_session.commit.assert_called_once()
 
@@ -74,6 +77,7 @@ def test_auto_flush_on_batch_size(writer, mock_session):
     events = [_make_event(i) for i in range(5)]
 
     writer.add_many(events)
+    writer.join()
 
     mock_session.commit.assert_called_once()
 
@@ -82,6 +86,7 @@ def test_no_auto_flush_below_batch_size(writer, mock_session):
     events = [_make_event(i) for i in range(4)]
 
     writer.add_many(events)
+    writer.join()
 
     mock_session.commit.assert_not_called()
 
@@ -90,25 +95,40 @@ def test_flush_rollback_on_error(writer, mock_session):
     mock_session.execute = mocker_side_effect_error(mock_session)
     writer.add_many([_make_event()])
 
-    result = writer.flush()
+    writer.flush()
+    writer.join()
+
+    mock_session.rollback.assert_called()
+
+
+def test_failed_batch_is_retried(writer, mock_session):
+    mock_session.execute.side_effect = [Exception("DB error"), None]
+    writer.add_many([_make_event()])
+
+    writer.flush()
+    writer.join()
 
-    assert result == 0
+    assert mock_session.execute.call_count == 2
     mock_session.rollback.assert_called_once()
+    mock_session.commit.assert_called_once()
 
 
-def test_flush_clears_buffer_on_error(writer, mock_session):
+def test_failed_batch_given_up_after_max_attempts(mock_session):
     mock_session.execute = mocker_side_effect_error(mock_session)
+    writer = BatchWriter(mock_session, batch_size=5, max_attempts=3, retry_backoff=0)
     writer.add_many([_make_event()])
 
-    writer.flush()
+    writer.close()
 
-    assert writer.flush() == 0
+    assert mock_session.execute.call_count == 3
+    mock_session.commit.assert_not_called()
 
 
 def test_expire_all_after_commit(writer, mock_session):
     writer.add_many([_make_event()])
 
     writer.flush()
+    writer.join()
 
     mock_session.expire_all.assert_called()
 
@@ -118,10 +138,41 @@ def test_expire_all_after_rollback(writer, mock_session):
     writer.add_many([_make_event()])
 
     writer.flush()
+    writer.join()
 
     mock_session.expire_all.assert_called()
 
 
+def test_close_writes_remaining_buffer(mock_session):
+    writer = BatchWriter(mock_session, batch_size=5)
+    writer.add_many([_make_event()])
+
+    writer.close()
+
+    mock_session.commit.assert_called_once()
+
+
+def test_checkpoint_callback_runs_after_commit(mock_session, mocker: MockerFixture):
+    on_commit = mocker.MagicMock()
+    writer = BatchWriter(mock_session, batch_size=5, checkpoint=lambda: on_commit)
+    writer.add_many([_make_event()])
+
+    writer.close()
+
+    on_commit.assert_called_once()
+
+
+def test_checkpoint_callback_skipped_on_error(mock_session, mocker: MockerFixture):
+    mock_session.execute = mocker_side_effect_error(mock_session)
+    on_commit = mocker.MagicMock()
+    writer = BatchWriter(mock_session, batch_size=5, checkpoint=lambda: on_commit, max_attempts=1)
+    writer.add_many([_make_event()])
+
+    writer.close()
+
+    on_commit.assert_not_called()
+
+
 def mocker_side_effect_error(mock_session):
     original = mock_session.execute
     original.side_effect = Exception("DB error")